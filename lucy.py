@@ -54,6 +54,7 @@ from lucy.utils import suppress_tf_logs
 with suppress_tf_logs():
     from lucy import LucyAI, get_config_manager
     from lucy.database import ConversationDB
+    from lucy.retraining import RetrainOrchestrator
     from lucy.utils import create_session_id, performance_monitor, log_error_with_context
     # Integración del sistema de logging y monitoreo (Día 02)
     from lucy.logging_system import (
@@ -94,6 +95,7 @@ class LucyApplication:
             # Inicializar componentes principales
             self.db = None
             self.lucy_ai = None
+            self.retrainer = None
             self.session_id = create_session_id()
             
             # Configuración de visualización de metadatos
@@ -124,8 +126,9 @@ class LucyApplication:
             performance_monitor.start_timer('initialization')
             
             # Inicializar base de datos
-            db_path = self.config.get('database', {}).get('path') or 'data/conversations.db'
-            self.db = ConversationDB(db_path)
+            db_cfg = self.config.get('database', {})
+            db_path = db_cfg.get('path') or 'data/conversations.db'
+            self.db = ConversationDB(db_path, db_cfg)
             self.logger.info("[OK] Base de datos inicializada")
             
             # Inicializar Lucy AI
@@ -133,6 +136,10 @@ class LucyApplication:
                 self.lucy_ai = LucyAI(self.config_manager)
             self.logger.info("[OK] Motor de IA inicializado")
             
+            # Re-entrenamiento automático en segundo plano (training.auto_retrain)
+            self.retrainer = RetrainOrchestrator(self.config_manager, self.db)
+            self.retrainer.start()
+            
             init_time = performance_monitor.end_timer('initialization')
             self.logger.info(f"[ROCKET] Lucy inicializada en {init_time:.2f}s")
             
@@ -234,7 +241,7 @@ class LucyApplication:
                         pass
                     # Guardar conversación en base de datos
                     if self.db:
-                        self.db.save_conversation(
+                        self.db.enqueue_turn(
                             session_id=self.session_id,
                             user_input=user_input,
                             bot_response=response,
@@ -272,6 +279,15 @@ class LucyApplication:
             log_error_with_context(e, {'mode': 'interactive_chat'})
             print("[X] Error crítico en modo interactivo")
     
+    def shutdown(self):
+        """Detiene el re-entrenamiento y los vigilantes del modelo y cierra la base de datos"""
+        if self.retrainer:
+            self.retrainer.stop()
+        if self.lucy_ai:
+            self.lucy_ai.close()
+        if self.db:
+            self.db.close()
+    
     def _setup_change_log(self):
         """Crea el archivo de registro de cambios si no existe"""
         log_dir = Path(self.config_manager.get_path('logs_dir'))
@@ -342,6 +358,13 @@ class LucyApplication:
             status = "activado" if self.show_status else "desactivado"
             print(f"{Fore.GREEN}[STATUS] Estado de conversación {status}{Style.RESET_ALL}")
         
+        elif command == '/reload' or command.startswith('/reload '):
+            version = command[len('/reload'):].strip() or None
+            self._reload_model(version)
+        
+        elif command == '/rollback':
+            self._rollback_model()
+        
         else:
             print(f"[?] Comando desconocido: {command}")
             print("   Escribe /help para ver comandos disponibles")
@@ -358,6 +381,8 @@ class LucyApplication:
         print("• /info    - Mostrar/ocultar información de respuesta")
         print("• /status  - Mostrar/ocultar historial de conversación")
         print("• /debug   - Información de debug")
+        print("• /reload [versión] - Activar el modelo publicado (o una versión)")
+        print("• /rollback - Volver a la versión de modelo anterior")
         print("• /exit    - Salir del programa")
     
     def _show_config(self):
@@ -372,12 +397,30 @@ class LucyApplication:
         """Muestra estadísticas de la sesión"""
         if self.db:
             try:
+                # Incluir los turnos aún en la cola de escritura diferida
+                self.db.flush_writes(timeout=1.0)
                 stats = self.db.get_metrics_summary(hours=1)
                 print("\n[CHART] Estadísticas:")
                 print(f"• Conversaciones esta hora: {stats.get('total_conversations', 0)}")
                 print(f"• Confianza promedio: {stats.get('average_confidence', 0):.2%}")
                 print(f"• Sesiones activas: {stats.get('active_sessions', 0)}")
                 
+                # Tráfico resuelto por cada nivel de la cascada
+                cascade = self.lucy_ai.get_cascade_stats() if hasattr(self.lucy_ai, 'get_cascade_stats') else None
+                if cascade and cascade['total']:
+                    print("• Cascada de inferencia:")
+                    for tier, data in cascade['tiers'].items():
+                        print(f"  - {tier}: {data['fraction']:.1%} ({data['count']})")
+                    if cascade['estimated_saved_ms'] is not None:
+                        print(f"  - Tiempo ahorrado estimado: {cascade['estimated_saved_ms']:.0f} ms")
+                
+                if self.db.write_behind is not None:
+                    queue_stats = self.db.write_behind.stats()
+                    flush_ms = queue_stats['avg_flush_ms']
+                    print(f"• Escritura diferida: {queue_stats['written']} turnos en {queue_stats['flushes']} lotes"
+                        + (f" ({flush_ms:.1f} ms/lote)" if flush_ms is not None else "")
+                        + f", descartados {queue_stats['dropped']}")
+                
                 # Métricas de rendimiento
                 metrics = performance_monitor.get_metrics()
                 if metrics:
@@ -390,6 +433,29 @@ class LucyApplication:
         else:
             print("[CHART] Base de datos no disponible para estadísticas")
     
+    def _reload_model(self, version: str = None):
+        """Activa en caliente el modelo publicado o una versión concreta"""
+        if not hasattr(self.lucy_ai, 'reload_model'):
+            print("[X] El motor actual no admite recarga en caliente")
+            return
+        if self.lucy_ai.reload_model(version, wait=True):
+            status = self.lucy_ai.get_model_status()
+            print(f"[OK] Modelo activo: {status.get('active_version')} "
+                f"({(status.get('last_swap_seconds') or 0) * 1000:.1f} ms)")
+        else:
+            error = self.lucy_ai.get_model_status().get('last_error')
+            print(f"[X] No se pudo recargar el modelo{': ' + error if error else ''}")
+    
+    def _rollback_model(self):
+        """Vuelve a la versión de modelo anterior"""
+        if not hasattr(self.lucy_ai, 'rollback_model'):
+            print("[X] El motor actual no admite rollback")
+            return
+        if self.lucy_ai.rollback_model():
+            print(f"[OK] Modelo activo: {self.lucy_ai.get_model_status().get('active_version')}")
+        else:
+            print("[X] No hay versión anterior a la que volver")
+    
     def _show_debug_info(self):
         """Muestra información de debug"""
         print("\n[WRENCH] Información de Debug:")
@@ -541,16 +607,19 @@ python lucy.py --train           # Re-entrenar modelo
         # Inicializar aplicación para modos interactivos/tests/train
         app = LucyApplication(config_path=args.config)
         
-        if args.test:
-            success = app.run_tests()
-            sys.exit(0 if success else 1)
-        
-        elif args.train:
-            app.run_training()
-        
-        else:
-            # Modo chat interactivo por defecto
-            app.run_interactive_chat()
+        try:
+            if args.test:
+                success = app.run_tests()
+                sys.exit(0 if success else 1)
+            
+            elif args.train:
+                app.run_training()
+            
+            else:
+                # Modo chat interactivo por defecto
+                app.run_interactive_chat()
+        finally:
+            app.shutdown()
     
     except KeyboardInterrupt:
         print("\n[WAVE] Programa interrumpido por el usuario")
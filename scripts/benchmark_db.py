@@ -0,0 +1,123 @@
+"""
+Benchmark de ConversationDB bajo carga concurrente tipo web
+
+Compara el modo anterior (conexión nueva por operación, rollback-journal)
+con el pool persistente (WAL + PRAGMA ajustados) y con la escritura
+diferida por lotes: varios hilos registran turnos con enqueue_turn
+mientras otros leen historiales, como hacen /api/chat y /ws/chat. Informa
+escrituras/s y la latencia (p50/p95) que ve el llamante al escribir y leer.
+
+Uso:
+    python scripts/benchmark_db.py --seconds 5 --writers 4 --readers 8
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.lucy.database import ConversationDB  # noqa: E402
+
+SCENARIOS = {
+    'legacy': {'pool': {'enabled': False}, 'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}},
+    'pooled': {},
+    'write_behind': {'write_behind': {'enabled': True}}
+}
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return None, None
+    return 1000 * statistics.median(samples), 1000 * samples[int(0.95 * (len(samples) - 1))]
+
+
+def run_scenario(settings, seconds, writers, readers, sessions=50):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConversationDB(str(Path(tmp) / 'bench.db'), settings)
+        for i in range(sessions):
+            db.save_conversation(f's{i}', 'hola', 'hola!', 'es', 0.9, 'saludo', 0.01)
+
+        stop = threading.Event()
+        write_latencies = [[] for _ in range(writers)]
+        latencies = [[] for _ in range(readers)]
+        errors = []
+
+        def writer(k):
+            n = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    db.enqueue_turn(f's{n % sessions}', f'mensaje {n}', 'respuesta', 'es',
+                                    0.8, 'saludo', 0.02, {'writer': k}, windows=('theme:saludo', 'recent'))
+                except Exception as e:
+                    errors.append(repr(e))
+                write_latencies[k].append(time.perf_counter() - start)
+                n += 1
+
+        def reader(k):
+            n = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    db.get_conversation_history(f's{n % sessions}', limit=10)
+                except Exception as e:
+                    errors.append(repr(e))
+                latencies[k].append(time.perf_counter() - start)
+                n += 1
+
+        threads = [threading.Thread(target=writer, args=(k,)) for k in range(writers)]
+        threads += [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        # Los turnos aún en cola cuentan solo cuando llegan a disco
+        db.flush_writes()
+        written = db.get_database_stats()['total_conversations'] - sessions
+        db.close()
+
+    reads = [x for per_thread in latencies for x in per_thread]
+    write_p50, write_p95 = _percentiles([x for per_thread in write_latencies for x in per_thread])
+    read_p50, read_p95 = _percentiles(reads)
+    return {
+        'writes_per_sec': written / seconds,
+        'write_p50_ms': write_p50,
+        'write_p95_ms': write_p95,
+        'reads_per_sec': len(reads) / seconds,
+        'read_p50_ms': read_p50,
+        'read_p95_ms': read_p95,
+        'errors': len(errors)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ConversationDB (conexión por operación, pool, escritura diferida)')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duración de cada escenario')
+    parser.add_argument('--writers', type=int, default=4, help='Hilos escritores')
+    parser.add_argument('--readers', type=int, default=8, help='Hilos lectores')
+    parser.add_argument('--json', type=str, default=None, help='Guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    results = {}
+    for name, settings in SCENARIOS.items():
+        results[name] = run_scenario(settings, args.seconds, args.writers, args.readers)
+        r = results[name]
+        print(f"{name:>12}: {r['writes_per_sec']:8.1f} escrituras/s (p95 {r['write_p95_ms']:.2f} ms)  "
+              f"{r['reads_per_sec']:8.1f} lecturas/s (p50 {r['read_p50_ms']:.2f} ms, p95 {r['read_p95_ms']:.2f} ms)  "
+              f"errores {r['errors']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Prueba de carga del bucle de eventos con las llamadas a la base de datos de la API
+
+Reproduce la mezcla de llamadas de los handlers de FastAPI (/api/chat,
+/api/context, /api/stats y /api/login) con muchas peticiones concurrentes
+sobre un mismo bucle asyncio, en dos modos:
+
+    sync   llamadas directas a ConversationDB dentro de la corrutina (antes)
+    async  las mismas llamadas con await a través de AsyncConversationDB
+
+Mientras tanto, una corrutina testigo duerme 10 ms en bucle y mide cuánto
+se retrasa cada despertar (el lag del bucle de eventos): es la espera
+extra que sufre cualquier otra petición o websocket del mismo proceso.
+
+Uso:
+    python scripts/loadtest_event_loop.py --seconds 5 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.lucy.async_db import AsyncConversationDB  # noqa: E402
+from src.lucy.database import ConversationDB  # noqa: E402
+
+SESSIONS = 50
+TICK = 0.01
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return 1000 * samples[int(q * (len(samples) - 1))] if samples else None
+
+
+async def _request(db, n, use_async):
+    """Una petición: cada décima es un login, el resto chat + contexto (+ stats)"""
+    session = f's{n % SESSIONS}'
+    calls = []
+    if n % 10 == 0:
+        calls.append(('verify_login', ('usuario1', 'Clave1234'), {}))
+    else:
+        calls.append(('enqueue_turn', (session, f'mensaje {n}', 'respuesta', 'es', 0.8, 'saludo', 0.02),
+                      {'windows': ('theme:saludo', 'recent')}))
+        calls.append(('get_conversation_history', (session,), {'limit': 20}))
+        if n % 5 == 0:
+            calls.append(('get_database_stats', (), {}))
+    for name, args, kwargs in calls:
+        if use_async:
+            await getattr(db, name)(*args, **kwargs)
+        else:
+            getattr(db, name)(*args, **kwargs)
+            # Punto de cesión equivalente al await del handler
+            await asyncio.sleep(0)
+
+
+async def _run(db, seconds, concurrency, use_async):
+    stop = asyncio.Event()
+    lags = []
+    done = [0]
+
+    async def ticker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, time.perf_counter() - start - TICK))
+
+    async def client(k):
+        n = k
+        while not stop.is_set():
+            await _request(db, n, use_async)
+            done[0] += 1
+            n += concurrency
+
+    tasks = [asyncio.create_task(ticker())] + [asyncio.create_task(client(k)) for k in range(concurrency)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        'requests_per_sec': done[0] / seconds,
+        'loop_lag_p50_ms': _percentile(lags, 0.5),
+        'loop_lag_p99_ms': _percentile(lags, 0.99),
+        'loop_lag_max_ms': 1000 * max(lags) if lags else None,
+        'loop_lag_mean_ms': 1000 * statistics.mean(lags) if lags else None
+    }
+
+
+def run_mode(mode, seconds, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConversationDB(str(Path(tmp) / 'load.db'), {'write_behind': {'enabled': True}})
+        db.create_user('usuario1', 'u1@example.com', 'Ana', 'Pérez', '1990-01-01', 'Clave1234')
+        for i in range(SESSIONS):
+            db.save_conversation(f's{i}', 'hola', 'hola!', 'es', 0.9, 'saludo', 0.01)
+        if mode == 'async':
+            adb = AsyncConversationDB(db, workers=5)
+
+            async def main():
+                try:
+                    return await _run(adb, seconds, concurrency, True)
+                finally:
+                    await adb.close()
+            return asyncio.run(main())
+        try:
+            return asyncio.run(_run(db, seconds, concurrency, False))
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lag del bucle de eventos con ConversationDB síncrono vs asíncrono')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duración de cada modo')
+    parser.add_argument('--concurrency', type=int, default=50, help='Peticiones concurrentes')
+    parser.add_argument('--json', type=str, default=None, help='Guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ('sync', 'async'):
+        results[mode] = r = run_mode(mode, args.seconds, args.concurrency)
+        print(f"{mode:>6}: {r['requests_per_sec']:8.1f} peticiones/s  lag del bucle p50 {r['loop_lag_p50_ms']:.2f} ms, "
+              f"p99 {r['loop_lag_p99_ms']:.2f} ms, máx {r['loop_lag_max_ms']:.2f} ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
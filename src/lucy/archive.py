@@ -0,0 +1,187 @@
+"""
+Archivo de Conversaciones
+=========================
+
+Almacén en disco, particionado por mes, de las conversaciones que la
+retención saca de la base de datos (ver `RetentionManager`).
+
+Formatos:
+    jsonl.gz  `conversations-2024-01.jsonl.gz`; cada lote archivado se añade
+              como un miembro gzip completo, de modo que un corte a mitad de
+              escritura solo afecta al último lote.
+    parquet   `conversations-2024-01/part-<primer id>.parquet`, un archivo por
+              lote (requiere pyarrow; sin él se usa jsonl.gz).
+
+Las filas se guardan tal como están en la tabla `conversations` y se leen
+en el mismo orden (timestamp, id) en que se archivaron, así que
+`iter_conversations` y `search_conversations` pueden continuar por ellas
+de forma transparente.
+"""
+
+import gzip
+import json
+import os
+import re
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from .logging_system import get_logger
+
+ARCHIVE_FORMATS = ('jsonl.gz', 'parquet')
+
+_FILE_RE = re.compile(r'^conversations-(\d{4}-\d{2}|unknown)(\.jsonl\.gz)?$')
+
+
+def _month(timestamp: Any) -> str:
+    month = str(timestamp or '')[:7]
+    return month if re.match(r'^\d{4}-\d{2}$', month) else 'unknown'
+
+
+def _fold(text: Any) -> str:
+    """Minúsculas y sin tildes, como el tokenizador unicode61 del índice FTS5"""
+    decomposed = unicodedata.normalize('NFKD', str(text or '').casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class ConversationArchive:
+    """Archivo mensual de conversaciones retiradas de la base de datos"""
+
+    def __init__(self, directory: str, fmt: str = 'jsonl.gz'):
+        """
+        Args:
+            directory: Directorio del archivo
+            fmt: 'jsonl.gz' o 'parquet'
+        """
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Formato de archivo no soportado: {fmt} (use {', '.join(ARCHIVE_FORMATS)})")
+        self.logger = get_logger(__name__)
+        if fmt == 'parquet':
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                self.logger.warning("[WARN] pyarrow no está instalado: el archivo usará jsonl.gz")
+                fmt = 'jsonl.gz'
+        self.directory = Path(directory)
+        self.format = fmt
+
+    def append(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Añade filas (ordenadas por timestamp, id) a sus particiones mensuales"""
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_month.setdefault(_month(row.get('timestamp')), []).append(dict(row))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for month, records in by_month.items():
+            if self.format == 'parquet':
+                self._append_parquet(month, records)
+            else:
+                self._append_jsonl(month, records)
+        return len(rows)
+
+    def _append_jsonl(self, month: str, records: List[Dict[str, Any]]):
+        data = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        with open(self.directory / f'conversations-{month}.jsonl.gz', 'ab') as f:
+            f.write(gzip.compress(data))
+            f.flush()
+            # Las filas se borran de la base de datos justo después
+            os.fsync(f.fileno())
+
+    def _append_parquet(self, month: str, records: List[Dict[str, Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        part_dir = self.directory / f'conversations-{month}'
+        part_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pylist(records), part_dir / f"part-{int(records[0]['id']):012d}.parquet")
+
+    def months(self) -> List[str]:
+        """Meses archivados, en orden"""
+        if not self.directory.exists():
+            return []
+        months = set()
+        for path in self.directory.iterdir():
+            match = _FILE_RE.match(path.name)
+            if match and (path.is_dir() or match.group(2)):
+                months.add(match.group(1))
+        # 'unknown' (sin marca de tiempo válida) va primero, como '' en la base de datos
+        return sorted(months, key=lambda m: '' if m == 'unknown' else m)
+
+    def _read_month(self, month: str) -> Iterator[Dict[str, Any]]:
+        path = self.directory / f'conversations-{month}.jsonl.gz'
+        if path.exists():
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        yield json.loads(line)
+            except (EOFError, zlib.error, gzip.BadGzipFile):
+                self.logger.warning(f"[WARN] Último lote incompleto en {path.name}: se ignora")
+        part_dir = self.directory / f'conversations-{month}'
+        if part_dir.is_dir():
+            import pyarrow.parquet as pq
+            for part in sorted(part_dir.glob('part-*.parquet')):
+                yield from pq.read_table(part).to_pylist()
+
+    def _iter_months(self, months: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        # Un lote repetido (archivado de nuevo tras un corte antes de borrarlo
+        # de la base de datos) se omite: solo se emiten claves crecientes
+        last = ('', 0)
+        for month in months:
+            for row in self._read_month(month):
+                key = (str(row.get('timestamp') or ''), int(row['id']))
+                if key > last:
+                    last = key
+                    yield row
+
+    def iter_rows(self, session_id: str = None, language: str = None, intent: str = None,
+                  since: str = None, until: str = None) -> Iterator[Dict[str, Any]]:
+        """Filas archivadas en orden (timestamp, id), con los filtros de `iter_conversations`"""
+        months = [m for m in self.months() if m == 'unknown' or (
+            (not since or m >= since[:7]) and (not until or m <= until[:7]))]
+        for row in self._iter_months(months):
+            timestamp = str(row.get('timestamp') or '')
+            if session_id and row.get('session_id') != session_id:
+                continue
+            if language and row.get('language') != language:
+                continue
+            if intent and row.get('intent') != intent:
+                continue
+            if (since and timestamp < since) or (until and timestamp >= until):
+                continue
+            yield row
+
+    def search(self, query: str, session_id: str = None, language: str = None,
+               limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Búsqueda lineal en el archivo, de lo más reciente a lo más antiguo
+
+        Mismas reglas que el índice FTS5: cada palabra de la consulta debe
+        ser prefijo de alguna palabra del mensaje o de la respuesta.
+        """
+        tokens = re.findall(r'\w+', _fold(query))
+        if not tokens or limit <= 0:
+            return []
+        results: List[Dict[str, Any]] = []
+        for month in reversed(self.months()):
+            matches = []
+            for row in self._iter_months([month]):
+                if session_id and row.get('session_id') != session_id:
+                    continue
+                if language and row.get('language') != language:
+                    continue
+                words = re.findall(r'\w+', _fold(f"{row.get('user_input')} {row.get('bot_response')}"))
+                if all(any(word.startswith(token) for word in words) for token in tokens):
+                    matches.append(dict(row, archived=True))
+            results.extend(reversed(matches))
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        files = [p for p in self.directory.rglob('*') if p.is_file()] if self.directory.exists() else []
+        return {
+            'directory': str(self.directory),
+            'format': self.format,
+            'months': len(self.months()),
+            'files': len(files),
+            'bytes': sum(p.stat().st_size for p in files)
+        }
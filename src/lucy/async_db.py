@@ -0,0 +1,87 @@
+"""
+Interfaz Asíncrona de la Base de Datos
+======================================
+
+`AsyncConversationDB` envuelve un `ConversationDB` para usarlo desde
+código asyncio (FastAPI) sin bloquear el bucle de eventos: cada llamada se
+ejecuta en un pool pequeño de hilos dedicados a la base de datos y se
+espera con `await`.
+
+    adb = AsyncConversationDB(ConversationDB(path, settings), workers=5)
+    history = await adb.get_conversation_history(session_id, limit=20)
+
+Cualquier método público de `ConversationDB` está disponible como
+corrutina con la misma firma. Los generadores (`iter_conversations`,
+`iter_learning_data`) se consumen con `stream`, que trae las filas por
+bloques para no pagar un salto de hilo por fila. La API síncrona sigue
+disponible en `adb.sync` para la CLI, el reentrenamiento y el resto de
+componentes basados en hilos.
+"""
+
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict
+
+
+class AsyncConversationDB:
+    """Fachada asíncrona de `ConversationDB` sobre un pool de hilos propio"""
+
+    def __init__(self, db, workers: int = 5):
+        """
+        Args:
+            db: `ConversationDB` síncrono
+            workers: Hilos del pool (el escritor es único: más allá de
+                lectores + 1 solo se añaden esperas)
+        """
+        self.sync = db
+        self.workers = max(1, int(workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='lucy-db')
+        self._pending = 0
+        self._calls = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta `fn(*args, **kwargs)` en el pool de la base de datos"""
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        self._calls += 1
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.sync, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return method
+
+    async def stream(self, name: str, *args, chunk_size: int = 500, **kwargs) -> AsyncIterator[Dict]:
+        """
+        Itera un método generador de `ConversationDB` sin bloquear el bucle
+
+        Args:
+            name: Nombre del método ('iter_conversations', 'iter_learning_data', ...)
+            chunk_size: Filas traídas por cada salto al pool
+        """
+        iterator = iter(getattr(self.sync, name)(*args, **kwargs))
+        while True:
+            chunk = await self.run(lambda: list(itertools.islice(iterator, chunk_size)))
+            for item in chunk:
+                yield item
+            if len(chunk) < chunk_size:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {'workers': self.workers, 'pending': self._pending, 'calls': self._calls}
+
+    async def close(self):
+        """Cierra la base de datos (volcando la escritura diferida) y el pool de hilos"""
+        await self.run(self.sync.close)
+        self._executor.shutdown(wait=True)
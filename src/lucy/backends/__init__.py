@@ -0,0 +1,17 @@
+"""
+Backends de Entrenamiento de Lucy AI
+====================================
+
+Implementaciones del clasificador de intenciones sin TensorFlow:
+- `NumpyMLP`: entrenamiento y servicio en NumPy puro
+- `SklearnMLP`: entrenamiento con `MLPClassifier`, exportado a `NumpyMLP`
+
+`training.backend` selecciona entre 'keras', 'numpy' y 'sklearn'.
+"""
+
+from .numpy_mlp import NumpyMLP, TrainingHistory
+from .sklearn_mlp import SklearnMLP
+
+BACKENDS = ("keras", "numpy", "sklearn")
+
+__all__ = ["NumpyMLP", "SklearnMLP", "TrainingHistory", "BACKENDS"]
@@ -0,0 +1,319 @@
+"""
+Backend NumPy para el clasificador de intenciones
+=================================================
+
+Implementa la misma arquitectura que el modelo de Keras (Dense 128 ReLU →
+Dropout → Dense 64 ReLU → Dropout → Dense softmax) sin depender de
+TensorFlow. Sirve tanto para entrenar (SGD con momentum Nesterov, dropout
+y early stopping) como para servir los pesos guardados en `lucy_model.npz`.
+
+La entrada es una bolsa de palabras casi vacía: se aceptan matrices
+dispersas (CSR de SciPy) para entrenar y `predict_active` calcula la primera
+capa como suma de las filas de W1 de los índices activos, con coste
+proporcional a la longitud del mensaje y no al vocabulario.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class TrainingHistory:
+    """Historial de entrenamiento con la misma forma que `keras.callbacks.History`"""
+
+    def __init__(self, history: Dict[str, List[float]]):
+        self.history = history
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0.0)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _as_input(x: Any) -> Any:
+    """CSR float32 para matrices dispersas; ndarray float32 en otro caso"""
+    if hasattr(x, 'tocsr'):
+        return x.tocsr().astype(np.float32)
+    return np.asarray(x, dtype=np.float32)
+
+
+def _crossentropy(probs: np.ndarray, y: np.ndarray) -> float:
+    return float(-np.mean(np.sum(y * np.log(np.clip(probs, 1e-7, 1.0)), axis=1)))
+
+
+class NumpyMLP:
+    """Perceptrón multicapa (ReLU/softmax) entrenable y servible con NumPy"""
+
+    def __init__(self, weights: Optional[List[np.ndarray]] = None,
+                input_size: int = None, output_size: int = None,
+                hidden_sizes: Sequence[int] = (128, 64), dropout_rate: float = 0.5,
+                learning_rate: float = 0.01, momentum: float = 0.9, nesterov: bool = True,
+                early_stopping_patience: Optional[int] = 10,
+                reduce_lr_factor: float = 0.5, reduce_lr_patience: Optional[int] = 5,
+                reduce_lr_min: float = 1e-5, seed: int = 42):
+        """
+        Inicializa la red
+
+        Args:
+            weights: Pesos existentes en orden Keras [W1, b1, W2, b2, ...]
+            input_size: Tamaño de entrada (requerido si no hay pesos)
+            output_size: Número de clases (requerido si no hay pesos)
+            hidden_sizes: Tamaños de las capas ocultas
+            dropout_rate: Dropout tras cada capa oculta (solo entrenamiento)
+            learning_rate: LR inicial de SGD
+            momentum: Momentum de SGD
+            nesterov: Usar momentum de Nesterov
+            early_stopping_patience: Épocas sin mejora antes de parar (None desactiva)
+            reduce_lr_factor: Factor de reducción de LR en meseta
+            reduce_lr_patience: Épocas sin mejora antes de reducir LR (None desactiva)
+            reduce_lr_min: LR mínimo
+            seed: Semilla para inicialización y dropout
+        """
+        self.dropout_rate = float(dropout_rate)
+        self.learning_rate = float(learning_rate)
+        self.momentum = float(momentum)
+        self.nesterov = bool(nesterov)
+        self.early_stopping_patience = early_stopping_patience
+        self.reduce_lr_factor = float(reduce_lr_factor)
+        self.reduce_lr_patience = reduce_lr_patience
+        self.reduce_lr_min = float(reduce_lr_min)
+        self._rng = np.random.default_rng(seed)
+        self._train_state: Dict[str, Any] = {}
+        self._resume_state: Optional[Dict[str, Any]] = None
+
+        if weights is not None:
+            self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        else:
+            if input_size is None or output_size is None:
+                raise ValueError("input_size y output_size son requeridos sin pesos iniciales")
+            sizes = [int(input_size)] + [int(h) for h in hidden_sizes] + [int(output_size)]
+            self.weights = []
+            for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+                # Inicialización glorot_uniform, igual que Dense de Keras
+                limit = np.sqrt(6.0 / (fan_in + fan_out))
+                self.weights.append(self._rng.uniform(-limit, limit, (fan_in, fan_out)).astype(np.float32))
+                self.weights.append(np.zeros(fan_out, dtype=np.float32))
+
+    # ------------------------------------------------------------------
+    # Interfaz compatible con el uso que hace Lucy de los modelos de Keras
+    # ------------------------------------------------------------------
+    @property
+    def input_shape(self) -> Tuple[Optional[int], int]:
+        return (None, int(self.weights[0].shape[0]))
+
+    @property
+    def output_shape(self) -> Tuple[Optional[int], int]:
+        return (None, int(self.weights[-1].shape[0]))
+
+    @property
+    def layers(self) -> List[Tuple[int, int]]:
+        """Capas densas como pares (entrada, salida)"""
+        return [tuple(w.shape) for w in self.weights[0::2]]
+
+    def count_params(self) -> int:
+        return int(sum(w.size for w in self.weights))
+
+    def get_weights(self) -> List[np.ndarray]:
+        return [w.copy() for w in self.weights]
+
+    def set_weights(self, weights: List[np.ndarray]):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+
+    def get_optimizer_state(self) -> Dict[str, Any]:
+        """Copia del estado de SGD y de los contadores de early stopping/LR"""
+        state = self._train_state
+        if not state:
+            return {}
+        return {
+            'velocities': [v.copy() for v in state['velocities']],
+            'best_weights': [w.copy() for w in state['best_weights']],
+            'learning_rate': float(state['learning_rate']),
+            'best_value': float(state['best_value']),
+            'epochs_without_improvement': int(state['epochs_without_improvement']),
+            'plateau_epochs': int(state['plateau_epochs'])
+        }
+
+    def set_optimizer_state(self, state: Dict[str, Any]):
+        """Estado guardado con `get_optimizer_state`; se aplica en el siguiente `fit`"""
+        self._resume_state = dict(state) if state else None
+
+    def predict(self, x: np.ndarray, verbose: int = 0, batch_size: int = None) -> np.ndarray:
+        """Probabilidades por clase para cada fila de `x` (densa o CSR)"""
+        return self._forward(_as_input(x), training=False)[0]
+
+    def predict_active(self, index: np.ndarray, values: np.ndarray = None) -> np.ndarray:
+        """
+        Probabilidades para una sola entrada dada por sus columnas activas
+
+        Equivale a `predict` sobre el vector denso, pero la primera capa es
+        b1 + Σ values[k] · W1[index[k]] (gather-sum) en lugar de x @ W1.
+
+        Args:
+            index: Índices de las columnas distintas de cero
+            values: Valores de esas columnas (None = todos 1)
+
+        Returns:
+            Vector de probabilidades por clase
+        """
+        index = np.asarray(index, dtype=np.int64)
+        rows = self.weights[0][index]
+        if values is None:
+            z = rows.sum(axis=0)
+        else:
+            z = np.asarray(values, dtype=np.float32) @ rows
+        h = z + self.weights[1]
+        for layer in range(1, len(self.weights) // 2):
+            h = _relu(h) @ self.weights[2 * layer] + self.weights[2 * layer + 1]
+        return _softmax(h[np.newaxis, :])[0]
+
+    def evaluate(self, x: np.ndarray, y: np.ndarray, verbose: int = 0) -> Tuple[float, float]:
+        """Retorna (pérdida, precisión) como `model.evaluate` de Keras"""
+        probs = self.predict(x)
+        accuracy = float(np.mean(np.argmax(probs, axis=1) == np.argmax(y, axis=1)))
+        return _crossentropy(probs, y), accuracy
+
+    def save(self, path: str):
+        """Guarda los pesos en un archivo .npz"""
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyMLP':
+        """Carga pesos guardados con `save`"""
+        with np.load(Path(path)) as data:
+            keys = sorted(data.files, key=lambda k: int(k[1:]))
+            return cls(weights=[data[k] for k in keys])
+
+    # ------------------------------------------------------------------
+    # Entrenamiento
+    # ------------------------------------------------------------------
+    def _forward(self, x: np.ndarray, training: bool):
+        activations = [x]
+        masks = []
+        h = x
+        n_layers = len(self.weights) // 2
+        for layer in range(n_layers):
+            z = h @ self.weights[2 * layer] + self.weights[2 * layer + 1]
+            if layer == n_layers - 1:
+                return _softmax(z), activations, masks
+            h = _relu(z)
+            if training and self.dropout_rate > 0:
+                keep = 1.0 - self.dropout_rate
+                mask = (self._rng.random(h.shape) < keep).astype(np.float32) / keep
+                h = h * mask
+            else:
+                mask = None
+            masks.append(mask)
+            activations.append(h)
+
+    def _gradients(self, x: np.ndarray, y: np.ndarray) -> Tuple[float, List[np.ndarray]]:
+        probs, activations, masks = self._forward(x, training=True)
+        loss = _crossentropy(probs, y)
+        grads: List[np.ndarray] = [None] * len(self.weights)
+        delta = (probs - y) / x.shape[0]
+        for layer in range(len(self.weights) // 2 - 1, -1, -1):
+            # Con entrada CSR, X^T @ delta solo recorre las entradas activas
+            grads[2 * layer] = np.asarray(activations[layer].T @ delta)
+            grads[2 * layer + 1] = delta.sum(axis=0)
+            if layer > 0:
+                delta = delta @ self.weights[2 * layer].T
+                if masks[layer - 1] is not None:
+                    delta = delta * masks[layer - 1]
+                delta = delta * (activations[layer] > 0)
+        return loss, grads
+
+    def fit(self, x: np.ndarray, y: np.ndarray, epochs: int = 1, batch_size: int = 32,
+            validation_data: Tuple[np.ndarray, np.ndarray] = None, verbose: int = 0,
+            callbacks: List[Any] = None, initial_epoch: int = 0) -> TrainingHistory:
+        """
+        Entrena con SGD por minibatches
+
+        Args:
+            x: Datos de entrada (densos o CSR)
+            y: Etiquetas one-hot
+            epochs: Número máximo de épocas
+            batch_size: Tamaño de minibatch
+            validation_data: Tupla (x_val, y_val) opcional
+            verbose: Sin efecto; se mantiene por compatibilidad con Keras
+            callbacks: Funciones `callback(epoch, logs, model)` llamadas al final de cada época
+            initial_epoch: Época desde la que continuar (al reanudar un checkpoint)
+
+        Returns:
+            Historial con loss/accuracy (y val_* si hay validación)
+        """
+        x = _as_input(x)
+        y = np.asarray(y, dtype=np.float32)
+        if validation_data is not None:
+            validation_data = (_as_input(validation_data[0]), np.asarray(validation_data[1], dtype=np.float32))
+        resume = self._resume_state or {}
+        self._resume_state = None
+        velocities = resume.get('velocities') or [np.zeros_like(w) for w in self.weights]
+        history: Dict[str, List[float]] = {'loss': [], 'accuracy': []}
+        if validation_data is not None:
+            history['val_loss'] = []
+            history['val_accuracy'] = []
+        monitor = 'val_loss' if validation_data is not None else 'loss'
+
+        state = self._train_state = {
+            'velocities': [np.asarray(v, dtype=np.float32) for v in velocities],
+            'best_weights': resume.get('best_weights') or self.get_weights(),
+            'learning_rate': float(resume.get('learning_rate', self.learning_rate)),
+            'best_value': float(resume.get('best_value', np.inf)),
+            'epochs_without_improvement': int(resume.get('epochs_without_improvement', 0)),
+            'plateau_epochs': int(resume.get('plateau_epochs', 0))
+        }
+        velocities = state['velocities']
+
+        for epoch in range(int(initial_epoch), int(epochs)):
+            lr = state['learning_rate']
+            order = self._rng.permutation(x.shape[0])
+            for start in range(0, x.shape[0], max(1, int(batch_size))):
+                idx = order[start:start + batch_size]
+                _, grads = self._gradients(x[idx], y[idx])
+                for i, grad in enumerate(grads):
+                    velocities[i] = self.momentum * velocities[i] - lr * grad
+                    if self.nesterov:
+                        self.weights[i] += self.momentum * velocities[i] - lr * grad
+                    else:
+                        self.weights[i] += velocities[i]
+
+            loss, accuracy = self.evaluate(x, y)
+            logs = {'loss': loss, 'accuracy': accuracy, 'lr': lr}
+            history['loss'].append(loss)
+            history['accuracy'].append(accuracy)
+            if validation_data is not None:
+                val_loss, val_accuracy = self.evaluate(*validation_data)
+                logs.update(val_loss=val_loss, val_accuracy=val_accuracy)
+                history['val_loss'].append(val_loss)
+                history['val_accuracy'].append(val_accuracy)
+
+            current = logs[monitor]
+            if current < state['best_value']:
+                state['best_value'] = current
+                state['best_weights'] = self.get_weights()
+                state['epochs_without_improvement'] = 0
+                state['plateau_epochs'] = 0
+            else:
+                state['epochs_without_improvement'] += 1
+                state['plateau_epochs'] += 1
+                if self.reduce_lr_patience is not None and state['plateau_epochs'] >= self.reduce_lr_patience:
+                    state['learning_rate'] = max(self.reduce_lr_min, lr * self.reduce_lr_factor)
+                    state['plateau_epochs'] = 0
+
+            for callback in callbacks or []:
+                callback(epoch, logs, self)
+
+            if (self.early_stopping_patience is not None
+                    and state['epochs_without_improvement'] >= self.early_stopping_patience):
+                break
+
+        if self.early_stopping_patience is not None:
+            self.set_weights(state['best_weights'])
+        return TrainingHistory(history)
@@ -0,0 +1,168 @@
+"""
+Backend scikit-learn para el clasificador de intenciones
+========================================================
+
+Entrena la misma arquitectura con `MLPClassifier` (SGD + Nesterov) y exporta
+los pesos a un `NumpyMLP`, de modo que el artefacto servido es idéntico al
+del backend NumPy.
+"""
+
+import pickle
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .numpy_mlp import NumpyMLP, TrainingHistory, _crossentropy
+
+
+class SklearnMLP:
+    """Adaptador de `MLPClassifier` con la interfaz de modelo que usa el entrenador"""
+
+    def __init__(self, input_size: int, output_size: int,
+                hidden_sizes: Sequence[int] = (128, 64), learning_rate: float = 0.01,
+                momentum: float = 0.9, nesterov: bool = True, l2: float = 1e-4,
+                early_stopping_patience: int = 10, seed: int = 42):
+        from sklearn.neural_network import MLPClassifier
+
+        self.input_size = int(input_size)
+        self.output_size = int(output_size)
+        self.early_stopping_patience = early_stopping_patience
+        self.classifier = MLPClassifier(
+            hidden_layer_sizes=tuple(int(h) for h in hidden_sizes),
+            activation='relu',
+            solver='sgd',
+            learning_rate_init=float(learning_rate),
+            momentum=float(momentum),
+            nesterovs_momentum=bool(nesterov),
+            alpha=float(l2),
+            random_state=seed
+        )
+        self._numpy = NumpyMLP(input_size=input_size, output_size=output_size,
+                            hidden_sizes=hidden_sizes, seed=seed)
+        self._train_state: Dict[str, Any] = {}
+        self._resume_state: Optional[Dict[str, Any]] = None
+
+    @property
+    def input_shape(self):
+        return self._numpy.input_shape
+
+    @property
+    def output_shape(self):
+        return self._numpy.output_shape
+
+    @property
+    def layers(self):
+        return self._numpy.layers
+
+    def count_params(self) -> int:
+        return self._numpy.count_params()
+
+    def get_weights(self) -> List[np.ndarray]:
+        return self._numpy.get_weights()
+
+    def set_weights(self, weights: List[np.ndarray]):
+        self._numpy.set_weights(weights)
+
+    def get_optimizer_state(self) -> Dict[str, Any]:
+        """Clasificador serializado (incluye velocidades de SGD) y contadores de early stopping"""
+        state = self._train_state
+        if not state:
+            return {}
+        return {
+            'classifier': np.frombuffer(pickle.dumps(self.classifier), dtype=np.uint8),
+            'best_weights': [w.copy() for w in state['best_weights']] if state['best_weights'] else [],
+            'best_value': float(state['best_value']),
+            'epochs_without_improvement': int(state['epochs_without_improvement'])
+        }
+
+    def set_optimizer_state(self, state: Dict[str, Any]):
+        """Restaura el clasificador de un checkpoint; los contadores se aplican en `fit`"""
+        if not state:
+            return
+        if 'classifier' in state:
+            self.classifier = pickle.loads(np.asarray(state['classifier'], dtype=np.uint8).tobytes())
+        self._resume_state = dict(state)
+
+    def to_numpy(self) -> NumpyMLP:
+        """Modelo NumPy equivalente (el que se guarda y sirve)"""
+        return self._numpy
+
+    def _export_weights(self) -> List[np.ndarray]:
+        """Convierte coefs_/intercepts_ al orden de pesos de Keras"""
+        weights: List[np.ndarray] = []
+        for coef, intercept in zip(self.classifier.coefs_, self.classifier.intercepts_):
+            weights.extend([coef.astype(np.float32), intercept.astype(np.float32)])
+        if self.classifier.out_activation_ == 'logistic':
+            # Con dos clases sklearn usa una sola salida sigmoide:
+            # softmax([0, z]) == sigmoid(z), así que añadimos una columna nula
+            kernel, bias = weights[-2], weights[-1]
+            weights[-2] = np.hstack([np.zeros_like(kernel), kernel])
+            weights[-1] = np.concatenate([np.zeros_like(bias), bias])
+        return weights
+
+    def fit(self, x: np.ndarray, y: np.ndarray, epochs: int = 1, batch_size: int = 32,
+            validation_data: Tuple[np.ndarray, np.ndarray] = None, verbose: int = 0,
+            callbacks: List[Any] = None, initial_epoch: int = 0) -> TrainingHistory:
+        """Entrena época a época con `partial_fit` aplicando early stopping propio"""
+        self.classifier.set_params(batch_size=max(1, min(int(batch_size), x.shape[0])))
+        labels = np.argmax(y, axis=1)
+        all_classes = np.arange(self.output_size)
+
+        history = {'loss': [], 'accuracy': []}
+        if validation_data is not None:
+            history['val_loss'] = []
+            history['val_accuracy'] = []
+        monitor = 'val_loss' if validation_data is not None else 'loss'
+        resume = self._resume_state or {}
+        self._resume_state = None
+        state = self._train_state = {
+            'best_value': float(resume.get('best_value', np.inf)),
+            'best_weights': resume.get('best_weights') or None,
+            'epochs_without_improvement': int(resume.get('epochs_without_improvement', 0))
+        }
+
+        for epoch in range(int(initial_epoch), int(epochs)):
+            self.classifier.partial_fit(x, labels, classes=all_classes)
+            self._numpy.set_weights(self._export_weights())
+
+            loss, accuracy = self.evaluate(x, y)
+            logs = {'loss': loss, 'accuracy': accuracy}
+            history['loss'].append(loss)
+            history['accuracy'].append(accuracy)
+            if validation_data is not None:
+                val_loss, val_accuracy = self.evaluate(*validation_data)
+                logs.update(val_loss=val_loss, val_accuracy=val_accuracy)
+                history['val_loss'].append(val_loss)
+                history['val_accuracy'].append(val_accuracy)
+
+            if logs[monitor] < state['best_value']:
+                state['best_value'] = logs[monitor]
+                state['best_weights'] = self._numpy.get_weights()
+                state['epochs_without_improvement'] = 0
+            else:
+                state['epochs_without_improvement'] += 1
+
+            for callback in callbacks or []:
+                callback(epoch, logs, self)
+
+            if (self.early_stopping_patience is not None
+                    and state['epochs_without_improvement'] >= self.early_stopping_patience):
+                break
+
+        if state['best_weights'] is not None:
+            self._numpy.set_weights(state['best_weights'])
+        return TrainingHistory(history)
+
+    def predict(self, x: np.ndarray, verbose: int = 0, batch_size: int = None) -> np.ndarray:
+        return self._numpy.predict(x)
+
+    def predict_active(self, index: np.ndarray, values: np.ndarray = None) -> np.ndarray:
+        return self._numpy.predict_active(index, values)
+
+    def evaluate(self, x: np.ndarray, y: np.ndarray, verbose: int = 0) -> Tuple[float, float]:
+        probs = self.predict(x)
+        accuracy = float(np.mean(np.argmax(probs, axis=1) == np.argmax(y, axis=1)))
+        return _crossentropy(probs, y), accuracy
+
+    def save(self, path: str):
+        self._numpy.save(path)
@@ -0,0 +1,151 @@
+"""
+Cascada de Inferencia por Niveles
+=================================
+
+La mayoría de los mensajes no necesitan detección de idioma, NLTK ni el
+modelo neuronal. `process_message` consulta primero esta cascada:
+
+1. `exact`: tabla hash de patrones normalizados (minúsculas, sin tildes ni
+   signos). Un mensaje idéntico a un patrón de una única intención se
+   responde en O(1).
+2. `lexical`: índice invertido token → patrones con puntuación Dice entre
+   los tokens del mensaje y los de cada patrón. Solo responde si la mejor
+   intención supera `min_score` y aventaja a la segunda en `min_margin`.
+3. `model`: el resto (entradas ambiguas) sigue el camino neuronal habitual.
+
+Las estadísticas registran la fracción del tráfico resuelta en cada nivel,
+su latencia media y el tiempo estimado ahorrado frente al nivel `model`.
+"""
+
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+TIERS = ('exact', 'lexical', 'model')
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin diacríticos ni signos y con espacios simples"""
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    cleaned = ''.join(c if c.isalnum() else ' ' for c in decomposed if unicodedata.category(c) != 'Mn')
+    return ' '.join(cleaned.split())
+
+
+class IntentCascade:
+    """Niveles baratos (coincidencia exacta y léxica) previos al modelo"""
+
+    def __init__(self, intents: Dict[str, Dict[str, Any]], exact: bool = True, lexical: bool = True,
+                min_score: float = 0.75, min_margin: float = 0.25):
+        """
+        Args:
+            intents: Intenciones por idioma ({'es': {'intents': [...]}, ...})
+            exact: Activar el nivel de coincidencia exacta
+            lexical: Activar el nivel léxico
+            min_score: Puntuación Dice mínima para responder en el nivel léxico
+            min_margin: Ventaja mínima sobre la segunda intención
+        """
+        self.exact_enabled = exact
+        self.lexical_enabled = lexical
+        self.min_score = float(min_score)
+        self.min_margin = float(min_margin)
+
+        # Patrón normalizado → intenciones (idioma, tag) que lo declaran
+        exact_table: Dict[str, set] = defaultdict(set)
+        # Índice invertido token → patrones; cada patrón: (idioma, tag, nº tokens)
+        self._patterns: List[Tuple[str, str, int]] = []
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        for language, data in intents.items():
+            for intent in (data or {}).get('intents', []):
+                tag = intent.get('tag')
+                if not tag:
+                    continue
+                for pattern in intent.get('patterns', []) or []:
+                    normalized = normalize_text(pattern)
+                    if not normalized:
+                        continue
+                    exact_table[normalized].add((language, tag))
+                    tokens = set(normalized.split())
+                    pattern_id = len(self._patterns)
+                    self._patterns.append((language, tag, len(tokens)))
+                    for token in tokens:
+                        self._index[token].append(pattern_id)
+        # Los patrones compartidos por varias intenciones no se resuelven aquí
+        self._exact = {text: next(iter(owners)) for text, owners in exact_table.items() if len(owners) == 1}
+
+        self._lock = threading.Lock()
+        self._counts = {tier: 0 for tier in TIERS}
+        self._seconds = {tier: 0.0 for tier in TIERS}
+
+    @property
+    def size(self) -> Dict[str, int]:
+        return {'exact_patterns': len(self._exact), 'indexed_patterns': len(self._patterns),
+                'indexed_tokens': len(self._index)}
+
+    def match(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Intenta resolver el mensaje en los niveles baratos
+
+        Returns:
+            {'tier', 'intent', 'language', 'probability', ...} o None si el
+            mensaje debe llegar al modelo
+        """
+        normalized = normalize_text(message)
+        if not normalized:
+            return None
+        if self.exact_enabled:
+            owner = self._exact.get(normalized)
+            if owner is not None:
+                return {'tier': 'exact', 'language': owner[0], 'intent': owner[1], 'probability': 1.0}
+        if self.lexical_enabled:
+            return self._lexical(normalized)
+        return None
+
+    def _lexical(self, normalized: str) -> Optional[Dict[str, Any]]:
+        tokens = set(normalized.split())
+        # Solo se visitan los patrones que comparten algún token con el mensaje
+        overlap: Dict[int, int] = defaultdict(int)
+        for token in tokens:
+            for pattern_id in self._index.get(token, ()):
+                overlap[pattern_id] += 1
+        best: Dict[Tuple[str, str], float] = {}
+        for pattern_id, shared in overlap.items():
+            language, tag, size = self._patterns[pattern_id]
+            score = 2.0 * shared / (len(tokens) + size)
+            if score > best.get((language, tag), 0.0):
+                best[(language, tag)] = score
+        if not best:
+            return None
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        (language, tag), score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if score < self.min_score or score - runner_up < self.min_margin:
+            return None
+        return {'tier': 'lexical', 'language': language, 'intent': tag,
+                'probability': float(score), 'margin': float(score - runner_up)}
+
+    def record(self, tier: str, seconds: float):
+        """Registra un mensaje resuelto en `tier` y el tiempo de clasificación"""
+        with self._lock:
+            self._counts[tier] += 1
+            self._seconds[tier] += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Fracción del tráfico, latencia media por nivel y tiempo ahorrado estimado"""
+        with self._lock:
+            counts, seconds = dict(self._counts), dict(self._seconds)
+        total = sum(counts.values())
+        tiers = {
+            tier: {
+                'count': counts[tier],
+                'fraction': counts[tier] / total if total else 0.0,
+                'avg_ms': 1000.0 * seconds[tier] / counts[tier] if counts[tier] else None
+            }
+            for tier in TIERS
+        }
+        # Cada mensaje resuelto antes del modelo ahorra la latencia media de ese nivel
+        model_avg = seconds['model'] / counts['model'] if counts['model'] else None
+        saved = None
+        if model_avg is not None:
+            saved = 1000.0 * sum(counts[t] * model_avg - seconds[t] for t in ('exact', 'lexical'))
+        return dict(self.size, total=total, tiers=tiers, estimated_saved_ms=saved)
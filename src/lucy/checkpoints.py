@@ -0,0 +1,303 @@
+"""
+Checkpoints de Entrenamiento de Lucy AI
+=======================================
+
+Escritura de checkpoints en segundo plano: el hilo de entrenamiento solo
+toma una instantánea de los pesos y del estado del optimizador; la
+serialización a disco, la retención de los K mejores y el índice
+`checkpoints.json` se hacen en un hilo escritor dedicado.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_FILE = 'checkpoints.json'
+
+logger = logging.getLogger(__name__)
+
+
+def _flatten_state(state: Dict[str, Any]) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Separa un estado de optimizador en arrays (para .npz) y escalares (para JSON)"""
+    arrays: Dict[str, np.ndarray] = {}
+    scalars: Dict[str, Any] = {}
+    for key, value in state.items():
+        if isinstance(value, np.ndarray):
+            arrays[f"opt__{key}"] = value
+        elif isinstance(value, (list, tuple)) and value and all(isinstance(v, np.ndarray) for v in value):
+            for i, item in enumerate(value):
+                arrays[f"optlist__{key}__{i}"] = item
+        elif isinstance(value, (np.integer, np.floating)):
+            scalars[key] = value.item()
+        else:
+            scalars[key] = value
+    return arrays, scalars
+
+
+def _unflatten_state(arrays: Dict[str, np.ndarray], scalars: Dict[str, Any]) -> Dict[str, Any]:
+    """Inversa de `_flatten_state`"""
+    state: Dict[str, Any] = dict(scalars)
+    lists: Dict[str, Dict[int, np.ndarray]] = {}
+    for name, value in arrays.items():
+        if name.startswith('opt__'):
+            state[name[len('opt__'):]] = value
+        elif name.startswith('optlist__'):
+            key, index = name[len('optlist__'):].rsplit('__', 1)
+            lists.setdefault(key, {})[int(index)] = value
+    for key, items in lists.items():
+        state[key] = [items[i] for i in sorted(items)]
+    return state
+
+
+class CheckpointWriter:
+    """Serializa checkpoints en un hilo de fondo y mantiene solo los K mejores"""
+
+    def __init__(self, directory: Path, keep_best: int = 3, mode: str = 'min',
+                max_pending: int = 2, reset: bool = False):
+        """
+        Inicializa el escritor
+
+        Args:
+            directory: Carpeta de checkpoints
+            keep_best: Número de checkpoints a conservar según la métrica
+            mode: 'min' o 'max' para comparar la métrica monitorizada
+            max_pending: Instantáneas en cola antes de bloquear al entrenamiento
+            reset: Borrar los checkpoints existentes (entrenamiento desde cero)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if reset:
+            for old in self.directory.glob('checkpoint_*.npz'):
+                old.unlink()
+            (self.directory / INDEX_FILE).unlink(missing_ok=True)
+        self.keep_best = max(1, int(keep_best))
+        self.mode = mode
+        self.errors: List[str] = []
+        self.write_seconds = 0.0
+        self.written = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(1, max_pending))
+        self._index = self.read_index(self.directory)
+        self._thread = threading.Thread(target=self._run, name='lucy-checkpoint-writer', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # API del hilo de entrenamiento
+    # ------------------------------------------------------------------
+    def submit(self, epoch: int, weights: List[np.ndarray], optimizer_state: Dict[str, Any] = None,
+            metric: float = None, monitor: str = 'loss', extra: Dict[str, Any] = None):
+        """
+        Encola una instantánea (los arrays deben ser copias propiedad del llamador)
+
+        Args:
+            epoch: Época completada (base 0)
+            weights: Pesos del modelo
+            optimizer_state: Estado del optimizador para reanudar
+            metric: Valor de la métrica monitorizada
+            monitor: Nombre de la métrica
+            extra: Datos adicionales JSON-serializables (historial, LR...)
+        """
+        self._queue.put({
+            'epoch': int(epoch),
+            'weights': weights,
+            'optimizer_state': optimizer_state or {},
+            'metric': None if metric is None else float(metric),
+            'monitor': monitor,
+            'extra': extra or {}
+        })
+
+    def flush(self):
+        """Espera a que se escriban todas las instantáneas pendientes"""
+        self._queue.join()
+
+    def close(self):
+        """Vacía la cola y detiene el hilo escritor"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # ------------------------------------------------------------------
+    # Hilo escritor
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            snapshot = self._queue.get()
+            try:
+                if snapshot is None:
+                    return
+                start = time.perf_counter()
+                self._write(snapshot)
+                self.write_seconds += time.perf_counter() - start
+                self.written += 1
+            except Exception as e:
+                self.errors.append(str(e))
+                logger.error(f"Error escribiendo checkpoint: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, snapshot: Dict[str, Any]):
+        epoch = snapshot['epoch']
+        filename = f"checkpoint_{epoch + 1:04d}.npz"
+        arrays = {f"w{i}": w for i, w in enumerate(snapshot['weights'])}
+        opt_arrays, opt_scalars = _flatten_state(snapshot['optimizer_state'])
+        arrays.update(opt_arrays)
+
+        # Escritura atómica: archivo temporal + rename
+        target = self.directory / filename
+        tmp_path = self.directory / f".{filename}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, target)
+
+        entry = {
+            'epoch': epoch,
+            'file': filename,
+            'metric': snapshot['metric'],
+            'monitor': snapshot['monitor'],
+            'optimizer': opt_scalars,
+            'extra': snapshot['extra'],
+            'timestamp': time.time()
+        }
+        entries = [e for e in self._index['checkpoints'] if e['file'] != filename]
+        entries.append(entry)
+        self._index['checkpoints'], removed = self._apply_retention(entries, filename)
+        self._index['latest'] = filename
+        self._write_index()
+
+        for old in removed:
+            try:
+                (self.directory / old['file']).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _apply_retention(self, entries: List[Dict[str, Any]],
+                        latest: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Conserva los K mejores según la métrica más el más reciente (para reanudar)"""
+        scored = [e for e in entries if e['metric'] is not None]
+        sign = 1.0 if self.mode == 'min' else -1.0
+        best = sorted(scored, key=lambda e: sign * e['metric'])[:self.keep_best]
+        keep_files = {e['file'] for e in best} | {latest}
+        kept = sorted((e for e in entries if e['file'] in keep_files), key=lambda e: e['epoch'])
+        removed = [e for e in entries if e['file'] not in keep_files]
+        return kept, removed
+
+    def _write_index(self):
+        tmp_path = self.directory / f".{INDEX_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.directory / INDEX_FILE)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    @staticmethod
+    def read_index(directory: Path) -> Dict[str, Any]:
+        """Índice de checkpoints existente (vacío si no hay)"""
+        index_path = Path(directory) / INDEX_FILE
+        if index_path.exists():
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Índice de checkpoints ilegible, se ignora: {e}")
+        return {'checkpoints': [], 'latest': None}
+
+    @classmethod
+    def load_latest(cls, directory: Path) -> Optional[Dict[str, Any]]:
+        """
+        Carga el último checkpoint escrito
+
+        Returns:
+            Diccionario con epoch, weights, optimizer_state, metric y extra;
+            None si no hay checkpoints
+        """
+        index = cls.read_index(directory)
+        entry = next((e for e in index['checkpoints'] if e['file'] == index.get('latest')), None)
+        if entry is None or not (Path(directory) / entry['file']).exists():
+            return None
+        with np.load(Path(directory) / entry['file']) as data:
+            weight_keys = sorted((k for k in data.files if k[0] == 'w' and k[1:].isdigit()),
+                                key=lambda k: int(k[1:]))
+            weights = [data[k] for k in weight_keys]
+            opt_arrays = {k: data[k] for k in data.files if k.startswith('opt')}
+        return {
+            'epoch': entry['epoch'],
+            'weights': weights,
+            'optimizer_state': _unflatten_state(opt_arrays, entry.get('optimizer', {})),
+            'metric': entry['metric'],
+            'monitor': entry['monitor'],
+            'extra': entry.get('extra', {})
+        }
+
+
+# ----------------------------------------------------------------------
+# Estado del optimizador de Keras
+# ----------------------------------------------------------------------
+def _optimizer_variables(optimizer: Any) -> List[Any]:
+    variables = optimizer.variables
+    return list(variables() if callable(variables) else variables)
+
+
+def keras_optimizer_state(model: Any) -> Dict[str, Any]:
+    """Instantánea de las variables del optimizador de un modelo de Keras"""
+    return {'variables': [np.array(v) for v in _optimizer_variables(model.optimizer)]}
+
+
+def restore_keras_optimizer_state(model: Any, state: Dict[str, Any]):
+    """Restaura variables guardadas con `keras_optimizer_state`"""
+    values = state.get('variables') or []
+    if not values:
+        return
+    optimizer = model.optimizer
+    if not _optimizer_variables(optimizer) or len(_optimizer_variables(optimizer)) < len(values):
+        optimizer.build(model.trainable_variables)
+    for variable, value in zip(_optimizer_variables(optimizer), values):
+        if tuple(variable.shape) == value.shape:
+            variable.assign(value)
+
+
+def _epoch_logs(logs: Dict[str, Any]) -> Dict[str, Any]:
+    return {'logs': {k: float(v) for k, v in (logs or {}).items()}}
+
+
+def make_keras_checkpoint_callback(writer: CheckpointWriter, interval: int, monitor: str,
+                                total_epochs: int):
+    """
+    Callback de Keras que encola checkpoints cada `interval` épocas
+
+    La clase se define aquí para importar Keras de forma diferida.
+    """
+    from tensorflow.keras.callbacks import Callback
+
+    class AsyncCheckpoint(Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            if _is_due(epoch, interval, total_epochs):
+                logs = logs or {}
+                writer.submit(epoch, self.model.get_weights(), keras_optimizer_state(self.model),
+                            metric=logs.get(monitor), monitor=monitor, extra=_epoch_logs(logs))
+
+        def on_train_end(self, logs=None):
+            writer.flush()
+
+    return AsyncCheckpoint()
+
+
+def make_checkpoint_callback(writer: CheckpointWriter, interval: int, monitor: str,
+                            total_epochs: int):
+    """Callback `callback(epoch, logs, model)` para los backends NumPy/sklearn"""
+    def checkpoint(epoch: int, logs: Dict[str, float], model: Any):
+        if _is_due(epoch, interval, total_epochs):
+            writer.submit(epoch, model.get_weights(), model.get_optimizer_state(),
+                        metric=logs.get(monitor), monitor=monitor, extra=_epoch_logs(logs))
+    return checkpoint
+
+
+def _is_due(epoch: int, interval: int, total_epochs: int) -> bool:
+    """Checkpoint cada `interval` épocas y siempre en la última"""
+    return (epoch + 1) % max(1, interval) == 0 or epoch + 1 == total_epochs
@@ -7,34 +7,193 @@ Utiliza SQLite para simplicidad y portabilidad.
 """
 
 import sqlite3
+import copy
 import json
+import re
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
 from pathlib import Path
 from contextlib import contextmanager
 import uuid
 import os
+import threading
+import time
+from .db_pool import SQLitePool
+from .archive import ConversationArchive
+from .maintenance import ContextSweeper, RetentionManager, RollupRefresher, utc_cutoff
+from .rollups import LIVE_TOTALS_SQL, RollupAccumulator, RollupTotals, SessionSketch, summarize, window_buckets
+from .write_behind import WriteBehindQueue
 from .logging_system import get_logger
 
+# Sentencias de record_turn: texto constante para reutilizar la sentencia
+# preparada de la caché de sqlite3 en cada turno
+_INSERT_CONVERSATION_SQL = '''
+    INSERT INTO conversations
+    (session_id, user_input, bot_response, language, confidence,
+    intent, response_time, context, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+_UPSERT_SESSION_SQL = '''
+    INSERT INTO sessions (session_id, last_activity, total_messages, preferred_language)
+    VALUES (?, CURRENT_TIMESTAMP, ?, ?)
+    ON CONFLICT(session_id) DO UPDATE SET
+        last_activity = excluded.last_activity,
+        total_messages = COALESCE(sessions.total_messages, 0) + excluded.total_messages,
+        preferred_language = excluded.preferred_language
+'''
+_SELECT_CONTEXT_SQL = '''
+    SELECT context_value FROM context
+    WHERE session_id = ? AND context_key = ?
+    AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+'''
+_UPSERT_CONTEXT_SQL = '''
+    INSERT INTO context (session_id, context_key, context_value, expires_at)
+    VALUES (?, ?, ?, NULL)
+    ON CONFLICT(session_id, context_key) DO UPDATE SET
+        context_value = excluded.context_value,
+        expires_at = NULL
+'''
+
+# Filas pendientes de agregar a partir de las cuales la cola en vivo de
+# get_metrics_summary se recorre por idx_conversations_timestamp y no por id
+_ROLLUP_TAIL_BY_ID_MAX = 10000
+
+# Tablas con recuento mantenido por triggers en table_counters
+_COUNTED_TABLES = ('conversations', 'sessions', 'learning_data', 'metrics')
+
+# Tablas que la retención borra sin archivar, con su columna de fecha
+_RETENTION_DATE_COLUMNS = {'metrics': 'timestamp', 'sessions': 'last_activity'}
+
+# Peso bm25 de cada columna del índice FTS5 (user_input, bot_response)
+_FTS_WEIGHTS = '2.0, 1.0'
+
+# Secciones de `database` que arrancan hilos o trabajo de fondo al abrir la base
+_BACKGROUND_SECTIONS = ('context_expiry', 'retention', 'rollups', 'write_behind', 'fts')
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """Consulta FTS5 segura: cada palabra entre comillas y como prefijo (AND implícito)"""
+    tokens = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{token}"*' for token in tokens) or None
+
+
+def offline_settings(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Copia de la sección `database` para conexiones de corta vida (CLI de
+    exportación, entrenamiento): sin barrido de contexto, retención,
+    agregados, escritura diferida ni relleno del índice FTS. Se conservan la
+    ruta, el pool y el archivo (`retention.archive`) para poder leerlo.
+    """
+    settings = copy.deepcopy(settings or {})
+    for section in _BACKGROUND_SECTIONS:
+        settings[section] = dict(settings.get(section) or {}, enabled=False)
+    return settings
+
+
 class ConversationDB:
     """Gestor de base de datos para conversaciones y contexto"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, settings: Dict[str, Any] = None):
         """
         Inicializa la conexión a la base de datos
         
         Args:
             db_path: Ruta al archivo de base de datos SQLite
+            settings: Sección `database` de la configuración (pool y pragmas)
         """
         self.db_path = Path(db_path)
         self.logger = get_logger(__name__)
+        settings = settings or {}
         
         # Crear directorio si no existe
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Conexiones persistentes: lectores en cola y un escritor dedicado
+        pool_cfg = settings.get('pool', {}) or {}
+        self.pool = SQLitePool(
+            db_path,
+            readers=pool_cfg.get('readers', 4),
+            timeout=pool_cfg.get('timeout_seconds', 30.0),
+            pragmas=settings.get('pragmas'),
+            health_check_seconds=pool_cfg.get('health_check_seconds', 60.0),
+            enabled=pool_cfg.get('enabled', True)
+        )
+        
         # Inicializar base de datos
         self._init_database()
+        self._init_counters()
+        self._rollup_lock = threading.Lock()
+        
+        # Instantánea de get_database_stats reutilizada durante `stats_cache_seconds`
+        self.stats_cache_seconds = float(settings.get('stats_cache_seconds', 0) or 0)
+        self._stats_lock = threading.Lock()
+        self._stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        
+        # Índice de texto completo de las conversaciones (FTS5)
+        fts_cfg = settings.get('fts', {}) or {}
+        self.fts_enabled = False
+        if fts_cfg.get('enabled', True):
+            self._init_search_index(int(fts_cfg.get('backfill_chunk', 5000)))
+        
+        # Borrado periódico del contexto caducado (las lecturas solo lo filtran)
+        self.context_sweeper = None
+        expiry_cfg = settings.get('context_expiry', {}) or {}
+        if expiry_cfg.get('enabled', False):
+            self.context_sweeper = ContextSweeper(
+                self,
+                interval_seconds=expiry_cfg.get('sweep_interval_seconds', 60),
+                batch_size=expiry_cfg.get('batch_size', 500),
+                max_batches=expiry_cfg.get('max_batches_per_sweep', 100)
+            )
+            self.context_sweeper.start()
+        
+        # Agregados por hora/día de las conversaciones (get_metrics_summary)
+        self.rollup_refresher = None
+        rollups_cfg = settings.get('rollups', {}) or {}
+        if rollups_cfg.get('enabled', False):
+            self.rollup_refresher = RollupRefresher(
+                self,
+                interval_seconds=rollups_cfg.get('refresh_interval_seconds', 30),
+                batch_size=rollups_cfg.get('batch_size', 5000)
+            )
+            self.rollup_refresher.start()
+        
+        # Retención: archivo mensual de las conversaciones retiradas y
+        # archivado/borrado periódico por antigüedad y por tope de filas
+        retention_cfg = settings.get('retention', {}) or {}
+        archive_cfg = retention_cfg.get('archive', {}) or {}
+        self.archive = None
+        if archive_cfg.get('enabled', False):
+            archive_dir = Path(archive_cfg.get('dir', 'archive'))
+            if not archive_dir.is_absolute():
+                archive_dir = self.db_path.parent / archive_dir
+            self.archive = ConversationArchive(str(archive_dir), archive_cfg.get('format', 'jsonl.gz'))
+        self.retention = None
+        if retention_cfg.get('enabled', False):
+            self.retention = RetentionManager(
+                self,
+                days_to_keep=retention_cfg.get('days_to_keep'),
+                max_conversations=settings.get('max_conversations'),
+                interval_seconds=retention_cfg.get('interval_seconds', 3600),
+                batch_size=retention_cfg.get('batch_size', 500),
+                max_batches=retention_cfg.get('max_batches_per_run', 200)
+            )
+            self.retention.start()
+        
+        # Escritura diferida de turnos de conversación (opcional)
+        self.write_behind = None
+        wb_cfg = settings.get('write_behind', {}) or {}
+        if wb_cfg.get('enabled', False):
+            self.write_behind = WriteBehindQueue(
+                self.record_turns,
+                max_size=wb_cfg.get('max_queue', 10000),
+                batch_size=wb_cfg.get('batch_size', 200),
+                flush_ms=wb_cfg.get('flush_ms', 50),
+                policy=wb_cfg.get('policy', 'block'),
+                block_timeout_ms=wb_cfg.get('block_timeout_ms', 1000),
+                name='conversation-writer'
+            )
     
             
                 
@@ -86,7 +245,7 @@ class ConversationDB:
             return True
 
     def get_user_by_identifier(self, identifier: str) -> Optional[Dict[str, Any]]:
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM users WHERE username = ? OR email = ?', (identifier, identifier))
             row = cursor.fetchone()
@@ -119,7 +278,8 @@ class ConversationDB:
         expires_at = None
         
         if expiry_minutes:
-            expires_at = (datetime.now() + timedelta(minutes=expiry_minutes)).isoformat()
+            # UTC y mismo formato que CURRENT_TIMESTAMP para compararse como texto
+            expires_at = (datetime.now(timezone.utc) + timedelta(minutes=expiry_minutes)).strftime("%Y-%m-%d %H:%M:%S")
         
         with self._get_connection() as conn:
             cursor = conn.cursor()
@@ -142,13 +302,8 @@ class ConversationDB:
         Returns:
             Valor almacenado o None si no existe o ha expirado
         """
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                DELETE FROM context
-                WHERE expires_at IS NOT NULL AND expires_at < CURRENT_TIMESTAMP
-            ''')
-            
             cursor.execute('''
                 SELECT context_value FROM context
                 WHERE session_id = ? AND context_key = ?
@@ -175,13 +330,8 @@ class ConversationDB:
         Returns:
             Diccionario con todos los valores de contexto
         """
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                DELETE FROM context
-                WHERE expires_at IS NOT NULL AND expires_at < CURRENT_TIMESTAMP
-            ''')
-            
             cursor.execute('''
                 SELECT context_key, context_value FROM context
                 WHERE session_id = ?
@@ -207,17 +357,36 @@ class ConversationDB:
         Returns:
             Número de contextos eliminados
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                DELETE FROM context
-                WHERE expires_at IS NOT NULL AND expires_at < CURRENT_TIMESTAMP
-            ''')
-            
-            deleted = cursor.rowcount
+        deleted = 0
+        while True:
+            rows = self.delete_expired_context_batch(1000)
+            deleted += rows
+            if rows < 1000:
+                break
             
         self.logger.info(f"Contextos expirados eliminados: {deleted}")
         return deleted
+    
+    def delete_expired_context_batch(self, batch_size: int = 500) -> int:
+        """
+        Elimina como mucho `batch_size` contextos caducados en una transacción
+        
+        Recorre idx_context_expiry desde el más antiguo, de modo que cada lote
+        toca solo las filas que borra.
+        
+        Returns:
+            Número de contextos eliminados
+        """
+        with self._get_connection() as conn:
+            cursor = conn.execute('''
+                DELETE FROM context WHERE id IN (
+                    SELECT id FROM context
+                    WHERE expires_at < CURRENT_TIMESTAMP
+                    ORDER BY expires_at
+                    LIMIT ?
+                )
+            ''', (int(batch_size),))
+            return cursor.rowcount
         
     def _init_database(self):
         """Inicializa las tablas de la base de datos"""
@@ -298,6 +467,7 @@ class ConversationDB:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_activity ON sessions(last_activity)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_context_session ON context(session_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_context_expiry ON context(expires_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_metrics_timestamp ON metrics(timestamp)')
 
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -313,23 +483,193 @@ class ConversationDB:
                 )
             ''')
             
+            # Agregados por cubo (hora/día), idioma e intención; histograma como texto 'n0,n1,...'
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS conversation_rollups (
+                    granularity TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    intent TEXT NOT NULL,
+                    conversations INTEGER NOT NULL DEFAULT 0,
+                    confidence_count INTEGER NOT NULL DEFAULT 0,
+                    confidence_sum REAL NOT NULL DEFAULT 0,
+                    response_time_count INTEGER NOT NULL DEFAULT 0,
+                    response_time_sum REAL NOT NULL DEFAULT 0,
+                    response_time_hist TEXT NOT NULL,
+                    PRIMARY KEY (granularity, bucket, language, intent)
+                )
+            ''')
+            
+            # Sesiones distintas por cubo (HyperLogLog)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_rollups (
+                    granularity TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    sketch BLOB NOT NULL,
+                    PRIMARY KEY (granularity, bucket)
+                )
+            ''')
+            
+            # Estado de migraciones (clave/valor)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            
             conn.commit()
             
         self.logger.info("Base de datos inicializada correctamente")
     
+    def _init_counters(self):
+        """
+        Crea table_counters y sus triggers de inserción/borrado
+        
+        El recuento inicial y los triggers se crean en la misma transacción
+        del escritor, así que ninguna fila queda sin contar ni se cuenta dos
+        veces. Las tablas contadas no deben usar INSERT OR REPLACE: el borrado
+        implícito de REPLACE no dispara triggers (sin recursive_triggers).
+        """
+        with self._get_connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS table_counters (
+                    table_name TEXT PRIMARY KEY,
+                    row_count INTEGER NOT NULL
+                )
+            ''')
+            for table in _COUNTED_TABLES:
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO table_counters (table_name, row_count)
+                    SELECT '{table}', COUNT(*) FROM {table}
+                ''')
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN
+                        UPDATE table_counters SET row_count = row_count + 1 WHERE table_name = '{table}';
+                    END
+                ''')
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN
+                        UPDATE table_counters SET row_count = row_count - 1 WHERE table_name = '{table}';
+                    END
+                ''')
+    
+    def get_table_counts(self) -> Dict[str, int]:
+        """Filas de cada tabla contada, leídas de table_counters (O(1))"""
+        with self._read_connection() as conn:
+            return {row['table_name']: row['row_count']
+                    for row in conn.execute('SELECT table_name, row_count FROM table_counters')}
+    
+    def _init_search_index(self, chunk_size: int = 5000):
+        """
+        Crea el índice FTS5 de las conversaciones y lo rellena por bloques
+        
+        Tabla de contenido externo sobre `conversations` (no duplica el texto)
+        mantenida con triggers, tokenizador unicode61 sin diacríticos ("canción"
+        encuentra "cancion"). Si el índice se crea sobre una base con datos, las
+        filas existentes se indexan en bloques de `chunk_size`, cada uno en su
+        propia transacción; el progreso se guarda en schema_meta y la
+        migración se reanuda si se interrumpe.
+        """
+        try:
+            with self._get_connection() as conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'conversations_fts'"
+                ).fetchone()
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                        user_input, bot_response,
+                        content='conversations', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations BEGIN
+                        INSERT INTO conversations_fts(rowid, user_input, bot_response)
+                        VALUES (new.id, new.user_input, new.bot_response);
+                    END
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN
+                        INSERT INTO conversations_fts(conversations_fts, rowid, user_input, bot_response)
+                        VALUES ('delete', old.id, old.user_input, old.bot_response);
+                    END
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS conversations_fts_update
+                    AFTER UPDATE OF user_input, bot_response ON conversations BEGIN
+                        INSERT INTO conversations_fts(conversations_fts, rowid, user_input, bot_response)
+                        VALUES ('delete', old.id, old.user_input, old.bot_response);
+                        INSERT INTO conversations_fts(rowid, user_input, bot_response)
+                        VALUES (new.id, new.user_input, new.bot_response);
+                    END
+                ''')
+                if not exists:
+                    # Las filas nuevas ya entran por trigger; basta con llegar al id actual
+                    target = conn.execute('SELECT COALESCE(MAX(id), 0) FROM conversations').fetchone()[0]
+                    conn.executemany('INSERT OR REPLACE INTO schema_meta (key, value) VALUES (?, ?)',
+                                    [('fts_backfill_last_id', '0'), ('fts_backfill_target', str(target))])
+        except sqlite3.OperationalError as e:
+            # SQLite compilado sin FTS5: la búsqueda usa LIKE
+            self.logger.warning(f"[WARN] Índice FTS5 no disponible, búsqueda con LIKE: {e}")
+            return
+        self.fts_enabled = True
+        self._backfill_search_index(chunk_size)
+    
+    def _backfill_search_index(self, chunk_size: int):
+        """Indexa en bloques las conversaciones anteriores al índice FTS5"""
+        with self._read_connection() as conn:
+            meta = dict(conn.execute(
+                "SELECT key, value FROM schema_meta WHERE key IN ('fts_backfill_last_id', 'fts_backfill_target')"
+            ).fetchall())
+        if not meta:
+            return
+        last_id, target = int(meta['fts_backfill_last_id']), int(meta['fts_backfill_target'])
+        indexed = 0
+        while last_id < target:
+            with self._get_connection() as conn:
+                ids = [row[0] for row in conn.execute(
+                    'SELECT id FROM conversations WHERE id > ? AND id <= ? ORDER BY id LIMIT ?',
+                    (last_id, target, max(1, chunk_size))
+                ).fetchall()]
+                if ids:
+                    conn.execute('''
+                        INSERT INTO conversations_fts(rowid, user_input, bot_response)
+                        SELECT id, user_input, bot_response FROM conversations
+                        WHERE id BETWEEN ? AND ?
+                    ''', (ids[0], ids[-1]))
+                last_id = ids[-1] if ids else target
+                conn.execute("UPDATE schema_meta SET value = ? WHERE key = 'fts_backfill_last_id'", (str(last_id),))
+            indexed += len(ids)
+        with self._get_connection() as conn:
+            conn.execute("DELETE FROM schema_meta WHERE key IN ('fts_backfill_last_id', 'fts_backfill_target')")
+        if indexed:
+            self.logger.info(f"[OK] Índice FTS5: {indexed} conversaciones existentes indexadas")
+    
     @contextmanager
     def _get_connection(self):
-        """Context manager para conexiones a la base de datos"""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        conn.row_factory = sqlite3.Row
+        """
+        Context manager para operaciones de escritura
+
+        Presta la conexión del escritor único; al salir se hace commit o,
+        si hubo un error, rollback.
+        """
         try:
-            yield conn
+            with self.pool.writer() as conn:
+                yield conn
         except Exception as e:
-            conn.rollback()
             self.logger.error(f"Error en transacción de base de datos: {e}")
             raise
-        finally:
-            conn.close()
+
+    @contextmanager
+    def _read_connection(self):
+        """Context manager para consultas (conexión de lectura del pool)"""
+        try:
+            with self.pool.reader() as conn:
+                yield conn
+        except Exception as e:
+            self.logger.error(f"Error en consulta de base de datos: {e}")
+            raise
     
     def save_conversation(self, session_id: str, user_input: str, bot_response: str,
                         language: str, confidence: float = None, intent: str = None,
@@ -350,33 +690,125 @@ class ConversationDB:
         Returns:
             ID de la conversación guardada
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            context_json = json.dumps(context) if context else None
-            
-            cursor.execute('''
-                INSERT INTO conversations 
-                (session_id, user_input, bot_response, language, confidence, 
-                intent, response_time, context)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (session_id, user_input, bot_response, language, 
-                confidence, intent, response_time, context_json))
-            
-            conversation_id = cursor.lastrowid
+        return self.record_turn(session_id, user_input, bot_response, language,
+                                confidence, intent, response_time, context)
+    
+    def record_turn(self, session_id: str, user_input: str, bot_response: str,
+                    language: str, confidence: float = None, intent: str = None,
+                    response_time: float = None, context: Dict = None,
+                    windows: Sequence[str] = (), window_size: int = 10) -> int:
+        """
+        Registra un turno de chat completo en una sola transacción
+        
+        Inserta la conversación, actualiza los contadores de la sesión (UPSERT
+        que conserva user_name y settings) y añade {'user', 'bot'} al final de
+        cada ventana de contexto indicada, recortada a `window_size` entradas.
+        
+        Args:
+            windows: Claves de contexto a actualizar (p. ej. 'recent', 'theme:<intent>')
+            window_size: Entradas máximas por ventana
+            (el resto, como en `save_conversation`)
             
-            # Actualizar estadísticas de sesión
-            cursor.execute('''
-                INSERT OR REPLACE INTO sessions 
-                (session_id, last_activity, total_messages, preferred_language)
-                VALUES (?, CURRENT_TIMESTAMP, 
-                        COALESCE((SELECT total_messages FROM sessions WHERE session_id = ?), 0) + 1,
-                        ?)
-            ''', (session_id, session_id, language))
+        Returns:
+            ID de la conversación guardada
+        """
+        turn = self._make_turn(session_id, user_input, bot_response, language, confidence,
+                               intent, response_time, context, windows, window_size)
+        return self._write_turns([turn])
+    
+    def record_turns(self, turns: List[Dict[str, Any]]) -> int:
+        """
+        Registra varios turnos (ver `record_turn`) en una sola transacción
+        
+        Args:
+            turns: Diccionarios con los argumentos de `record_turn` (más
+                `timestamp` UTC opcional, el momento en que se encolaron)
             
-            conn.commit()
-            return conversation_id
+        Returns:
+            Número de turnos guardados
+        """
+        if turns:
+            self._write_turns(turns)
+        return len(turns)
+    
+    @staticmethod
+    def _make_turn(session_id: str, user_input: str, bot_response: str, language: str,
+                   confidence: float = None, intent: str = None, response_time: float = None,
+                   context: Dict = None, windows: Sequence[str] = (), window_size: int = 10) -> Dict[str, Any]:
+        return {
+            'session_id': session_id, 'user_input': user_input, 'bot_response': bot_response,
+            'language': language, 'confidence': confidence, 'intent': intent,
+            'response_time': response_time, 'context': context,
+            'windows': list(windows or ()), 'window_size': int(window_size)
+        }
+    
+    def _write_turns(self, turns: List[Dict[str, Any]]) -> int:
+        """Escribe los turnos en una transacción; devuelve el id de la última conversación"""
+        rows = []
+        # Por sesión: número de turnos e idioma del último
+        sessions: Dict[str, List[Any]] = {}
+        # Por ventana (sesión, clave): entradas nuevas en orden y tamaño máximo
+        windows: Dict[Tuple[str, str], List[Any]] = {}
+        for turn in turns:
+            context = turn.get('context')
+            rows.append((turn['session_id'], turn['user_input'], turn['bot_response'], turn['language'],
+                        turn.get('confidence'), turn.get('intent'), turn.get('response_time'),
+                        json.dumps(context) if context else None, turn.get('timestamp')))
+            counters = sessions.setdefault(turn['session_id'], [0, None])
+            counters[0] += 1
+            counters[1] = turn['language']
+            for key in turn.get('windows') or ():
+                window = windows.setdefault((turn['session_id'], key), [[], 10])
+                window[0].append({'user': turn['user_input'], 'bot': turn['bot_response']})
+                window[1] = turn.get('window_size', 10)
+        
+        with self._get_connection() as conn:
+            conn.executemany(_INSERT_CONVERSATION_SQL, rows)
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            conn.executemany(_UPSERT_SESSION_SQL, [(sid, count, language)
+                                                   for sid, (count, language) in sessions.items()])
+            for (session_id, key), (entries, size) in windows.items():
+                row = conn.execute(_SELECT_CONTEXT_SQL, (session_id, key)).fetchone()
+                current = []
+                if row:
+                    try:
+                        current = json.loads(row[0])
+                    except json.JSONDecodeError:
+                        self.logger.error(f"Error al decodificar contexto: {row[0]}")
+                    if not isinstance(current, list):
+                        current = []
+                current = (current + entries)[-max(1, size):]
+                conn.execute(_UPSERT_CONTEXT_SQL, (session_id, key, json.dumps(current)))
+        return last_id
     
+    def enqueue_turn(self, session_id: str, user_input: str, bot_response: str,
+                     language: str, confidence: float = None, intent: str = None,
+                     response_time: float = None, context: Dict = None,
+                     windows: Sequence[str] = (), window_size: int = 10) -> bool:
+        """
+        Registra un turno (ver `record_turn`) fuera del camino de la petición
+        
+        Con `database.write_behind` activo el turno se encola y se escribe por
+        lotes en segundo plano; si no, se registra de inmediato.
+        
+        Returns:
+            False si la cola estaba llena y el turno se descartó
+        """
+        turn = self._make_turn(session_id, user_input, bot_response, language, confidence,
+                               intent, response_time, context, windows, window_size)
+        if self.write_behind is None:
+            self._write_turns([turn])
+            return True
+        # Marca de tiempo del turno, no del lote (mismo formato UTC que CURRENT_TIMESTAMP)
+        turn['timestamp'] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        return self.write_behind.put(turn)
+    
+    def flush_writes(self, timeout: float = None) -> bool:
+        """Espera a que los turnos encolados estén escritos"""
+        if self.write_behind is None:
+            return True
+        return self.write_behind.flush(timeout)
+
     def clear_session_context(self, session_id: str) -> int:
         with self._get_connection() as conn:
             cursor = conn.cursor()
@@ -396,7 +828,7 @@ class ConversationDB:
         Returns:
             Lista de conversaciones
         """
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -420,7 +852,7 @@ class ConversationDB:
         Returns:
             Información de la sesión o None si no existe
         """
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -446,10 +878,13 @@ class ConversationDB:
             
             settings_json = json.dumps(settings)
             
+            # UPSERT: conservar user_name, contadores e idioma de la sesión
             cursor.execute('''
-                INSERT OR REPLACE INTO sessions 
-                (session_id, last_activity, settings)
+                INSERT INTO sessions (session_id, last_activity, settings)
                 VALUES (?, CURRENT_TIMESTAMP, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    last_activity = excluded.last_activity,
+                    settings = excluded.settings
             ''', (session_id, settings_json))
             
             conn.commit()
@@ -507,7 +942,7 @@ class ConversationDB:
         Returns:
             Lista de patrones populares
         """
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -519,7 +954,108 @@ class ConversationDB:
             ''', (language, limit))
             
             return [dict(row) for row in cursor.fetchall()]
-    
+
+    def iter_conversations(self, session_id: str = None, language: str = None, intent: str = None,
+                        since: str = None, until: str = None, page_size: int = 1000,
+                        include_archived: bool = False) -> Iterator[Dict]:
+        """
+        Itera las conversaciones en orden (timestamp, id) por páginas
+
+        Paginación por clave: cada página continúa tras el último
+        (timestamp, id) visto, recorriendo idx_conversations_timestamp (que
+        incluye el id como rowid), sin OFFSET y con memoria constante. Cada
+        página toma su propia conexión de lectura.
+
+        Args:
+            session_id: Filtrar por sesión
+            language: Filtrar por idioma
+            intent: Filtrar por intención
+            since: Desde esta fecha UTC, incluida ('YYYY-MM-DD[ HH:MM:SS]')
+            until: Hasta esta fecha UTC, excluida
+            page_size: Filas por página
+            include_archived: Empezar por las conversaciones del archivo (más antiguas)
+
+        Yields:
+            Filas de conversations como diccionarios
+        """
+        filters = ['(timestamp, id) > (?, ?)']
+        base_params: List[Any] = []
+        for column, value in (('session_id', session_id), ('language', language), ('intent', intent)):
+            if value:
+                filters.append(f'{column} = ?')
+                base_params.append(value)
+        if since:
+            filters.append('timestamp >= ?')
+            base_params.append(since)
+        if until:
+            filters.append('timestamp < ?')
+            base_params.append(until)
+        query = f'''
+            SELECT id, session_id, timestamp, language, intent, confidence, response_time,
+                user_input, bot_response, context
+            FROM conversations
+            WHERE {' AND '.join(filters)}
+            ORDER BY timestamp, id
+            LIMIT ?
+        '''
+
+        # Las marcas de tiempo son texto: '' precede a cualquier valor
+        last = ('', 0)
+        if include_archived and self.archive is not None:
+            for row in self.archive.iter_rows(session_id, language, intent, since, until):
+                yield row
+                last = (row['timestamp'] or '', row['id'])
+        while True:
+            with self._read_connection() as conn:
+                rows = conn.execute(query, [*last, *base_params, page_size]).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < page_size:
+                return
+            last = (rows[-1]['timestamp'], rows[-1]['id'])
+
+    def iter_learning_data(self, languages: List[str] = None, min_frequency: int = 1,
+                        min_effectiveness: float = 0.0, page_size: int = 1000) -> Iterator[Dict]:
+        """
+        Itera la tabla learning_data por páginas sin cargarla completa
+
+        Usa paginación por clave (id > último id visto) en lugar de OFFSET,
+        y toma una conexión de lectura por página para no retenerla entre páginas.
+
+        Args:
+            languages: Idiomas a incluir (None para todos)
+            min_frequency: Frecuencia mínima
+            min_effectiveness: Puntuación de efectividad mínima
+            page_size: Filas por página
+
+        Yields:
+            Filas de learning_data como diccionarios
+        """
+        filters = ['id > ?', 'frequency >= ?', 'effectiveness_score >= ?']
+        base_params: List[Any] = [min_frequency, min_effectiveness]
+        if languages:
+            filters.append(f"language IN ({', '.join('?' for _ in languages)})")
+            base_params.extend(languages)
+        query = f'''
+            SELECT id, pattern, response, intent, language, frequency, effectiveness_score
+            FROM learning_data
+            WHERE {' AND '.join(filters)}
+            ORDER BY id
+            LIMIT ?
+        '''
+
+        last_id = 0
+        while True:
+            with self._read_connection() as conn:
+                rows = conn.execute(query, [last_id, *base_params, page_size]).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]['id']
+            if len(rows) < page_size:
+                return
+
     def save_metric(self, metric_name: str, metric_value: Any):
         """
         Guarda una métrica en la base de datos
@@ -538,138 +1074,345 @@ class ConversationDB:
             
             conn.commit()
     
+    def get_latest_metric(self, metric_name: str) -> Optional[Any]:
+        """
+        Obtiene el último valor registrado de una métrica
+
+        Args:
+            metric_name: Nombre de la métrica
+
+        Returns:
+            Valor decodificado o None si no existe
+        """
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT metric_value FROM metrics
+                WHERE metric_name = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (metric_name,))
+            row = cursor.fetchone()
+            return json.loads(row['metric_value']) if row else None
+
+    def count_retrain_signals(self, after_learning_id: int = 0, after_conversation_id: int = 0,
+                            low_confidence: float = 0.4) -> Dict[str, int]:
+        """
+        Cuenta datos nuevos desde la última marca de re-entrenamiento
+
+        Args:
+            after_learning_id: Último id de learning_data ya considerado
+            after_conversation_id: Último id de conversations ya considerado
+            low_confidence: Confianza por debajo de la cual un turno cuenta
+
+        Returns:
+            Filas nuevas de learning_data, turnos de baja confianza y los ids
+            máximos actuales (nueva marca)
+        """
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(MAX(id), ?) FROM learning_data WHERE id > ?
+            ''', (after_learning_id, after_learning_id))
+            new_learning, max_learning_id = cursor.fetchone()
+            cursor.execute('''
+                SELECT COALESCE(SUM(confidence IS NOT NULL AND confidence < ?), 0),
+                    COALESCE(MAX(id), ?)
+                FROM conversations WHERE id > ?
+            ''', (low_confidence, after_conversation_id, after_conversation_id))
+            low_confidence_turns, max_conversation_id = cursor.fetchone()
+            return {
+                'learning_data': int(new_learning),
+                'low_confidence': int(low_confidence_turns),
+                'learning_id': int(max_learning_id),
+                'conversation_id': int(max_conversation_id)
+            }
+
     def get_metrics_summary(self, hours: int = 24) -> Dict[str, Any]:
         """
         Obtiene un resumen de métricas
         
+        Suma los agregados por hora/día de la ventana; solo se leen en vivo
+        las filas de la primera hora incompleta y las aún no agregadas
+        (id posterior a la marca de agua de `refresh_rollups`).
+        
         Args:
             hours: Horas hacia atrás para considerar
             
         Returns:
             Resumen de métricas
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            since_dt = datetime.now() - timedelta(hours=hours)
-            # Evitar el adapter por defecto de sqlite3 (Python 3.12 deprecado)
-            since = since_dt.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Total de conversaciones
-            cursor.execute('''
-                SELECT COUNT(*) as total_conversations
-                FROM conversations 
-                WHERE timestamp > ?
-            ''', (since,))
-            total_conversations = cursor.fetchone()['total_conversations']
-            
-            # Promedio de confianza
-            cursor.execute('''
-                SELECT AVG(confidence) as avg_confidence
-                FROM conversations 
-                WHERE timestamp > ? AND confidence IS NOT NULL
-            ''', (since,))
-            avg_confidence = cursor.fetchone()['avg_confidence']
-            
-            # Idiomas más usados
-            cursor.execute('''
-                SELECT language, COUNT(*) as count
-                FROM conversations 
-                WHERE timestamp > ?
-                GROUP BY language
-                ORDER BY count DESC
-            ''', (since,))
-            languages = [dict(row) for row in cursor.fetchall()]
-            
-            # Sesiones activas
-            cursor.execute('''
-                SELECT COUNT(DISTINCT session_id) as active_sessions
-                FROM conversations 
-                WHERE timestamp > ?
-            ''', (since,))
-            active_sessions = cursor.fetchone()['active_sessions']
+        # Mismo reloj (UTC) y formato que CURRENT_TIMESTAMP
+        since = utc_cutoff(hours / 24)
+        first_hour, first_day = window_buckets(since)
+        groups = []
+        sketch = SessionSketch()
+        
+        with self._read_connection() as conn:
+            # Una sola instantánea: marca de agua, agregados y filas en vivo coherentes entre sí
+            began = not conn.in_transaction
+            if began:
+                conn.execute('BEGIN')
+            try:
+                last_id = self._rollup_watermark(conn)
+                max_id = conn.execute('SELECT MAX(id) FROM conversations').fetchone()[0] or 0
+                # Con la marca de agua al día la cola es un rango corto de id; muy
+                # retrasada (p. ej. antes del primer refresh) se acota por fecha
+                tail = 'id > ? AND timestamp > ?' if max_id - last_id <= _ROLLUP_TAIL_BY_ID_MAX \
+                    else '+id > ? AND timestamp > ?'
+                
+                for row in conn.execute('''
+                    SELECT * FROM conversation_rollups
+                    WHERE (granularity = 'hour' AND bucket >= ? AND bucket < ?)
+                    OR (granularity = 'day' AND bucket >= ?)
+                ''', (first_hour, f'{first_day} 00:00:00', first_day)):
+                    groups.append((row['language'], row['intent'], RollupTotals.from_row(row)))
+                for row in conn.execute('''
+                    SELECT sketch FROM session_rollups
+                    WHERE (granularity = 'hour' AND bucket >= ? AND bucket < ?)
+                    OR (granularity = 'day' AND bucket >= ?)
+                ''', (first_hour, f'{first_day} 00:00:00', first_day)):
+                    sketch.merge(row['sketch'])
+                
+                # Primera hora incompleta (ya agregada) y filas posteriores a la marca de agua
+                for where, params in (('timestamp > ? AND timestamp < ? AND id <= ?', (since, first_hour, last_id)),
+                                      (tail, (last_id, since))):
+                    for row in conn.execute(f'''
+                        SELECT {LIVE_TOTALS_SQL} FROM conversations
+                        WHERE {where} GROUP BY 1, 2
+                    ''', params):
+                        groups.append((row['language'], row['intent'], RollupTotals.from_row(row)))
+                    for row in conn.execute(f'SELECT DISTINCT +session_id FROM conversations WHERE {where}', params):
+                        sketch.add(row[0])
+            finally:
+                if began:
+                    conn.commit()
+        
+        return summarize(groups, sketch, hours)
+    
+    def refresh_rollups(self, batch_size: int = 5000, max_batches: int = None) -> int:
+        """
+        Incorpora a los agregados las conversaciones nuevas
+        
+        Avanza por id desde la marca de agua `rollup_last_id` (schema_meta):
+        cada lote se lee con una conexión de lectura y se suma a sus filas de
+        conversation_rollups y session_rollups en una transacción corta
+        (BEGIN IMMEDIATE), junto con la nueva marca de agua. Si dentro de esa
+        transacción la marca de agua ya no es la leída, otro proceso agregó
+        el lote y se descarta.
+        
+        Args:
+            batch_size: Conversaciones por lote
+            max_batches: Lotes máximos (None = hasta ponerse al día)
             
-            return {
-                'total_conversations': total_conversations,
-                'average_confidence': avg_confidence,
-                'languages_usage': languages,
-                'active_sessions': active_sessions,
-                'period_hours': hours
-            }
+        Returns:
+            Número de conversaciones agregadas
+        """
+        processed = 0
+        batches = 0
+        with self._rollup_lock:
+            while max_batches is None or batches < max_batches:
+                with self._read_connection() as conn:
+                    last_id = self._rollup_watermark(conn)
+                    rows = conn.execute('''
+                        SELECT id, session_id, timestamp, language, intent, confidence, response_time
+                        FROM conversations WHERE id > ? ORDER BY id LIMIT ?
+                    ''', (last_id, int(batch_size))).fetchall()
+                if not rows:
+                    break
+                
+                accumulator = RollupAccumulator()
+                for row in rows:
+                    accumulator.add(row)
+                
+                with self._get_connection() as conn:
+                    if not conn.in_transaction:
+                        conn.execute('BEGIN IMMEDIATE')
+                    # Otra instancia sobre el mismo archivo pudo agregar el lote
+                    # entre la lectura y este bloqueo: se descarta y se relee
+                    if self._rollup_watermark(conn) != last_id:
+                        continue
+                    for key, totals in accumulator.groups.items():
+                        current = conn.execute('''
+                            SELECT * FROM conversation_rollups
+                            WHERE granularity = ? AND bucket = ? AND language = ? AND intent = ?
+                        ''', key).fetchone()
+                        if current:
+                            merged = RollupTotals.from_row(current)
+                            merged.merge(totals)
+                            totals = merged
+                        conn.execute('INSERT OR REPLACE INTO conversation_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (*key, *totals.to_row()))
+                    for key, sessions in accumulator.sessions.items():
+                        current = conn.execute('SELECT sketch FROM session_rollups WHERE granularity = ? AND bucket = ?',
+                                            key).fetchone()
+                        if current:
+                            sessions.merge(current['sketch'])
+                        conn.execute('INSERT OR REPLACE INTO session_rollups VALUES (?, ?, ?)',
+                                    (*key, sessions.to_bytes()))
+                    conn.execute("INSERT OR REPLACE INTO schema_meta (key, value) VALUES ('rollup_last_id', ?)",
+                                (str(rows[-1]['id']),))
+                
+                processed += len(rows)
+                batches += 1
+                if len(rows) < batch_size:
+                    break
+        return processed
     
-    def cleanup_old_data(self, days_to_keep: int = 30):
+    @staticmethod
+    def _rollup_watermark(conn) -> int:
+        row = conn.execute("SELECT value FROM schema_meta WHERE key = 'rollup_last_id'").fetchone()
+        return int(row[0]) if row else 0
+    
+    def cleanup_old_data(self, days_to_keep: int = 30, batch_size: int = 500):
         """
         Limpia datos antiguos de la base de datos
         
+        Las conversaciones se archivan antes de borrarse si hay archivo
+        configurado. Todo se borra por lotes de `batch_size` filas, cada uno
+        en su propia transacción, para no bloquear las escrituras del chat.
+        
         Args:
             days_to_keep: Días de datos a mantener
+            batch_size: Filas por transacción
         """
-        cutoff_dt = datetime.now() - timedelta(days=days_to_keep)
-        cutoff_str = cutoff_dt.strftime("%Y-%m-%d %H:%M:%S")
+        cutoff_str = utc_cutoff(days_to_keep)
         
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Limpiar conversaciones antiguas
-            cursor.execute('''
-                DELETE FROM conversations 
-                WHERE timestamp < ?
-            ''', (cutoff_str,))
-            
-            conversations_deleted = cursor.rowcount
-            
-            # Limpiar métricas antiguas
-            cursor.execute('''
-                DELETE FROM metrics 
-                WHERE timestamp < ?
-            ''', (cutoff_str,))
-            
-            metrics_deleted = cursor.rowcount
-            
-            # Limpiar sesiones inactivas
-            cursor.execute('''
-                DELETE FROM sessions 
-                WHERE last_activity < ?
-            ''', (cutoff_str,))
-            
-            sessions_deleted = cursor.rowcount
-            
-            conn.commit()
-            
-            self.logger.info(f"Limpieza completada: {conversations_deleted} conversaciones, "
-                        f"{metrics_deleted} métricas, {sessions_deleted} sesiones eliminadas")
+        def drain(batch) -> int:
+            total = 0
+            while True:
+                rows = batch()
+                total += rows
+                if rows < batch_size:
+                    return total
+        
+        conversations_deleted = drain(lambda: self.archive_conversations_batch(batch_size, before=cutoff_str))
+        metrics_deleted = drain(lambda: self.delete_old_rows_batch('metrics', cutoff_str, batch_size))
+        sessions_deleted = drain(lambda: self.delete_old_rows_batch('sessions', cutoff_str, batch_size))
+        
+        self.logger.info(f"Limpieza completada: {conversations_deleted} conversaciones"
+                    f"{' (archivadas)' if self.archive else ''}, "
+                    f"{metrics_deleted} métricas, {sessions_deleted} sesiones eliminadas")
+        
+        return {
+            'conversations_deleted': conversations_deleted,
+            'metrics_deleted': metrics_deleted,
+            'sessions_deleted': sessions_deleted
+        }
+    
+    def archive_conversations_batch(self, limit: int = 500, before: str = None) -> int:
+        """
+        Archiva y borra las `limit` conversaciones más antiguas
+        
+        Lee el lote con una conexión de lectura, lo añade al archivo (si
+        está configurado) y lo borra en una transacción corta: el bloqueo de
+        escritura solo se toma para el DELETE.
+        
+        Args:
+            limit: Filas del lote
+            before: Solo conversaciones anteriores a esta fecha UTC (None = las más antiguas)
             
-            return {
-                'conversations_deleted': conversations_deleted,
-                'metrics_deleted': metrics_deleted,
-                'sessions_deleted': sessions_deleted
-            }
+        Returns:
+            Número de conversaciones retiradas
+        """
+        # Lo que sale de la tabla debe estar ya en los agregados
+        self.refresh_rollups()
+        where = 'WHERE timestamp < ?' if before else ''
+        params = [before] if before else []
+        with self._read_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT * FROM conversations {where}
+                ORDER BY timestamp, id
+                LIMIT ?
+            ''', [*params, int(limit)]).fetchall()
+        if not rows:
+            return 0
+        rows = [dict(row) for row in rows]
+        if self.archive is not None:
+            self.archive.append(rows)
+        with self._get_connection() as conn:
+            conn.execute('DELETE FROM conversations WHERE id IN (SELECT value FROM json_each(?))',
+                        (json.dumps([row['id'] for row in rows]),))
+        return len(rows)
     
-    def get_database_stats(self) -> Dict[str, Any]:
-        """Obtiene estadísticas generales de la base de datos"""
+    def delete_old_rows_batch(self, table: str, before: str, limit: int = 500) -> int:
+        """
+        Borra como mucho `limit` filas de `metrics` o `sessions` anteriores a `before`
+        
+        Returns:
+            Número de filas eliminadas
+        """
+        column = _RETENTION_DATE_COLUMNS[table]
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            stats = {}
-            
-            # Total de registros por tabla
-            tables = ['conversations', 'sessions', 'learning_data', 'metrics']
-            for table in tables:
-                cursor.execute(f'SELECT COUNT(*) as count FROM {table}')
-                stats[f'total_{table}'] = cursor.fetchone()['count']
-            
-            # Tamaño de la base de datos
-            stats['database_size_bytes'] = self.db_path.stat().st_size if self.db_path.exists() else 0
-            
-            # Fecha del primer registro
-            cursor.execute('''
-                SELECT MIN(timestamp) as first_conversation
-                FROM conversations
-            ''')
-            first_conv = cursor.fetchone()['first_conversation']
-            stats['first_conversation'] = first_conv
-            
-            return stats
+            cursor = conn.execute(f'''
+                DELETE FROM {table} WHERE rowid IN (
+                    SELECT rowid FROM {table}
+                    WHERE {column} < ?
+                    ORDER BY {column}
+                    LIMIT ?
+                )
+            ''', (before, int(limit)))
+            return cursor.rowcount
+    
+    def count_conversations(self) -> int:
+        """Número de conversaciones en la base de datos (sin contar el archivo)"""
+        return self.get_table_counts()['conversations']
+    
+    def get_database_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas generales de la base de datos
+        
+        Solo recuentos, tamaños y la primera fecha (el estado interno está en
+        `get_operational_stats`). Los totales salen de table_counters y la
+        primera fecha del índice de timestamp, así que el coste no depende
+        del tamaño de las tablas. Con
+        `stats_cache_seconds` se devuelve la misma instantánea durante ese
+        tiempo (un solo hilo la recalcula al caducar).
+        """
+        if self.stats_cache_seconds <= 0:
+            return self._compute_database_stats()
+        with self._stats_lock:
+            now = time.monotonic()
+            if self._stats_cache is None or now >= self._stats_cache[0]:
+                self._stats_cache = (now + self.stats_cache_seconds, self._compute_database_stats())
+            return dict(self._stats_cache[1])
+    
+    def _compute_database_stats(self) -> Dict[str, Any]:
+        stats = {}
+        
+        # Total de registros por tabla
+        for table, count in self.get_table_counts().items():
+            stats[f'total_{table}'] = count
+        
+        # Tamaño de la base de datos (el WAL aún no volcado va aparte)
+        stats['database_size_bytes'] = self.db_path.stat().st_size if self.db_path.exists() else 0
+        wal_path = self.db_path.with_name(self.db_path.name + '-wal')
+        stats['wal_size_bytes'] = wal_path.stat().st_size if wal_path.exists() else 0
+        
+        # Fecha del primer registro (extremo de idx_conversations_timestamp)
+        with self._read_connection() as conn:
+            stats['first_conversation'] = conn.execute(
+                'SELECT MIN(timestamp) FROM conversations').fetchone()[0]
+        
+        return stats
+    
+    def get_operational_stats(self) -> Dict[str, Any]:
+        """
+        Estado interno para administración: pool de conexiones, escritura
+        diferida, tareas de mantenimiento y archivo (incluye rutas locales,
+        no debe servirse sin autenticación)
+        """
+        stats = {'pool': self.pool.stats()}
+        if self.write_behind is not None:
+            stats['write_behind'] = self.write_behind.stats()
+        if self.context_sweeper is not None:
+            stats['context_sweeper'] = self.context_sweeper.stats()
+        if self.retention is not None:
+            stats['retention'] = self.retention.stats()
+        if self.rollup_refresher is not None:
+            stats['rollups'] = self.rollup_refresher.stats()
+        if self.archive is not None:
+            stats['archive'] = self.archive.stats()
+        return stats
     
     def backup_database(self, backup_path: str = None) -> str:
         """
@@ -689,7 +1432,7 @@ class ConversationDB:
         backup_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Realizar backup usando SQLite
-        with self._get_connection() as source_conn:
+        with self._read_connection() as source_conn:
             with sqlite3.connect(backup_path) as backup_conn:
                 source_conn.backup(backup_conn)
         
@@ -697,41 +1440,70 @@ class ConversationDB:
         return str(backup_path)
     
     def search_conversations(self, query: str, session_id: str = None, 
-                        language: str = None, limit: int = 50) -> List[Dict]:
+                        language: str = None, limit: int = 50, order: str = 'rank',
+                        include_archived: bool = False) -> List[Dict]:
         """
         Busca conversaciones por texto
         
+        Con el índice FTS5, cada palabra de la consulta se busca como prefijo
+        (sin distinguir tildes ni mayúsculas) y los resultados se ordenan por
+        relevancia bm25; cada fila incluye `rank` y fragmentos resaltados
+        (`input_snippet`, `response_snippet`). Sin FTS5 se usa LIKE.
+        
         Args:
             query: Texto a buscar
             session_id: Filtrar por sesión específica
             language: Filtrar por idioma
             limit: Máximo número de resultados
+            order: 'rank' (relevancia) o 'recent' (más recientes primero)
+            include_archived: Completar hasta `limit` con el archivo (marcadas `archived`)
             
         Returns:
             Lista de conversaciones que coinciden
         """
-        with self._get_connection() as conn:
+        match = _fts_query(query) if self.fts_enabled else None
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             
-            sql = '''
-                SELECT * FROM conversations 
-                WHERE (user_input LIKE ? OR bot_response LIKE ?)
-            '''
-            params = [f'%{query}%', f'%{query}%']
+            if match:
+                sql = f'''
+                    SELECT c.*, bm25(conversations_fts, {_FTS_WEIGHTS}) AS rank,
+                        snippet(conversations_fts, 0, '[', ']', '…', 12) AS input_snippet,
+                        snippet(conversations_fts, 1, '[', ']', '…', 12) AS response_snippet
+                    FROM conversations_fts
+                    JOIN conversations c ON c.id = conversations_fts.rowid
+                    WHERE conversations_fts MATCH ?
+                '''
+                params = [match]
+                prefix = 'c.'
+            else:
+                sql = '''
+                    SELECT * FROM conversations 
+                    WHERE (user_input LIKE ? OR bot_response LIKE ?)
+                '''
+                params = [f'%{query}%', f'%{query}%']
+                prefix = ''
             
             if session_id:
-                sql += ' AND session_id = ?'
+                sql += f' AND {prefix}session_id = ?'
                 params.append(session_id)
             
             if language:
-                sql += ' AND language = ?'
+                sql += f' AND {prefix}language = ?'
                 params.append(language)
             
-            sql += ' ORDER BY timestamp DESC LIMIT ?'
+            if match and order == 'rank':
+                sql += ' ORDER BY rank LIMIT ?'
+            else:
+                sql += f' ORDER BY {prefix}timestamp DESC, {prefix}id DESC LIMIT ?'
             params.append(limit)
             
             cursor.execute(sql, params)
-            return [dict(row) for row in cursor.fetchall()]
+            results = [dict(row) for row in cursor.fetchall()]
+        
+        if include_archived and self.archive is not None and len(results) < limit:
+            results += self.archive.search(query, session_id, language, limit - len(results))
+        return results
     
     def get_context_for_session(self, session_id: str, messages_back: int = 5) -> List[Dict]:
         """
@@ -744,7 +1516,7 @@ class ConversationDB:
         Returns:
             Lista de mensajes de contexto
         """
-        with self._get_connection() as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -758,7 +1530,19 @@ class ConversationDB:
             results = cursor.fetchall()
             return [dict(row) for row in reversed(results)]
     
+    def health_check(self) -> Dict[str, Any]:
+        """Comprueba que el escritor y los lectores responden"""
+        return self.pool.health_check()
+
     def close(self):
-        """Cierra la conexión a la base de datos"""
-        # En este caso, usamos context managers, así que no hay conexión persistente
+        """Escribe los turnos pendientes y cierra las conexiones del pool"""
+        if self.context_sweeper is not None:
+            self.context_sweeper.stop()
+        if self.retention is not None:
+            self.retention.stop()
+        if self.rollup_refresher is not None:
+            self.rollup_refresher.stop()
+        if self.write_behind is not None:
+            self.write_behind.close()
+        self.pool.close()
         self.logger.info("Gestor de base de datos cerrado")
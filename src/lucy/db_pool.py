@@ -0,0 +1,304 @@
+"""
+Pool de Conexiones SQLite
+=========================
+
+`ConversationDB` abría y cerraba una conexión `sqlite3` por operación y la
+base de datos funcionaba en modo rollback-journal, donde los lectores
+bloquean al escritor y cada commit es un ciclo completo de journal + fsync.
+
+`SQLitePool` mantiene conexiones persistentes:
+
+- Lectores: cola LIFO de hasta `readers` conexiones que se crean bajo
+  demanda y se reutilizan (la más reciente primero, con la caché caliente).
+- Escritor: una única conexión dedicada protegida por un candado. SQLite
+  solo admite un escritor a la vez; serializarlo en el proceso evita
+  esperas por `SQLITE_BUSY`.
+
+Cada conexión se abre con los PRAGMA configurados (por defecto WAL,
+`synchronous=NORMAL`, caché de 16 MB, mmap de 256 MB y temporales en
+memoria). Las conexiones inactivas más de `health_check_seconds` se
+comprueban con `SELECT 1` antes de reutilizarse y se reabren si fallan.
+`close()` espera al escritor, hace checkpoint del WAL y cierra todo.
+
+Con `enabled: false` se conserva el comportamiento anterior (una conexión
+nueva por operación), útil como referencia en el benchmark.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from .logging_system import get_logger
+
+# PRAGMA aplicados a cada conexión (database.pragmas en config.json)
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY'
+}
+
+# Valores admitidos por los PRAGMA de texto (evita inyectar SQL desde la config)
+_PRAGMA_CHOICES = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'}
+}
+_INTEGER_PRAGMAS = {'cache_size', 'mmap_size', 'busy_timeout', 'wal_autocheckpoint'}
+
+
+def _pragma_statement(name: str, value: Any) -> str:
+    """Construye `PRAGMA name=value` validando nombre y valor"""
+    if name in _PRAGMA_CHOICES:
+        value = str(value).upper()
+        if value not in _PRAGMA_CHOICES[name]:
+            raise ValueError(f"Valor no válido para PRAGMA {name}: {value}")
+        return f'PRAGMA {name}={value}'
+    if name in _INTEGER_PRAGMAS:
+        return f'PRAGMA {name}={int(value)}'
+    raise ValueError(f"PRAGMA no soportado: {name}")
+
+
+class SQLitePool:
+    """Conexiones persistentes: varios lectores y un escritor dedicado"""
+
+    def __init__(self, db_path: Union[str, Path], readers: int = 4, timeout: float = 30.0,
+                pragmas: Optional[Dict[str, Any]] = None, health_check_seconds: float = 60.0,
+                enabled: bool = True):
+        """
+        Args:
+            db_path: Ruta al archivo SQLite (':memory:' comparte el escritor)
+            readers: Conexiones de lectura máximas
+            timeout: Segundos de espera por un bloqueo o un lector libre
+            pragmas: PRAGMA por conexión (None usa DEFAULT_PRAGMAS)
+            health_check_seconds: Inactividad tras la que se comprueba una conexión
+            enabled: False abre una conexión nueva por operación (modo anterior)
+        """
+        self.db_path = str(db_path)
+        self.memory = self.db_path == ':memory:'
+        self.enabled = bool(enabled) or self.memory
+        # Una base en memoria solo existe en su conexión: todo pasa por el escritor
+        self.readers = 0 if self.memory else max(0, int(readers))
+        self.timeout = float(timeout)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.health_check_seconds = float(health_check_seconds)
+        self.logger = get_logger(__name__)
+
+        self._idle: 'queue.LifoQueue[Tuple[sqlite3.Connection, float]]' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_used = 0.0
+        self._writer_lock = threading.RLock()
+        self._writer_depth = 0
+        self._closed = False
+        self._stats = {'reads': 0, 'writes': 0, 'read_waits': 0, 'reconnects': 0, 'discarded': 0,
+                    'connections_opened': 0}
+        self.journal_mode: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Conexiones
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            if value is None:
+                continue
+            row = conn.execute(_pragma_statement(name, value)).fetchone()
+            if name == 'journal_mode' and row is not None:
+                self.journal_mode = str(row[0]).upper()
+                if self.journal_mode != str(value).upper():
+                    self.logger.warning(f"[WARN] journal_mode={value} no disponible, se usa {self.journal_mode}")
+        with self._lock:
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checked(self, conn: sqlite3.Connection, last_used: float) -> sqlite3.Connection:
+        """Reabre la conexión si lleva inactiva demasiado tiempo y no responde"""
+        if time.monotonic() - last_used < self.health_check_seconds or self._healthy(conn):
+            return conn
+        self.logger.warning("[WARN] Conexión SQLite no responde; se reabre")
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._stats['reconnects'] += 1
+        return self._connect()
+
+    def _ensure_open(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            conn, last_used = self._idle.get_nowait()
+            return self._checked(conn, last_used)
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.readers
+            if create:
+                self._created += 1
+            else:
+                self._stats['read_waits'] += 1
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            conn, last_used = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Sin conexiones de lectura libres tras {self.timeout:.0f}s")
+        return self._checked(conn, last_used)
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Conexión de solo lectura prestada del pool"""
+        self._ensure_open()
+        if not self.enabled:
+            with self._transient() as conn:
+                yield conn
+            return
+        if not self.readers:
+            with self.writer() as conn:
+                yield conn
+            return
+        conn = self._acquire_reader()
+        with self._lock:
+            self._stats['reads'] += 1
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    def _release_reader(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Conexión inutilizable: se descarta y el hueco queda libre
+            with self._lock:
+                self._created -= 1
+                self._stats['discarded'] += 1
+            return
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Conexión del escritor único
+
+        Al salir del bloque más externo se hace commit (o rollback si hubo
+        una excepción), de modo que ninguna transacción queda abierta en la
+        conexión compartida.
+        """
+        self._ensure_open()
+        if not self.enabled:
+            with self._transient() as conn:
+                yield conn
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            elif self._writer_depth == 0:
+                self._writer = self._checked(self._writer, self._writer_used)
+            conn = self._writer
+            self._writer_depth += 1
+            try:
+                yield conn
+                if self._writer_depth == 1 and conn.in_transaction:
+                    conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                self._writer_depth -= 1
+                self._writer_used = time.monotonic()
+                with self._lock:
+                    self._stats['writes'] += 1
+
+    @contextmanager
+    def _transient(self) -> Iterator[sqlite3.Connection]:
+        """Conexión de un solo uso (pool desactivado)"""
+        conn = self._connect()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Estado y cierre
+    # ------------------------------------------------------------------
+    def health_check(self) -> Dict[str, Any]:
+        """Comprueba el escritor y una conexión de lectura"""
+        result: Dict[str, Any] = {'ok': False, 'journal_mode': self.journal_mode, 'closed': self._closed}
+        if self._closed:
+            return result
+        try:
+            with self.writer() as conn:
+                writer_ok = self._healthy(conn)
+            with self.reader() as conn:
+                reader_ok = self._healthy(conn)
+        except sqlite3.Error as e:
+            result['error'] = str(e)
+            return result
+        result.update(ok=writer_ok and reader_ok, writer=writer_ok, reader=reader_ok,
+                    journal_mode=self.journal_mode)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(readers=self.readers, open_readers=self._created, idle_readers=self._idle.qsize())
+        stats.update(enabled=self.enabled, journal_mode=self.journal_mode)
+        return stats
+
+    def close(self):
+        """Espera al escritor, hace checkpoint del WAL y cierra las conexiones"""
+        if self._closed:
+            return
+        with self._writer_lock:
+            self._closed = True
+            if self._writer is not None:
+                try:
+                    if self.journal_mode == 'WAL':
+                        self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                    self._writer.execute('PRAGMA optimize')
+                except sqlite3.Error as e:
+                    self.logger.warning(f"[WARN] Checkpoint al cerrar falló: {e}")
+                self._writer.close()
+                self._writer = None
+        # Los lectores prestados se cierran al devolverse
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
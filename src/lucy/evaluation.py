@@ -0,0 +1,341 @@
+"""
+Evaluación del Modelo de Lucy AI
+================================
+
+Métricas de clasificación vectorizadas (precisión/recall por clase,
+histogramas de confianza), validación cruzada estratificada en K folds
+ejecutados en procesos paralelos sobre un único dataset preprocesado y
+comparación de espacios de características (vocabulario frente a hashing).
+"""
+
+import copy
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+
+def classification_metrics(y_true: np.ndarray, probs: np.ndarray,
+                        n_classes: Optional[int] = None, bins: int = 10) -> Dict[str, Any]:
+    """
+    Calcula métricas de clasificación sin bucles por muestra
+
+    Args:
+        y_true: Etiquetas one-hot o índices de clase
+        probs: Probabilidades por clase (salida del modelo)
+        n_classes: Número de clases (por defecto probs.shape[1])
+        bins: Número de intervalos de los histogramas de confianza en [0, 1]
+
+    Returns:
+        Diccionario con accuracy, matriz de confusión, precisión/recall/soporte
+        por clase y histogramas de confianza (global, aciertos, fallos y por clase)
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    y_true = np.asarray(y_true)
+    if y_true.ndim == 2:
+        y_true = np.argmax(y_true, axis=1)
+    n_classes = int(n_classes or probs.shape[1])
+
+    predicted = np.argmax(probs, axis=1)
+    confidence = probs[np.arange(len(probs)), predicted]
+    correct = predicted == y_true
+
+    # Matriz de confusión [verdadera, predicha] en una sola pasada
+    confusion = np.bincount(y_true * n_classes + predicted,
+                            minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+    # Histogramas de confianza; la clase de cada muestra es la predicha
+    bin_index = np.minimum((confidence * bins).astype(int), bins - 1)
+    per_class_hist = np.bincount(predicted * bins + bin_index,
+                                minlength=n_classes * bins).reshape(n_classes, bins)
+    correct_hist = np.bincount(bin_index[correct], minlength=bins)
+    incorrect_hist = np.bincount(bin_index[~correct], minlength=bins)
+
+    metrics = {
+        'samples': int(len(y_true)),
+        'accuracy': float(correct.mean()) if len(y_true) else 0.0,
+        'average_confidence': float(confidence.mean()) if len(y_true) else 0.0,
+        'confusion_matrix': confusion,
+        'confidence_bins': np.linspace(0.0, 1.0, bins + 1),
+        'confidence_histogram': correct_hist + incorrect_hist,
+        'confidence_histogram_correct': correct_hist,
+        'confidence_histogram_incorrect': incorrect_hist,
+        'confidence_histogram_per_class': per_class_hist
+    }
+    metrics.update(_per_class_scores(confusion))
+    return metrics
+
+
+def _per_class_scores(confusion: np.ndarray) -> Dict[str, Any]:
+    """Precisión, recall y soporte por clase a partir de la matriz de confusión"""
+    true_positives = np.diag(confusion).astype(np.float64)
+    predicted_totals = confusion.sum(axis=0)
+    support = confusion.sum(axis=1)
+    precision = np.divide(true_positives, predicted_totals,
+                        out=np.zeros_like(true_positives), where=predicted_totals > 0)
+    recall = np.divide(true_positives, support,
+                    out=np.zeros_like(true_positives), where=support > 0)
+    present = support > 0
+    return {
+        'precision': precision,
+        'recall': recall,
+        'support': support,
+        'macro_precision': float(precision[present].mean()) if present.any() else 0.0,
+        'macro_recall': float(recall[present].mean()) if present.any() else 0.0
+    }
+
+
+def aggregate_folds(fold_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Agrega las métricas de varios folds
+
+    Las métricas por clase se recalculan sobre la suma de matrices de
+    confusión (equivalente a evaluar todas las predicciones fuera de fold).
+    """
+    accuracies = np.array([m['accuracy'] for m in fold_metrics])
+    confusion = np.sum([m['confusion_matrix'] for m in fold_metrics], axis=0)
+    aggregate = {
+        'folds': len(fold_metrics),
+        'accuracy_mean': float(accuracies.mean()),
+        'accuracy_std': float(accuracies.std()),
+        'accuracy_min': float(accuracies.min()),
+        'macro_precision_mean': float(np.mean([m['macro_precision'] for m in fold_metrics])),
+        'macro_recall_mean': float(np.mean([m['macro_recall'] for m in fold_metrics])),
+        'confusion_matrix': confusion,
+        'confidence_bins': fold_metrics[0]['confidence_bins'],
+        'confidence_histogram_correct': np.sum(
+            [m['confidence_histogram_correct'] for m in fold_metrics], axis=0),
+        'confidence_histogram_incorrect': np.sum(
+            [m['confidence_histogram_incorrect'] for m in fold_metrics], axis=0),
+        'confidence_histogram_per_class': np.sum(
+            [m['confidence_histogram_per_class'] for m in fold_metrics], axis=0)
+    }
+    aggregate.update(_per_class_scores(confusion))
+    return aggregate
+
+
+def _run_fold(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Entrena y evalúa un fold (se ejecuta en un proceso hijo)
+
+    El dataset se abre con memory-map desde los .npy compartidos, de modo que
+    los procesos no copian ni vuelven a preprocesar los datos. Una X dispersa
+    se comparte como .npz (CSR) y se carga entera: ocupa lo que sus tokens.
+    """
+    from .config_manager import ConfigManager
+    from .training import LucyTrainer
+
+    if task['x_path'].endswith('.npz'):
+        x = sparse.load_npz(task['x_path']).tocsr()
+    else:
+        x = np.load(task['x_path'], mmap_mode='r')
+    y = np.load(task['y_path'], mmap_mode='r')
+    train_idx = np.asarray(task['train_idx'])
+    test_idx = np.asarray(task['test_idx'])
+
+    trainer = LucyTrainer(ConfigManager(config_path=task['config_path'], auto_reload=False))
+    trainer.seed = task['seed']
+    trainer._set_global_seeds()
+
+    train_x, train_y = x[train_idx], np.asarray(y[train_idx])
+    test_x, test_y = x[test_idx], np.asarray(y[test_idx])
+    if not sparse.issparse(x):
+        train_x, test_x = np.asarray(train_x), np.asarray(test_x)
+
+    start = time.perf_counter()
+    model = trainer.create_model(train_x.shape[1], train_y.shape[1])
+    results = trainer.train_model(model, train_x, train_y, (test_x, test_y))
+    probs = model.predict(test_x, verbose=0)
+
+    metrics = classification_metrics(test_y, probs, train_y.shape[1], task['bins'])
+    metrics.update({
+        'fold': task['fold'],
+        'train_samples': int(len(train_idx)),
+        'epochs_completed': results['epochs_completed'],
+        'final_train_loss': float(results['final_loss']),
+        'seconds': time.perf_counter() - start
+    })
+    return metrics
+
+
+def run_cross_validation(trainer: Any, x: np.ndarray, y: np.ndarray, folds: int = 5,
+                        workers: Optional[int] = None, bins: int = 10) -> Dict[str, Any]:
+    """
+    Ejecuta validación cruzada estratificada en procesos paralelos
+
+    Args:
+        trainer: `LucyTrainer` con los hiperparámetros a evaluar
+        x: Datos de entrada preprocesados
+        y: Etiquetas one-hot
+        folds: Número de folds (K >= 2)
+        workers: Procesos en paralelo (None/0 = min(K, CPUs))
+        bins: Intervalos de los histogramas de confianza
+
+    Returns:
+        Reporte con métricas por fold y agregadas
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    if folds < 2:
+        raise ValueError("La validación cruzada requiere al menos 2 folds")
+    labels = np.argmax(y, axis=1)
+    workers = int(workers or min(folds, os.cpu_count() or 1))
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=trainer.seed)
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='lucy_cv_') as tmp:
+        tmp_dir = Path(tmp)
+        y_path = tmp_dir / 'y.npy'
+        if sparse.issparse(x):
+            x_path = tmp_dir / 'x.npz'
+            sparse.save_npz(x_path, sparse.csr_matrix(x, dtype=np.float32))
+        else:
+            x_path = tmp_dir / 'x.npy'
+            np.save(x_path, np.asarray(x, dtype=np.float32))
+        np.save(y_path, np.asarray(y, dtype=np.float32))
+
+        # Configuración efectiva del entrenador (incluye overrides de CLI);
+        # los folds no escriben checkpoints ni CSV para no pisarse entre sí
+        config = copy.deepcopy(trainer.config_manager.get_all())
+        config.setdefault('model', {}).update(training_epochs=trainer.epochs,
+                                            batch_size=trainer.batch_size,
+                                            dropout_rate=trainer.dropout_rate)
+        config.setdefault('training', {}).update(backend=trainer.backend,
+                                                learning_rate=trainer.learning_rate,
+                                                input_pipeline=trainer.input_pipeline,
+                                                seed=trainer.seed,
+                                                save_checkpoints=False,
+                                                csv_logger=False)
+        config_path = tmp_dir / 'config.json'
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+        tasks = [
+            {
+                'fold': fold,
+                'train_idx': train_idx,
+                'test_idx': test_idx,
+                'x_path': str(x_path),
+                'y_path': str(y_path),
+                'config_path': str(config_path),
+                'seed': trainer.seed + fold,
+                'bins': bins
+            }
+            for fold, (train_idx, test_idx) in enumerate(splitter.split(np.zeros(len(labels)), labels))
+        ]
+
+        logger.info(f"🔀 Validación cruzada: {folds} folds en {workers} procesos")
+        if workers == 1:
+            fold_metrics = [_run_fold(task) for task in tasks]
+        else:
+            # 'spawn' evita heredar el estado de TensorFlow del proceso padre
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+                fold_metrics = list(pool.map(_run_fold, tasks))
+
+    fold_metrics.sort(key=lambda m: m['fold'])
+    return {
+        'folds': fold_metrics,
+        'aggregate': aggregate_folds(fold_metrics),
+        'workers': workers,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def _feature_matrix(documents: Sequence[Tuple[List[str], str]], features: Any,
+                    classes: Sequence[str], as_sparse: bool = True) -> Tuple[Any, np.ndarray]:
+    from .ingestion import iter_feature_batches, sparse_feature_matrix
+
+    if as_sparse:
+        x, labels = sparse_feature_matrix(documents, classes, features)
+        return x, np.eye(len(classes), dtype=np.float32)[labels]
+    batches = list(iter_feature_batches(documents, (), classes, features=features))
+    return np.concatenate([b[0] for b in batches]), np.concatenate([b[1] for b in batches])
+
+
+def compare_feature_spaces(trainer: Any, documents: Sequence[Tuple[List[str], str]],
+                        spaces: List[Any], latency_samples: int = 200) -> Dict[str, Any]:
+    """
+    Entrena y evalúa el mismo split con distintos espacios de características
+
+    Todos los espacios comparten documentos ya lematizados, partición
+    estratificada y semilla, de modo que las diferencias se deben solo a la
+    representación de entrada.
+
+    Args:
+        trainer: `LucyTrainer` con vocabulario y clases cargados
+        documents: Documentos (tokens lematizados, tag)
+        spaces: Configuraciones de `training.features` o espacios ya construidos
+        latency_samples: Mensajes de validación usados para medir la latencia
+
+    Returns:
+        Accuracy de validación, parámetros y latencia por mensaje
+        (vectorizar + predecir) de cada espacio
+    """
+    from sklearn.model_selection import train_test_split
+
+    from .features import build_features
+
+    labels = [trainer.classes.index(tag) for _, tag in documents]
+    indices = np.arange(len(documents))
+    test_size = trainer.validation_split or 0.2
+    try:
+        train_idx, val_idx = train_test_split(indices, test_size=test_size,
+                                            random_state=trainer.seed, stratify=labels)
+    except ValueError:
+        train_idx, val_idx = train_test_split(indices, test_size=test_size, random_state=trainer.seed)
+    probe = [documents[i][0] for i in val_idx[:latency_samples]]
+
+    results = []
+    for space in spaces:
+        features = build_features(space, trainer.words) if isinstance(space, dict) else space
+        x, y = _feature_matrix(documents, features, trainer.classes, trainer.sparse_inputs)
+        trainer._set_global_seeds()
+
+        start = time.perf_counter()
+        model = trainer.create_model(x.shape[1], y.shape[1])
+        trainer.train_model(model, x[train_idx], y[train_idx])
+        train_seconds = time.perf_counter() - start
+
+        metrics = classification_metrics(y[val_idx], model.predict(x[val_idx], verbose=0), y.shape[1])
+
+        # Latencia de servicio: un mensaje cada vez, como en LucyAI
+        predict_active = getattr(model, 'predict_active', None)
+        timings = []
+        for tokens in probe:
+            tick = time.perf_counter()
+            if predict_active is not None:
+                predict_active(*features.indices(tokens))
+            else:
+                model.predict(features.transform(tokens)[np.newaxis, :], verbose=0)
+            timings.append(time.perf_counter() - tick)
+        timings = np.asarray(timings or [0.0]) * 1e6
+
+        results.append({
+            'features': features.to_metadata(),
+            'input_size': features.size,
+            'parameters': int(model.count_params()),
+            'accuracy': metrics['accuracy'],
+            'macro_recall': metrics['macro_recall'],
+            'latency_us_mean': float(np.mean(timings)),
+            'latency_us_p95': float(np.percentile(timings, 95)),
+            'train_seconds': train_seconds
+        })
+        logger.info(f"📐 {features.mode} ({features.size}): accuracy {metrics['accuracy']:.4f}, "
+                    f"{results[-1]['parameters']} parámetros, "
+                    f"{results[-1]['latency_us_mean']:.0f} µs/mensaje")
+
+    return {
+        'train_samples': int(len(train_idx)),
+        'validation_samples': int(len(val_idx)),
+        'spaces': results
+    }
@@ -0,0 +1,186 @@
+"""
+Exportación de Conversaciones
+=============================
+
+Exportación en streaming de la tabla `conversations` a partir de
+`ConversationDB.iter_conversations` (paginación por clave sobre
+(timestamp, id)): la memoria es constante sea cual sea el tamaño del
+histórico.
+
+Formatos: JSONL y CSV, opcionalmente comprimidos con gzip y, con
+`chunk_rows`, repartidos en varios archivos (`conversations-00000.jsonl.gz`,
+...) acompañados de un `manifest.json`.
+
+Uso desde la línea de comandos:
+    python -m src.lucy.export --output export/ --format jsonl --gzip --chunk-rows 100000
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+FORMATS = ('jsonl', 'csv')
+
+# Columnas exportadas (mismo orden que iter_conversations)
+EXPORT_COLUMNS = ['id', 'session_id', 'timestamp', 'language', 'intent', 'confidence',
+                'response_time', 'user_input', 'bot_response', 'context']
+
+MEDIA_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _record(row: Dict[str, Any]) -> Dict[str, Any]:
+    record = {column: row.get(column) for column in EXPORT_COLUMNS}
+    # El contexto se guarda como JSON: exportarlo como objeto
+    if isinstance(record['context'], str):
+        try:
+            record['context'] = json.loads(record['context'])
+        except json.JSONDecodeError:
+            pass
+    return record
+
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def _header(fmt: str) -> str:
+    return _csv_line(EXPORT_COLUMNS) if fmt == 'csv' else ''
+
+
+def _line(row: Dict[str, Any], fmt: str) -> str:
+    record = _record(row)
+    if fmt == 'jsonl':
+        return json.dumps(record, ensure_ascii=False) + '\n'
+    if record['context'] is not None:
+        record['context'] = json.dumps(record['context'], ensure_ascii=False)
+    return _csv_line([record[column] for column in EXPORT_COLUMNS])
+
+
+def iter_lines(rows: Iterable[Dict[str, Any]], fmt: str = 'jsonl') -> Iterator[str]:
+    """Líneas del formato pedido (con cabecera en CSV), una por conversación"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (use {', '.join(FORMATS)})")
+    header = _header(fmt)
+    if header:
+        yield header
+    for row in rows:
+        yield _line(row, fmt)
+
+
+def iter_gzip(chunks: Iterable[str], batch_bytes: int = 65536) -> Iterator[bytes]:
+    """Comprime en streaming (formato gzip) agrupando en bloques de ~`batch_bytes`"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= batch_bytes:
+            out = compressor.compress(b''.join(pending))
+            pending, size = [], 0
+            if out:
+                yield out
+    yield compressor.compress(b''.join(pending)) + compressor.flush()
+
+
+def _open_output(path: Path, compress: bool):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def write_export(rows: Iterable[Dict[str, Any]], output: str, fmt: str = 'jsonl',
+                compress: bool = False, chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Escribe las filas en un archivo o, con `chunk_rows`, en varios
+
+    Args:
+        rows: Filas de `iter_conversations`
+        output: Archivo de salida (o directorio si se trocea)
+        fmt: 'jsonl' o 'csv'
+        compress: Comprimir con gzip
+        chunk_rows: Filas máximas por archivo (None = un único archivo)
+
+    Returns:
+        Resumen con filas exportadas y archivos escritos
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (use {', '.join(FORMATS)})")
+    output = Path(output)
+    suffix = f".{fmt}" + ('.gz' if compress else '')
+    files = []
+    current = None
+
+    def open_next():
+        path = output / f"conversations-{len(files):05d}{suffix}" if chunk_rows else output
+        files.append({'path': str(path), 'rows': 0})
+        f = _open_output(path, compress)
+        f.write(_header(fmt))
+        return f
+
+    try:
+        current = open_next()
+        for row in rows:
+            if chunk_rows and files[-1]['rows'] >= chunk_rows:
+                current.close()
+                current = open_next()
+            current.write(_line(row, fmt))
+            files[-1]['rows'] += 1
+    finally:
+        if current is not None:
+            current.close()
+
+    summary = {'format': fmt, 'compressed': compress, 'rows': sum(f['rows'] for f in files), 'files': files}
+    if chunk_rows:
+        manifest = dict(summary, created_at=datetime.now().isoformat())
+        (output / 'manifest.json').write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return summary
+
+
+def main():
+    """CLI: exporta las conversaciones de la base de datos configurada"""
+    from .config_manager import ConfigManager
+    from .database import ConversationDB, offline_settings
+
+    parser = argparse.ArgumentParser(description='Exportar conversaciones de Lucy AI')
+    parser.add_argument('--output', required=True, help='Archivo de salida (directorio con --chunk-rows)')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl', help='Formato de salida')
+    parser.add_argument('--gzip', action='store_true', help='Comprimir con gzip')
+    parser.add_argument('--chunk-rows', type=int, default=None, help='Filas máximas por archivo')
+    parser.add_argument('--session', default=None, help='Filtrar por sesión')
+    parser.add_argument('--language', default=None, help='Filtrar por idioma')
+    parser.add_argument('--intent', default=None, help='Filtrar por intención')
+    parser.add_argument('--since', default=None, help='Desde (UTC, YYYY-MM-DD[ HH:MM:SS], incluida)')
+    parser.add_argument('--until', default=None, help='Hasta (UTC, excluida)')
+    parser.add_argument('--page-size', type=int, default=1000, help='Filas por página de lectura')
+    parser.add_argument('--include-archived', action='store_true', help='Incluir las conversaciones archivadas')
+    parser.add_argument('--config', default=None, help='Ruta al archivo de configuración')
+    args = parser.parse_args()
+
+    config_manager = ConfigManager(args.config, auto_reload=False) if args.config else ConfigManager(auto_reload=False)
+    db_cfg = config_manager.get('database', {}) or {}
+    db_path = Path(db_cfg.get('path', 'data/conversations.db'))
+    if not db_path.is_absolute():
+        db_path = Path(config_manager.project_root) / db_path
+    db = ConversationDB(str(db_path), offline_settings(db_cfg))
+    try:
+        rows = db.iter_conversations(args.session, args.language, args.intent, args.since, args.until,
+                                    page_size=args.page_size, include_archived=args.include_archived)
+        summary = write_export(rows, args.output, args.format, args.gzip, args.chunk_rows)
+    finally:
+        db.close()
+    print(f"[OK] {summary['rows']} conversaciones exportadas en {len(summary['files'])} archivo(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Espacios de Características
+===========================
+
+Convierte los tokens normalizados de un mensaje en el vector de entrada del
+modelo. Dos modos:
+
+- `vocabulary` (por defecto): bolsa de palabras binaria sobre el vocabulario
+  exacto del entrenamiento; las palabras desconocidas se descartan.
+- `hashing`: truco del hashing con signo. Cada lema (y opcionalmente sus
+  n-gramas de caracteres) se asigna a uno de `buckets` cubos con CRC32; un
+  bit independiente del hash decide el signo, de modo que las colisiones
+  tienden a cancelarse. El tamaño del modelo y el coste por mensaje quedan
+  fijos aunque crezca el corpus y no hace falta cargar vocabulario.
+
+Ambos modos exponen `indices(tokens)` (índices activos y valores), que es lo
+que necesita una primera capa dispersa, y `transform(tokens)` (vector denso).
+La configuración se guarda en los metadatos del bundle (`features`).
+
+El vocabulario puede podarse antes de entrenar (`prune_vocabulary`):
+frecuencia documental mínima, tamaño máximo y selección por chi² o
+información mutua, calculadas de forma vectorial sobre la matriz dispersa.
+"""
+
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VOCABULARY = 'vocabulary'
+HASHING = 'hashing'
+
+# Prefijo que separa los n-gramas de caracteres de los lemas completos
+_NGRAM_PREFIX = '#'
+
+
+class VocabularyFeatures:
+    """Bolsa de palabras binaria sobre un vocabulario exacto"""
+
+    mode = VOCABULARY
+
+    def __init__(self, words: Sequence[str]):
+        self.words = list(words)
+        self.word_index = {word: i for i, word in enumerate(self.words)}
+
+    @property
+    def size(self) -> int:
+        return len(self.words)
+
+    def indices(self, tokens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        active = sorted({self.word_index[t] for t in tokens if t in self.word_index})
+        return np.asarray(active, dtype=np.int64), np.ones(len(active), dtype=np.float32)
+
+    def transform(self, tokens: Iterable[str]) -> np.ndarray:
+        vector = np.zeros(self.size, dtype=np.float32)
+        index, values = self.indices(tokens)
+        vector[index] = values
+        return vector
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {'mode': VOCABULARY, 'size': self.size}
+
+
+class HashingFeatures:
+    """Truco del hashing con signo sobre lemas y n-gramas de caracteres"""
+
+    mode = HASHING
+
+    def __init__(self, buckets: int = 4096, char_ngrams: Optional[Sequence[int]] = None,
+                signed: bool = True):
+        """
+        Args:
+            buckets: Número de cubos (dimensión de entrada del modelo)
+            char_ngrams: Rango [min, max] de n-gramas de caracteres (None = solo lemas)
+            signed: Usar signo derivado del hash para cancelar colisiones
+        """
+        if int(buckets) < 1:
+            raise ValueError("El número de cubos debe ser positivo")
+        self.buckets = int(buckets)
+        self.char_ngrams = tuple(int(n) for n in char_ngrams) if char_ngrams else None
+        self.signed = bool(signed)
+        # Los mismos tokens se repiten mucho entre mensajes
+        self._cache: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def size(self) -> int:
+        return self.buckets
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        cached = self._cache.get(feature)
+        if cached is None:
+            h = zlib.crc32(feature.encode('utf-8'))
+            # Bits bajos para el cubo, bit alto para el signo
+            sign = -1.0 if self.signed and h & 0x80000000 else 1.0
+            cached = (h % self.buckets, sign)
+            if len(self._cache) < 200000:
+                self._cache[feature] = cached
+        return cached
+
+    def _features(self, tokens: Iterable[str]) -> List[str]:
+        features = []
+        for token in set(tokens):
+            features.append(token)
+            if self.char_ngrams:
+                padded = f'<{token}>'
+                low, high = self.char_ngrams[0], self.char_ngrams[-1]
+                for n in range(low, high + 1):
+                    features.extend(_NGRAM_PREFIX + padded[i:i + n]
+                                    for i in range(max(0, len(padded) - n + 1)))
+        return features
+
+    def indices(self, tokens: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        accumulated: Dict[int, float] = {}
+        for feature in self._features(tokens):
+            index, sign = self._bucket(feature)
+            accumulated[index] = accumulated.get(index, 0.0) + sign
+        active = sorted(i for i, v in accumulated.items() if v != 0.0)
+        return (np.asarray(active, dtype=np.int64),
+                np.asarray([accumulated[i] for i in active], dtype=np.float32))
+
+    def transform(self, tokens: Iterable[str]) -> np.ndarray:
+        vector = np.zeros(self.size, dtype=np.float32)
+        index, values = self.indices(tokens)
+        vector[index] = values
+        return vector
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {
+            'mode': HASHING,
+            'size': self.buckets,
+            'buckets': self.buckets,
+            'char_ngrams': list(self.char_ngrams) if self.char_ngrams else None,
+            'signed': self.signed
+        }
+
+
+SELECTION_METHODS = ('chi2', 'mutual_info', 'df')
+
+
+def feature_scores(x: Any, labels: np.ndarray, n_classes: int, method: str = 'chi2') -> np.ndarray:
+    """
+    Puntuación de relevancia de cada columna frente a la clase
+
+    Se usa la presencia de cada característica (x != 0), por lo que basta con
+    conteos: una multiplicación dispersa clase × característica y sumas por
+    columna, sin recorrer documentos.
+
+    Args:
+        x: Matriz (n, d) dispersa (CSR/CSC) o densa
+        labels: Índice de clase de cada fila
+        n_classes: Número de clases
+        method: 'chi2', 'mutual_info' o 'df' (frecuencia documental)
+
+    Returns:
+        Vector (d,) de puntuaciones (mayor = más relevante)
+    """
+    from scipy import sparse
+
+    presence = sparse.csr_matrix(x, dtype=np.float64)
+    presence.data = (presence.data != 0).astype(np.float64)
+    presence.eliminate_zeros()
+    n = presence.shape[0]
+    df = np.asarray(presence.sum(axis=0)).ravel()
+    if method == 'df':
+        return df
+
+    # observed[c, f]: documentos de la clase c en los que aparece f
+    one_hot = sparse.csr_matrix((np.ones(n), (labels, np.arange(n))), shape=(n_classes, n))
+    observed = np.asarray((one_hot @ presence).todense())
+    class_count = np.bincount(labels, minlength=n_classes).astype(np.float64)[:, np.newaxis]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if method == 'chi2':
+            expected = class_count / max(n, 1) * df[np.newaxis, :]
+            terms = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+            return terms.sum(axis=0)
+        if method == 'mutual_info':
+            # I(F; C) con F binaria: celdas presente/ausente por clase
+            absent = class_count - observed
+            present_term = np.where(observed > 0, observed / n * np.log(
+                n * observed / (class_count * df[np.newaxis, :])), 0.0)
+            absent_df = (n - df)[np.newaxis, :]
+            absent_term = np.where(absent > 0, absent / n * np.log(
+                n * absent / (class_count * absent_df)), 0.0)
+            return (present_term + absent_term).sum(axis=0)
+    raise ValueError(f"Método de selección no soportado: {method}")
+
+
+def prune_vocabulary(x: Any, labels: np.ndarray, words: Sequence[str], n_classes: int,
+                    min_df: int = 1, max_features: Optional[int] = None,
+                    method: Optional[str] = 'chi2') -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Poda el vocabulario por frecuencia documental y relevancia
+
+    Args:
+        x: Matriz (n, len(words)) de la bolsa de palabras completa
+        labels: Índice de clase de cada fila
+        words: Vocabulario (columnas de x)
+        n_classes: Número de clases
+        min_df: Documentos mínimos en los que debe aparecer una palabra
+        max_features: Tamaño máximo del vocabulario (None = sin límite)
+        method: Criterio para elegir las `max_features` mejores ('chi2',
+            'mutual_info' o 'df'; None equivale a 'df')
+
+    Returns:
+        Tupla (vocabulario podado en el orden original, estadísticas)
+    """
+    method = method or 'df'
+    if method not in SELECTION_METHODS:
+        raise ValueError(f"Método de selección no soportado: {method}")
+    df = feature_scores(x, labels, n_classes, 'df')
+    keep = df >= max(int(min_df), 1)
+    removed_min_df = int(len(words) - keep.sum())
+
+    removed_selection = 0
+    if max_features and keep.sum() > int(max_features):
+        scores = df if method == 'df' else feature_scores(x, labels, n_classes, method)
+        candidates = np.flatnonzero(keep)
+        # Orden estable: a igualdad de puntuación gana la palabra anterior
+        best = candidates[np.argsort(-scores[candidates], kind='stable')[:int(max_features)]]
+        removed_selection = int(len(candidates) - len(best))
+        keep = np.zeros(len(words), dtype=bool)
+        keep[best] = True
+
+    kept = [word for word, flag in zip(words, keep) if flag]
+    return kept, {
+        'method': method,
+        'min_df': int(min_df),
+        'max_features': int(max_features) if max_features else None,
+        'original_size': len(words),
+        'size': len(kept),
+        'removed_min_df': removed_min_df,
+        'removed_selection': removed_selection
+    }
+
+
+def build_features(config: Optional[Dict[str, Any]], words: Sequence[str] = ()):
+    """
+    Espacio de características a partir de `training.features` o de los
+    metadatos de un bundle
+
+    Args:
+        config: {'mode': 'vocabulary'|'hashing', 'buckets', 'char_ngrams', 'signed'}
+        words: Vocabulario (solo para el modo `vocabulary`)
+    """
+    config = config or {}
+    mode = str(config.get('mode', VOCABULARY)).lower()
+    if mode == HASHING:
+        return HashingFeatures(int(config.get('buckets', 4096)), config.get('char_ngrams'),
+                            bool(config.get('signed', True)))
+    if mode != VOCABULARY:
+        raise ValueError(f"Modo de características no soportado: {mode}")
+    return VocabularyFeatures(words)
+
+
+def input_size(words: Sequence[str], metadata: Optional[Dict[str, Any]]) -> int:
+    """Dimensión de entrada esperada para un bundle (vocabulario o cubos)"""
+    features = (metadata or {}).get('features') or {}
+    if features.get('mode') == HASHING:
+        return int(features['buckets'])
+    return len(words)
@@ -0,0 +1,203 @@
+"""
+Clasificador Jerárquico de Intenciones
+======================================
+
+Para miles de intenciones (importaciones de FAQ) una única softmax plana
+hace que entrenar y servir escale con el número de clases. En modo
+jerárquico las intenciones se agrupan (campo `group` del JSON de intenciones
+o clustering automático de sus centroides) y el modelo tiene dos etapas:
+
+1. Clasificador grueso: la red habitual, con una salida por grupo.
+2. Cabezas por grupo: redes pequeñas que, sobre la primera capa oculta del
+   clasificador grueso, eligen la intención dentro del grupo.
+
+Solo se evalúan las cabezas de los `top_groups` grupos más probables y
+p(intención) = p(grupo) · p(intención | grupo). Los grupos de una sola
+intención no tienen cabeza.
+
+En el bundle todos los pesos van en una sola lista (primera capa, resto del
+clasificador grueso y cabezas en orden); la estructura se describe en los
+metadatos (`hierarchy`).
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .backends import NumpyMLP
+
+# Prefijo de los grupos creados por clustering
+AUTO_GROUP_PREFIX = 'auto-'
+
+
+def assign_groups(x: Any, labels: np.ndarray, classes: Sequence[str],
+                explicit: Optional[Dict[str, str]] = None, n_groups: int = 0,
+                seed: int = 42) -> Tuple[List[str], np.ndarray]:
+    """
+    Asigna cada intención a un grupo
+
+    Las intenciones con grupo explícito lo conservan; el resto se agrupa con
+    k-means sobre sus centroides normalizados (bolsa de palabras media de sus
+    patrones), calculados como un producto disperso clase × característica.
+
+    Args:
+        x: Matriz de entrada (n, d), densa o CSR
+        labels: Índice de clase de cada fila
+        classes: Nombres de las clases
+        explicit: Grupo declarado por intención (campo `group`)
+        n_groups: Grupos automáticos (0 = ceil(sqrt(intenciones sin grupo)))
+        seed: Semilla del clustering
+
+    Returns:
+        Tupla (nombres de grupo, grupo de cada clase como índices)
+    """
+    from scipy import sparse
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import normalize
+
+    explicit = explicit or {}
+    names: List[str] = sorted({explicit[tag] for tag in classes if explicit.get(tag)})
+    group_index = {name: i for i, name in enumerate(names)}
+    class_group = np.full(len(classes), -1, dtype=np.int64)
+    for i, tag in enumerate(classes):
+        if explicit.get(tag):
+            class_group[i] = group_index[explicit[tag]]
+
+    pending = np.flatnonzero(class_group < 0)
+    if len(pending):
+        k = int(n_groups) or int(math.ceil(math.sqrt(len(pending))))
+        k = max(1, min(k, len(pending)))
+        if k == 1:
+            assignment = np.zeros(len(pending), dtype=np.int64)
+        else:
+            n = x.shape[0]
+            one_hot = sparse.csr_matrix((np.ones(n), (labels, np.arange(n))), shape=(len(classes), n))
+            centroids = normalize(sparse.csr_matrix(one_hot @ sparse.csr_matrix(x))[pending])
+            assignment = KMeans(n_clusters=k, n_init=3, random_state=seed).fit_predict(centroids)
+            # Renumerar por si algún cluster quedó vacío
+            assignment = np.unique(assignment, return_inverse=True)[1]
+        for cluster in range(int(assignment.max()) + 1):
+            class_group[pending[assignment == cluster]] = len(names)
+            names.append(f'{AUTO_GROUP_PREFIX}{cluster}')
+    return names, class_group
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0.0)
+
+
+class HierarchicalModel:
+    """Clasificador grueso por grupos + cabezas por grupo, servible con NumPy"""
+
+    def __init__(self, embedding: List[np.ndarray], coarse: NumpyMLP,
+                heads: List[Optional[NumpyMLP]], group_classes: List[Sequence[int]],
+                groups: List[str], n_classes: int, top_groups: int = 2):
+        """
+        Args:
+            embedding: [W1, b1] de la primera capa (compartida por ambas etapas)
+            coarse: Resto del clasificador grueso (sobre ReLU(x·W1 + b1))
+            heads: Cabeza de cada grupo (None si el grupo tiene una sola intención)
+            group_classes: Índices de clase de cada grupo
+            groups: Nombres de los grupos
+            n_classes: Número total de intenciones
+            top_groups: Grupos cuyas cabezas se evalúan por mensaje
+        """
+        self.embedding = embedding
+        self.coarse = coarse
+        self.heads = heads
+        self.group_classes = [np.asarray(c, dtype=np.int64) for c in group_classes]
+        self.groups = list(groups)
+        self.n_classes = int(n_classes)
+        self.top_groups = max(1, int(top_groups))
+
+    # ------------------------------------------------------------------
+    # Interfaz de modelo (la misma que NumpyMLP)
+    # ------------------------------------------------------------------
+    @property
+    def input_shape(self) -> Tuple[Optional[int], int]:
+        return (None, int(self.embedding[0].shape[0]))
+
+    @property
+    def output_shape(self) -> Tuple[Optional[int], int]:
+        return (None, self.n_classes)
+
+    def count_params(self) -> int:
+        return int(sum(w.size for w in self.get_weights()))
+
+    def get_weights(self) -> List[np.ndarray]:
+        weights = list(self.embedding) + self.coarse.get_weights()
+        for head in self.heads:
+            if head is not None:
+                weights.extend(head.get_weights())
+        return weights
+
+    def predict(self, x: Any, verbose: int = 0, batch_size: int = None) -> np.ndarray:
+        """Probabilidades por intención para cada fila de `x` (densa o CSR)"""
+        if hasattr(x, 'tocsr'):
+            z = np.asarray(x.tocsr().astype(np.float32) @ self.embedding[0])
+        else:
+            z = np.asarray(x, dtype=np.float32) @ self.embedding[0]
+        return self._predict_hidden(_relu(z + self.embedding[1]))
+
+    def predict_active(self, index: np.ndarray, values: np.ndarray = None) -> np.ndarray:
+        """Como NumpyMLP.predict_active: primera capa por gather-sum"""
+        rows = self.embedding[0][np.asarray(index, dtype=np.int64)]
+        z = rows.sum(axis=0) if values is None else np.asarray(values, dtype=np.float32) @ rows
+        return self._predict_hidden(_relu(z + self.embedding[1])[np.newaxis, :])[0]
+
+    def _predict_hidden(self, hidden: np.ndarray) -> np.ndarray:
+        group_probs = self.coarse.predict(hidden)
+        k = min(self.top_groups, group_probs.shape[1])
+        top = np.argpartition(-group_probs, k - 1, axis=1)[:, :k]
+        probs = np.zeros((hidden.shape[0], self.n_classes), dtype=np.float32)
+        # Cada cabeza se evalúa una vez con todas las filas que la eligieron
+        for group in np.unique(top):
+            rows = np.flatnonzero((top == group).any(axis=1))
+            classes = self.group_classes[group]
+            weight = group_probs[rows, group][:, np.newaxis]
+            head = self.heads[group]
+            if head is None:
+                probs[rows[:, np.newaxis], classes] = weight
+            else:
+                probs[rows[:, np.newaxis], classes] = weight * head.predict(hidden[rows])
+        return probs
+
+    # ------------------------------------------------------------------
+    # Serialización en bundles
+    # ------------------------------------------------------------------
+    def to_metadata(self) -> Dict[str, Any]:
+        """Estructura de la lista plana de pesos (metadatos `hierarchy` del bundle)"""
+        return {
+            'groups': self.groups,
+            'group_classes': [c.tolist() for c in self.group_classes],
+            'coarse_arrays': 2 + len(self.coarse.weights),
+            'head_arrays': [len(h.weights) if h is not None else 0 for h in self.heads],
+            'top_groups': self.top_groups
+        }
+
+    @classmethod
+    def from_weights(cls, weights: List[np.ndarray], hierarchy: Dict[str, Any],
+                    n_classes: int, top_groups: int = None) -> 'HierarchicalModel':
+        """Reconstruye el modelo a partir de la lista plana y sus metadatos"""
+        coarse_arrays = int(hierarchy['coarse_arrays'])
+        offset = coarse_arrays
+        heads: List[Optional[NumpyMLP]] = []
+        for count in hierarchy['head_arrays']:
+            heads.append(NumpyMLP(weights=weights[offset:offset + count]) if count else None)
+            offset += count
+        return cls(list(weights[:2]), NumpyMLP(weights=weights[2:coarse_arrays]), heads,
+                hierarchy['group_classes'], hierarchy['groups'], n_classes,
+                top_groups or hierarchy.get('top_groups', 2))
+
+    @staticmethod
+    def weights_match(weights: List[np.ndarray], hierarchy: Dict[str, Any], n_classes: int) -> bool:
+        """Coherencia de la lista plana de pesos con los metadatos"""
+        try:
+            coarse_arrays = int(hierarchy['coarse_arrays'])
+            covered = sorted(i for classes in hierarchy['group_classes'] for i in classes)
+            return (len(weights) == coarse_arrays + sum(hierarchy['head_arrays'])
+                    and weights[coarse_arrays - 1].shape[0] == len(hierarchy['groups'])
+                    and covered == list(range(n_classes)))
+        except (KeyError, IndexError, TypeError, ValueError):
+            return False
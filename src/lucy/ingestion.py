@@ -0,0 +1,282 @@
+"""
+Ingesta en Streaming de Datos de Entrenamiento
+==============================================
+
+Generadores que recorren los datos de entrenamiento sin cargarlos enteros
+en memoria:
+- Archivos de intenciones `.json` (parser JSON incremental sobre el array
+  `intents`) y `.jsonl` (una intención o un patrón por línea)
+- Tabla `learning_data` con paginación por clave (keyset) y filtro de
+  frecuencia/efectividad
+- Construcción de vocabulario y de lotes de características en memoria acotada
+- Matriz dispersa CSR de todo el corpus (selección de características)
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .features import VocabularyFeatures
+
+# (tag, patrón)
+Sample = Tuple[str, str]
+
+_ARRAY_KEY = re.compile(r'"(?P<key>[^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*\[')
+_DECODER = json.JSONDecoder()
+
+
+def holdout_fraction(tokens: Sequence[str], tag: str) -> float:
+    """
+    Posición estable en [0, 1) de un documento para la validación fija
+
+    Solo depende del contenido (tag y tokens): el mismo documento cae siempre
+    del mismo lado de la división, en cualquier entrenamiento y versión.
+    """
+    digest = hashlib.blake2b(f"{tag}\x1f{' '.join(tokens)}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2.0 ** 64
+
+
+def iter_json_array(fp: TextIO, key: Optional[str] = 'intents',
+                    chunk_size: int = 65536) -> Iterator[Any]:
+    """
+    Itera los elementos de un array JSON leyendo el archivo por bloques
+
+    Solo se mantiene en memoria el elemento en curso y el bloque leído.
+
+    Args:
+        fp: Archivo de texto abierto
+        key: Clave del objeto raíz que contiene el array (None si la raíz es el array)
+        chunk_size: Caracteres leídos por bloque
+
+    Yields:
+        Cada elemento decodificado del array
+    """
+    buffer = ''
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, eof
+        if eof:
+            return False
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer += chunk
+        return True
+
+    # Localizar el inicio del array
+    while True:
+        if key is None:
+            stripped = buffer.lstrip()
+            if stripped:
+                if stripped[0] != '[':
+                    raise ValueError("Se esperaba un array JSON en la raíz")
+                buffer = stripped[1:]
+                break
+        else:
+            match = next((m for m in _ARRAY_KEY.finditer(buffer) if m.group('key') == key), None)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            # Conservar solo la cola por si la clave quedó partida entre bloques
+            buffer = buffer[-(len(key) + 64):]
+        if not fill():
+            return
+
+    # Decodificar elemento a elemento
+    pos = 0
+    while True:
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or not fill():
+                break
+        if pos >= len(buffer):
+            raise ValueError("JSON truncado: el array no se cerró")
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = _DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if not fill():
+                raise
+            continue
+        if end == len(buffer) and not eof:
+            # Un número al final del bloque podría continuar en el siguiente
+            if not isinstance(item, (dict, list, str)) and fill():
+                continue
+        yield item
+        buffer = buffer[end:]
+        pos = 0
+
+
+def iter_intents_file(path: Path, chunk_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """
+    Itera las intenciones de un archivo `.json` o `.jsonl`
+
+    En `.jsonl` cada línea puede ser una intención completa
+    (`{"tag", "patterns"}`) o un patrón suelto (`{"tag", "pattern"}`).
+    """
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == '.jsonl':
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_number}: JSON inválido: {e}") from e
+                if 'pattern' in record and 'patterns' not in record:
+                    record = dict(record, patterns=[record['pattern']])
+                yield record
+        else:
+            yield from iter_json_array(f, 'intents', chunk_size)
+
+
+def iter_intent_patterns(path: Path, chunk_size: int = 65536) -> Iterator[Sample]:
+    """Itera pares (tag, patrón) de un archivo de intenciones"""
+    for intent in iter_intents_file(path, chunk_size):
+        tag = intent.get('tag')
+        if not tag:
+            continue
+        for pattern in intent.get('patterns', []) or []:
+            if pattern:
+                yield tag, pattern
+
+
+def iter_intent_groups(path: Path, chunk_size: int = 65536) -> Iterator[Tuple[str, str]]:
+    """Itera pares (tag, grupo) de las intenciones con campo `group`"""
+    for intent in iter_intents_file(path, chunk_size):
+        if intent.get('tag') and intent.get('group'):
+            yield intent['tag'], str(intent['group'])
+
+
+def iter_learning_patterns(db: Any, languages: Sequence[str] = None, min_frequency: int = 1,
+                        min_effectiveness: float = 0.0, page_size: int = 1000) -> Iterator[Sample]:
+    """
+    Itera pares (intención, patrón) de la tabla `learning_data`
+
+    Args:
+        db: `ConversationDB`
+        languages: Idiomas a incluir (None para todos)
+        min_frequency: Frecuencia mínima del patrón
+        min_effectiveness: Puntuación de efectividad mínima
+        page_size: Filas por página (paginación por id)
+    """
+    for row in db.iter_learning_data(languages=languages, min_frequency=min_frequency,
+                                    min_effectiveness=min_effectiveness, page_size=page_size):
+        yield row['intent'], row['pattern']
+
+
+def build_vocabulary(documents: Iterable[Tuple[List[str], str]]) -> Tuple[List[str], List[str], int]:
+    """
+    Construye vocabulario y clases en una pasada sin retener los documentos
+
+    Args:
+        documents: Pares (tokens normalizados, tag)
+
+    Returns:
+        Tupla (palabras ordenadas, clases ordenadas, número de documentos)
+    """
+    words = set()
+    classes = set()
+    count = 0
+    for tokens, tag in documents:
+        words.update(tokens)
+        classes.add(tag)
+        count += 1
+    return sorted(words), sorted(classes), count
+
+
+def iter_feature_batches(documents: Iterable[Tuple[List[str], str]], words: Sequence[str],
+                        classes: Sequence[str], batch_size: int = 4096,
+                        dtype: Any = np.float32, features: Any = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Convierte documentos en lotes de bolsa de palabras y etiquetas one-hot
+
+    Cada lote ocupa como máximo `batch_size` filas; los documentos con tags
+    fuera de `classes` se descartan.
+
+    Args:
+        features: Espacio de características (ver features); por defecto el
+            vocabulario exacto `words`
+
+    Yields:
+        Tuplas (x, y) con x de forma (n, dimensión de entrada) e y de forma (n, len(classes))
+    """
+    features = features or VocabularyFeatures(words)
+    class_index = {tag: i for i, tag in enumerate(classes)}
+    rows: List[Tuple[np.ndarray, np.ndarray]] = []
+    labels: List[int] = []
+
+    def flush() -> Tuple[np.ndarray, np.ndarray]:
+        x = np.zeros((len(rows), features.size), dtype=dtype)
+        for i, (columns, values) in enumerate(rows):
+            x[i, columns] = values
+        y = np.zeros((len(labels), len(classes)), dtype=dtype)
+        y[np.arange(len(labels)), labels] = 1
+        return x, y
+
+    for tokens, tag in documents:
+        label = class_index.get(tag)
+        if label is None:
+            continue
+        rows.append(features.indices(tokens))
+        labels.append(label)
+        if len(rows) >= batch_size:
+            yield flush()
+            rows, labels = [], []
+    if rows:
+        yield flush()
+
+
+def normalize_documents(samples: Iterable[Sample], tokenize: Callable[[str], List[str]],
+                        normalize: Callable[[str], str],
+                        ignore_words: Sequence[str] = ()) -> Iterator[Tuple[List[str], str]]:
+    """Tokeniza y normaliza (minúsculas/lematización) cada patrón"""
+    ignore = set(ignore_words)
+    for tag, pattern in samples:
+        tokens = [normalize(token.lower()) for token in tokenize(pattern.lower()) if token not in ignore]
+        yield tokens, tag
+
+
+def sparse_feature_matrix(documents: Iterable[Tuple[List[str], str]], classes: Sequence[str],
+                        features: Any, dtype: Any = np.float32) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Matriz CSR de características e índices de clase de todo el corpus
+
+    Solo se guardan las entradas activas, de modo que la memoria crece con
+    los tokens del corpus y no con documentos × dimensión de entrada.
+
+    Returns:
+        Tupla (x de forma (n, features.size), etiquetas de forma (n,))
+    """
+    class_index = {tag: i for i, tag in enumerate(classes)}
+    indptr = [0]
+    columns: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    labels: List[int] = []
+    for tokens, tag in documents:
+        label = class_index.get(tag)
+        if label is None:
+            continue
+        index, value = features.indices(tokens)
+        columns.append(index)
+        values.append(value)
+        labels.append(label)
+        indptr.append(indptr[-1] + len(index))
+    x = sparse.csr_matrix(
+        (np.concatenate(values).astype(dtype) if values else np.zeros(0, dtype=dtype),
+        np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64),
+        np.asarray(indptr, dtype=np.int64)),
+        shape=(len(labels), features.size)
+    )
+    return x, np.asarray(labels, dtype=np.int64)
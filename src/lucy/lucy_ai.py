@@ -10,6 +10,7 @@ import os
 import json
 import pickle
 import random
+import time
 import logging
 import numpy as np
 from pathlib import Path
@@ -22,6 +23,11 @@ from .plugins.manager import PluginManager, PluginResult
 from .services import ServiceManager
 from .nlp import AdvancedNLPManager
 from .memory import MemoryManager
+from .backends import NumpyMLP
+from .model_bundle import BundleError, current_version, load_bundle
+from .model_manager import ModelManager, ServingModel
+from .sharding import shard_dir
+from .cascade import IntentCascade
 
 # Importar TensorFlow con supresión de logs
 with suppress_tf_logs():
@@ -52,15 +58,40 @@ class LucyAI:
         
         # Componentes del modelo
         self.lemmatizer = WordNetLemmatizer()
-        self.words = None
-        self.classes = None
-        self.model = None
         self.intents = {}
+        self.cascade: Optional[IntentCascade] = None
         self._intents_mtime = 0.0
         
         # Inicializar componentes
         self._ensure_nltk_data()
-        self._load_model_components()
+        model_cfg = self.config.get('model', {})
+        hot_swap_cfg = model_cfg.get('hot_swap', {}) or {}
+        self.model_manager = ModelManager(
+            Path(self.config_manager.get_path('models_dir')),
+            self._load_model_components(),
+            warmup=self._warmup_model,
+            verify_checksums=bool(model_cfg.get('verify_bundle_checksums', False)),
+            poll_seconds=float(hot_swap_cfg.get('poll_seconds', 10))
+        )
+        # Modelos por idioma: cada mensaje usa el de su idioma y el conjunto
+        # queda como respaldo. Un idioma sin shard no ocupa memoria. Por
+        # defecto se sirven solo si el entrenamiento los genera (training.shards)
+        self.shard_managers: Dict[str, ModelManager] = {}
+        shards_trained = bool((self.config.get('training', {}).get('shards', {}) or {}).get('enabled', False))
+        if model_cfg.get('language_shards', shards_trained):
+            for language in model_cfg.get('supported_languages', ['es', 'en']):
+                directory = shard_dir(self.model_manager.models_dir, language)
+                self.shard_managers[language] = ModelManager(
+                    directory, self._load_shard(directory),
+                    warmup=self._warmup_model,
+                    verify_checksums=self.model_manager.verify_checksums,
+                    poll_seconds=self.model_manager.poll_seconds
+                )
+        # Vigilantes de versiones nuevas (opcional): un hilo por modelo, ver close()
+        if hot_swap_cfg.get('enabled', False):
+            self.model_manager.start_watcher()
+            for manager in self.shard_managers.values():
+                manager.start_watcher()
         self._load_intents()
         self._intents_mtime = self._get_intents_mtime()
         
@@ -113,15 +144,48 @@ class LucyAI:
             self.logger.error(f"Error configurando NLTK: {e}")
             raise
     
-    def _load_model_components(self):
+    # ------------------------------------------------------------------
+    # Modelo activo (ver ModelManager): cada lectura devuelve la versión
+    # vigente; las predicciones toman una única instantánea por petición
+    # ------------------------------------------------------------------
+    @property
+    def words(self) -> List[str]:
+        return self.model_manager.active.words
+    
+    @property
+    def classes(self) -> List[str]:
+        return self.model_manager.active.classes
+    
+    @property
+    def model(self) -> Any:
+        return self.model_manager.active.model
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.model_manager.active.version
+    
+    def _load_model_components(self) -> ServingModel:
         """Carga los componentes del modelo ML"""
         try:
             models_dir = Path(self.config_manager.get_path('models_dir'))
             
+            # Bundle versionado (si hay uno publicado): una sola carga coherente
+            if current_version(models_dir):
+                try:
+                    bundle = load_bundle(
+                        models_dir,
+                        verify_checksums=bool(self.config.get('model', {}).get('verify_bundle_checksums', False))
+                    )
+                    self.logger.info(f"[OK] Bundle {bundle.version} cargado: "
+                                f"{len(bundle.words)} palabras, {len(bundle.classes)} clases")
+                    return ServingModel.from_bundle(bundle)
+                except BundleError as bundle_err:
+                    self.logger.warning(f"Bundle no válido, usando archivos sueltos: {bundle_err}")
+            
             # Rutas de archivos del modelo
             words_path = models_dir / 'words.pkl'
             classes_path = models_dir / 'classes.pkl'
-            model_path = models_dir / 'lucy_model.h5'
+            model_path = self._resolve_model_artifact(models_dir)
             
             # Verificar existencia de archivos
             missing_files = []
@@ -139,32 +203,118 @@ class LucyAI:
                 
                 # Cargar vocabulario y clases
                 with open(words_path, 'rb') as f:
-                    self.words = pickle.load(f)
+                    words = pickle.load(f)
                 
                 with open(classes_path, 'rb') as f:
-                    self.classes = pickle.load(f)
+                    classes = pickle.load(f)
                 
-                # Importar y cargar modelo de Keras de forma diferida
-                try:
-                    from tensorflow.keras.models import load_model  # type: ignore
-                    self.model = load_model(str(model_path))
-                    if hasattr(self.model, 'make_predict_function'):
-                        try:
-                            self.model.make_predict_function()
-                        except Exception:
-                            pass
-                except Exception as tf_err:
-                    self.logger.warning(f"No se pudo cargar TensorFlow/Keras: {tf_err}. Usando modo básico sin ML")
-                    self.model = None
-            
-            self.logger.info(f"[OK] Modelo cargado: {len(self.words)} palabras, {len(self.classes)} clases")
+                # Pesos NumPy (backends 'numpy'/'sklearn'): no requieren TensorFlow
+                if model_path.suffix == '.npz':
+                    model = NumpyMLP.load(str(model_path))
+                else:
+                    # Importar y cargar modelo de Keras de forma diferida
+                    try:
+                        from tensorflow.keras.models import load_model  # type: ignore
+                        model = load_model(str(model_path))
+                        if hasattr(model, 'make_predict_function'):
+                            try:
+                                model.make_predict_function()
+                            except Exception:
+                                pass
+                    except Exception as tf_err:
+                        self.logger.warning(f"No se pudo cargar TensorFlow/Keras: {tf_err}. Usando modo básico sin ML")
+                        model = None
+            
+            self.logger.info(f"[OK] Modelo cargado: {len(words)} palabras, {len(classes)} clases")
+            return ServingModel(words, classes, model)
             
         except Exception as e:
             # También degradar si falla la carga por incompatibilidad
             self.logger.error(f"Error cargando modelo, usando modo básico sin ML: {e}")
-            self.words = []
-            self.classes = []
-            self.model = None
+            return ServingModel()
+    
+    def _load_shard(self, directory: Path) -> ServingModel:
+        """Shard publicado en `directory` (vacío si no existe o no es válido)"""
+        if not current_version(directory):
+            return ServingModel()
+        try:
+            bundle = load_bundle(directory, verify_checksums=self.model_manager.verify_checksums)
+            self.logger.info(f"[OK] Shard {directory.name} {bundle.version}: "
+                        f"{len(bundle.words)} palabras, {len(bundle.classes)} clases")
+            return ServingModel.from_bundle(bundle)
+        except BundleError as e:
+            self.logger.warning(f"[WARN] Shard inválido en {directory}: {e}")
+            return ServingModel()
+    
+    def _serving_for(self, language: str = None) -> ServingModel:
+        """
+        Modelo del idioma si hay shard cargado; si no, el conjunto
+        
+        Un modelo conjunto publicado después del shard (p. ej. un candidato
+        promovido, que no reentrena los shards) tiene preferencia: las
+        versiones empiezan por su fecha y se ordenan como texto.
+        """
+        joint = self.model_manager.active
+        manager = self.shard_managers.get(language)
+        if manager is not None:
+            serving = manager.active
+            if serving.ready and not (joint.ready and (joint.version or '') > (serving.version or '')):
+                return serving
+        return joint
+    
+    def _warmup_model(self, serving: ServingModel):
+        """Ejercita un modelo candidato (páginas mapeadas, grafos) antes de activarlo"""
+        if not serving.ready:
+            return
+        with suppress_tf_logs():
+            serving.predict_tokens([])
+    
+    def close(self):
+        """Detiene los vigilantes de versiones del modelo conjunto y de los shards"""
+        self.model_manager.stop()
+        for manager in self.shard_managers.values():
+            manager.stop()
+    
+    def reload_model(self, version: str = None, wait: bool = False) -> Optional[bool]:
+        """
+        Activa la versión publicada (o `version`) sin interrumpir peticiones
+        
+        Args:
+            version: Versión de bundle concreta (None = la de `current`)
+            wait: Esperar a que termine la carga
+            
+        Returns:
+            True/False si wait=True; None si se lanzó en segundo plano
+        """
+        return self.model_manager.reload(version, wait=wait)
+    
+    def rollback_model(self, wait: bool = True) -> Optional[bool]:
+        """Vuelve a la versión de modelo anterior"""
+        return self.model_manager.rollback(wait=wait)
+    
+    def get_model_status(self) -> Dict[str, Any]:
+        """Estado del modelo activo y de los cambios en caliente"""
+        status = self.model_manager.get_status()
+        status['shards'] = {language: manager.get_status()
+                            for language, manager in self.shard_managers.items()
+                            if manager.active.model is not None}
+        return status
+    
+    def _resolve_model_artifact(self, models_dir: Path) -> Path:
+        """
+        Elige el archivo de pesos a servir
+        
+        Se prefiere `lucy_model.npz` con cualquier backend (el entrenamiento
+        con Keras también lo exporta): NumpyMLP sirve con la primera capa
+        dispersa. `lucy_model.h5` solo se usa si no hay .npz o si es más
+        reciente (entrenado por una versión que no exportaba los pesos).
+        """
+        h5_path = models_dir / 'lucy_model.h5'
+        npz_path = models_dir / 'lucy_model.npz'
+        if h5_path.exists() and (not npz_path.exists()
+                                or h5_path.stat().st_mtime > npz_path.stat().st_mtime):
+            return h5_path
+        return npz_path
     
     def _load_intents(self):
         """Carga los archivos de intenciones para todos los idiomas"""
@@ -191,12 +341,37 @@ class LucyAI:
             if not self.intents:
                 raise FileNotFoundError("No se encontraron archivos de intenciones válidos")
             
+            self.cascade = self._build_cascade()
             self.logger.info(f"[OK] Intenciones cargadas para idiomas: {list(self.intents.keys())}")
 
         except Exception as e:
             self.logger.error(f"Error cargando intenciones: {e}")
             raise
 
+    def _build_cascade(self) -> Optional[IntentCascade]:
+        """Niveles exacto/léxico de model.cascade sobre las intenciones cargadas"""
+        cascade_cfg = self.config.get('model', {}).get('cascade', {}) or {}
+        if not cascade_cfg.get('enabled', True):
+            return None
+        lexical_cfg = cascade_cfg.get('lexical', {}) or {}
+        cascade = IntentCascade(
+            self.intents,
+            exact=bool(cascade_cfg.get('exact_match', True)),
+            lexical=bool(lexical_cfg.get('enabled', True)),
+            min_score=float(lexical_cfg.get('min_score', 0.75)),
+            min_margin=float(lexical_cfg.get('min_margin', 0.25))
+        )
+        previous = getattr(self, 'cascade', None)
+        if previous is not None:
+            # Las estadísticas sobreviven a la recarga de intenciones
+            cascade._counts, cascade._seconds = previous._counts, previous._seconds
+        return cascade
+    
+    def get_cascade_stats(self) -> Optional[Dict[str, Any]]:
+        """Tráfico resuelto por nivel de la cascada (None si está desactivada)"""
+        cascade = getattr(self, 'cascade', None)
+        return cascade.stats() if cascade is not None else None
+    
     def _get_intents_mtime(self) -> float:
         try:
             intents_dir = Path(self.config_manager.get_path('intents_dir'))
@@ -387,6 +562,21 @@ class LucyAI:
                 except Exception:
                     return str(result)
             
+            # Cascada: patrones exactos y puntuación léxica antes del modelo
+            cascade = getattr(self, 'cascade', None)
+            tick = time.perf_counter()
+            hit = cascade.match(message) if cascade is not None else None
+            if hit:
+                cascade.record(hit['tier'], time.perf_counter() - tick)
+                self.current_language = hit['language']
+                self.last_intent = hit['intent']
+                self.last_confidence = float(hit['probability'])
+                response = self._generate_response(self.last_intent, message, context)
+                self._update_context(message, response)
+                self.logger.debug(f"Procesado '{message}' -> Intent: {self.last_intent} "
+                                f"(nivel {hit['tier']}, confianza: {self.last_confidence:.2%})")
+                return response
+            
             # Detectar idioma
             self.current_language = get_language(message)
             
@@ -396,6 +586,8 @@ class LucyAI:
             
             # Procesar mensaje con el modelo
             prediction_results = self._predict_intent(message)
+            if cascade is not None:
+                cascade.record('model', time.perf_counter() - tick)
             
             if not prediction_results:
                 return self._get_default_response("no_prediction")
@@ -435,38 +627,39 @@ class LucyAI:
             self.logger.error(f"Error procesando mensaje: {e}", exc_info=True)
             return self._get_default_response("error")
     
-    def _predict_intent(self, message: str) -> List[Dict[str, Any]]:
+    def _predict_intent(self, message: str, language: str = None) -> List[Dict[str, Any]]:
         """
         Predice la intención del mensaje usando el modelo ML
         
         Args:
             message: Mensaje a analizar
+            language: Idioma para elegir el shard (por defecto el actual)
             
         Returns:
             Lista de predicciones ordenadas por confianza
         """
         try:
+            # Una sola instantánea del modelo activo (shard del idioma o conjunto)
+            serving = self._serving_for(language or self.current_language)
+            
             # Si no hay modelo, usar heurística basada en patrones
-            if self.model is None or not self.words or not self.classes:
+            if not serving.ready:
                 return self._predict_intent_fallback(message)
 
-            # Preparar el mensaje para el modelo
-            bow = self._create_bag_of_words(message)
-            
-            # Realizar predicción
+            # Realizar predicción (primera capa dispersa sobre los tokens activos)
             with suppress_tf_logs():
-                prediction = self.model.predict(np.array([bow]), verbose=0)[0]
+                prediction = serving.predict_tokens(self._message_tokens(message))
             
             # Procesar resultados
             results = []
             error_threshold = self.config.get('model', {}).get('confidence_threshold', 0.25)
             
-            for i, probability in enumerate(prediction):
-                if probability > error_threshold:
-                    results.append({
-                        'intent': self.classes[i],
-                        'probability': float(probability)
-                    })
+            # Solo las clases sobre el umbral (con miles de intenciones casi todas son 0)
+            for i in np.flatnonzero(prediction > error_threshold):
+                results.append({
+                    'intent': serving.classes[i],
+                    'probability': float(prediction[i])
+                })
             
             # Ordenar por probabilidad descendente
             return sorted(results, key=lambda x: x['probability'], reverse=True)
@@ -585,27 +778,24 @@ class LucyAI:
         except Exception:
             return []
     
-    def _create_bag_of_words(self, message: str) -> np.ndarray:
+    def _create_bag_of_words(self, message: str, serving: ServingModel = None) -> np.ndarray:
         """
         Crea la bolsa de palabras para el modelo ML
         
         Args:
             message: Mensaje a procesar
+            serving: Modelo cuyo espacio de características usar (por defecto el activo)
             
         Returns:
             Array numpy con la representación de bolsa de palabras
+            (vocabulario exacto o cubos de hashing, según el modelo)
         """
-        # Tokenizar y lematizar
-        message_words = nltk.word_tokenize(message.lower())
-        message_words = [self.lemmatizer.lemmatize(word) for word in message_words]
-        
-        # Crear bolsa de palabras
-        bag = np.zeros(len(self.words), dtype=np.float32)
-        for i, word in enumerate(self.words):
-            if word in message_words:
-                bag[i] = 1.0
-        
-        return bag
+        serving = serving or self.model_manager.active
+        return serving.features.transform(self._message_tokens(message))
+    
+    def _message_tokens(self, message: str) -> List[str]:
+        """Tokeniza y lematiza un mensaje como en el entrenamiento"""
+        return [self.lemmatizer.lemmatize(word) for word in nltk.word_tokenize(message.lower())]
     
     def _generate_response(self, intent: str, message: str, context: Dict[str, Any] = None) -> str:
         """
@@ -768,20 +958,36 @@ class LucyAI:
             Información del modelo
         """
         try:
+            serving = self.model_manager.active
+            swap_stats = self.model_manager.stats
             model_info = {
-                'model_loaded': self.model is not None,
-                'vocabulary_size': len(self.words) if self.words else 0,
-                'classes_count': len(self.classes) if self.classes else 0,
+                'model_loaded': serving.model is not None,
+                'model_version': serving.version,
+                'model_swaps': swap_stats['swaps'],
+                'language_shards': {
+                    language: {
+                        'version': manager.active.version,
+                        'vocabulary_size': len(manager.active.words),
+                        'classes_count': len(manager.active.classes)
+                    }
+                    for language, manager in self.shard_managers.items()
+                    if manager.active.model is not None
+                },
+                'last_swap_seconds': swap_stats['last_swap_seconds'],
+                'vocabulary_size': len(serving.words),
+                'feature_mode': serving.features.mode,
+                'input_size': serving.features.size,
+                'classes_count': len(serving.classes),
                 'supported_languages': list(self.intents.keys()),
                 'current_language': self.current_language,
                 'context_length': len(self.conversation_context),
                 'max_context_length': self.max_context_length
             }
             
-            if self.model:
+            if serving.model:
                 model_info.update({
-                    'model_input_shape': self.model.input_shape,
-                    'model_output_shape': self.model.output_shape,
+                    'model_input_shape': serving.model.input_shape,
+                    'model_output_shape': serving.model.output_shape,
                 })
             
             return model_info
@@ -823,19 +1029,20 @@ class LucyAI:
             detected_language = get_language(message)
             
             # Predecir intenciones
-            predictions = self._predict_intent(message)
+            predictions = self._predict_intent(message, detected_language)
             
             # Crear bolsa de palabras para análisis
-            bow = self._create_bag_of_words(message)
-            active_words = [word for i, word in enumerate(self.words) if bow[i] > 0]
+            serving = self._serving_for(detected_language)
+            active, _ = serving.features.indices(self._message_tokens(message))
+            active_words = [serving.words[i] for i in active] if serving.words else []
             
             analysis = {
                 'original_message': message,
                 'detected_language': detected_language,
                 'processed_words': active_words,
                 'predictions': predictions,
-                'bag_of_words_size': len(bow),
-                'active_features': int(np.sum(bow)),
+                'bag_of_words_size': serving.features.size,
+                'active_features': int(len(active)),
                 'timestamp': self._get_timestamp()
             }
             
@@ -855,6 +1062,7 @@ class LucyAI:
         try:
             stats = {
                 'model_info': self.get_model_info(),
+                'cascade': self.get_cascade_stats(),
                 'conversation_stats': {
                     'current_language': self.current_language,
                     'context_messages': len(self.conversation_context),
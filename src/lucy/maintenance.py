@@ -0,0 +1,240 @@
+"""
+Mantenimiento de la Base de Datos en Segundo Plano
+==================================================
+
+Tareas periódicas que sacan del camino de las peticiones el trabajo de
+limpieza de `ConversationDB`.
+
+`ContextSweeper` elimina el contexto caducado. Las lecturas de contexto
+solo filtran las filas caducadas; el borrado real lo hace este hilo cada
+`sweep_interval_seconds`, en lotes pequeños (cada uno en su propia
+transacción, recorriendo `idx_context_expiry`) para no retener el bloqueo
+de escritura frente a las inserciones del chat.
+
+`RetentionManager` aplica la retención de conversaciones: archiva (ver
+`ConversationArchive`) y borra las anteriores a `days_to_keep` y las que
+superan `max_conversations`, siempre las más antiguas primero y con el
+mismo esquema de lotes cortos.
+
+`RollupRefresher` mantiene al día los agregados por hora/día de
+`get_metrics_summary` (`ConversationDB.refresh_rollups`), de modo que la
+parte que el resumen calcula en vivo se limite a unos segundos de filas.
+
+Las tres heredan de `PeriodicJob` el hilo (`start`/`stop`), el manejo de
+errores de cada pasada y las estadísticas; cada una implementa `run_once`.
+"""
+
+import abc
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from .logging_system import get_logger
+
+
+def utc_cutoff(days: float) -> str:
+    """Fecha UTC de hace `days` días, en el formato de CURRENT_TIMESTAMP"""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class PeriodicJob(abc.ABC):
+    """
+    Base de las tareas periódicas: un hilo que llama a `run_once` cada
+    `interval` segundos y estadísticas comunes de las pasadas
+
+    Las subclases implementan `run_once` y registran cada pasada con
+    `_record_run`.
+    """
+
+    thread_name = 'lucy-maintenance'
+    error_message = 'Error en tarea de mantenimiento'
+
+    def __init__(self, db, interval_seconds: float, batch_size: int, **counters: int):
+        """
+        Args:
+            db: `ConversationDB`
+            interval_seconds: Segundos entre pasadas
+            batch_size: Filas por transacción
+            counters: Contadores acumulados propios de la tarea (valor inicial)
+        """
+        self.logger = get_logger(__name__)
+        self.db = db
+        self.interval = max(0.1, float(interval_seconds))
+        self.batch_size = max(1, int(batch_size))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = dict({'runs': 0, 'seconds': 0.0, 'last_seconds': None, 'last_run': None,
+                            'last_error': None}, **counters)
+
+    def start(self):
+        """Inicia las pasadas periódicas"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self._stats['last_error'] = str(e)
+                self.logger.error(f"{self.error_message}: {e}")
+
+    @abc.abstractmethod
+    def run_once(self):
+        """Una pasada de la tarea"""
+
+    def _record_run(self, elapsed: float, totals: Dict[str, int], **last: Any):
+        """Suma `totals` a los contadores acumulados y guarda los valores `last`"""
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['seconds'] += elapsed
+            for key, value in totals.items():
+                self._stats[key] += value
+            self._stats.update(last, last_seconds=elapsed, last_run=time.time(), last_error=None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['interval_seconds'] = self.interval
+        stats['batch_size'] = self.batch_size
+        return stats
+
+    def stop(self):
+        """Detiene las pasadas (la que esté en curso termina su lote)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+class ContextSweeper(PeriodicJob):
+    """Borrado periódico y por lotes del contexto caducado"""
+
+    thread_name = 'lucy-context-sweeper'
+    error_message = 'Error barriendo contexto caducado'
+
+    def __init__(self, db, interval_seconds: float = 60.0, batch_size: int = 500,
+                max_batches: int = 100):
+        """
+        Args:
+            db: `ConversationDB`
+            interval_seconds: Segundos entre pasadas
+            batch_size: Filas borradas por transacción
+            max_batches: Lotes máximos por pasada (el resto queda para la siguiente)
+        """
+        super().__init__(db, interval_seconds, batch_size, rows_swept=0)
+        self._stats['last_rows'] = 0
+        self.max_batches = max(1, int(max_batches))
+
+    def run_once(self) -> int:
+        """Una pasada: borra lotes hasta vaciar lo caducado o llegar a `max_batches`"""
+        start = time.perf_counter()
+        deleted = 0
+        for _ in range(self.max_batches):
+            if self._stop.is_set():
+                break
+            rows = self.db.delete_expired_context_batch(self.batch_size)
+            deleted += rows
+            if rows < self.batch_size:
+                break
+        elapsed = time.perf_counter() - start
+        self._record_run(elapsed, {'rows_swept': deleted}, last_rows=deleted)
+        if deleted:
+            self.logger.debug(f"Contexto caducado eliminado: {deleted} filas en {elapsed * 1000:.1f} ms")
+        return deleted
+
+
+class RollupRefresher(PeriodicJob):
+    """Actualización periódica de los agregados de conversaciones"""
+
+    thread_name = 'lucy-rollups'
+    error_message = 'Error actualizando agregados'
+
+    def __init__(self, db, interval_seconds: float = 30.0, batch_size: int = 5000):
+        """
+        Args:
+            db: `ConversationDB`
+            interval_seconds: Segundos entre pasadas
+            batch_size: Conversaciones agregadas por transacción
+        """
+        super().__init__(db, interval_seconds, batch_size, rows_aggregated=0)
+        self._stats['last_rows'] = 0
+
+    def run_once(self) -> int:
+        """Una pasada: agrega las conversaciones nuevas desde la marca de agua"""
+        start = time.perf_counter()
+        rows = self.db.refresh_rollups(self.batch_size)
+        self._record_run(time.perf_counter() - start, {'rows_aggregated': rows}, last_rows=rows)
+        return rows
+
+
+class RetentionManager(PeriodicJob):
+    """Archivado y borrado periódico, por lotes, de los datos fuera de retención"""
+
+    thread_name = 'lucy-retention'
+    error_message = 'Error aplicando la retención'
+
+    def __init__(self, db, days_to_keep: Optional[float] = None, max_conversations: Optional[int] = None,
+                 interval_seconds: float = 3600.0, batch_size: int = 500, max_batches: int = 200):
+        """
+        Args:
+            db: `ConversationDB`
+            days_to_keep: Días de conversaciones, métricas y sesiones a conservar (None = sin límite)
+            max_conversations: Conversaciones máximas en la base de datos (None = sin límite)
+            interval_seconds: Segundos entre pasadas
+            batch_size: Filas archivadas/borradas por transacción
+            max_batches: Lotes máximos por pasada (el resto queda para la siguiente)
+        """
+        super().__init__(db, interval_seconds, batch_size, archived_by_age=0, archived_by_cap=0,
+                         metrics_deleted=0, sessions_deleted=0)
+        self.days_to_keep = days_to_keep
+        self.max_conversations = int(max_conversations) if max_conversations else None
+        self.max_batches = max(1, int(max_batches))
+        self._stats['last_result'] = None
+
+    def _drain(self, batch: Callable[[int], int], budget: int, limit: Optional[int] = None):
+        """Repite `batch(n)` hasta agotar filas, `limit` o el presupuesto de lotes"""
+        total = 0
+        while budget > 0 and not self._stop.is_set() and (limit is None or total < limit):
+            size = self.batch_size if limit is None else min(self.batch_size, limit - total)
+            rows = batch(size)
+            total += rows
+            budget -= 1
+            if rows < size:
+                break
+        return total, budget
+
+    def run_once(self) -> Dict[str, int]:
+        """Una pasada: primero por antigüedad y después por tope de filas"""
+        start = time.perf_counter()
+        result = {'archived_by_age': 0, 'archived_by_cap': 0, 'metrics_deleted': 0, 'sessions_deleted': 0}
+        budget = self.max_batches
+        if self.days_to_keep is not None:
+            cutoff = utc_cutoff(self.days_to_keep)
+            result['archived_by_age'], budget = self._drain(
+                lambda n: self.db.archive_conversations_batch(n, before=cutoff), budget)
+            result['metrics_deleted'], budget = self._drain(
+                lambda n: self.db.delete_old_rows_batch('metrics', cutoff, n), budget)
+            result['sessions_deleted'], budget = self._drain(
+                lambda n: self.db.delete_old_rows_batch('sessions', cutoff, n), budget)
+        if self.max_conversations:
+            excess = self.db.count_conversations() - self.max_conversations
+            if excess > 0:
+                result['archived_by_cap'], budget = self._drain(
+                    lambda n: self.db.archive_conversations_batch(n), budget, limit=excess)
+        elapsed = time.perf_counter() - start
+        self._record_run(elapsed, result, last_result=result)
+        if any(result.values()):
+            self.logger.info(f"Retención aplicada en {elapsed:.2f}s: {result}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats['days_to_keep'] = self.days_to_keep
+        stats['max_conversations'] = self.max_conversations
+        return stats
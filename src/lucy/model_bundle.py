@@ -0,0 +1,295 @@
+"""
+Bundles Versionados del Modelo
+==============================
+
+Un bundle es un directorio autocontenido con todo lo necesario para servir
+el modelo:
+
+    bundles/<versión>/
+        weights/w0.npy ... wN.npy   pesos (orden Keras: W1, b1, W2, b2, ...)
+        vocab.json                  vocabulario (vacío con características hashing)
+                                    (modelo jerárquico: ver metadata['hierarchy'])
+        classes.json                clases
+        metadata.json               versión, hash de intenciones, entrenamiento
+        manifest.json               tamaño y SHA-256 de cada archivo
+
+Se publica escribiendo en un directorio temporal y renombrándolo de forma
+atómica; el archivo `current` apunta a la versión activa y también se
+reemplaza atómicamente. Los pesos se cargan con memory-map y sin pickle.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .backends import NumpyMLP
+from .features import build_features, input_size
+from .hierarchy import HierarchicalModel
+
+BUNDLES_DIR = 'bundles'
+CURRENT_FILE = 'current'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+class BundleError(Exception):
+    """Bundle inexistente, incompleto o inconsistente"""
+
+
+class ModelBundle:
+    """Bundle cargado: pesos (memory-mapped), vocabulario, clases y metadatos"""
+
+    def __init__(self, path: Path, weights: List[np.ndarray], words: List[str],
+                classes: List[str], metadata: Dict[str, Any]):
+        self.path = Path(path)
+        self.version = self.path.name
+        self.weights = weights
+        self.words = words
+        self.classes = classes
+        self.metadata = metadata
+
+    def build_model(self) -> Any:
+        """Red NumPy (plana o jerárquica) que sirve estos pesos sin copiar los arrays mapeados"""
+        if self.metadata.get('hierarchy'):
+            return HierarchicalModel.from_weights(self.weights, self.metadata['hierarchy'], len(self.classes))
+        return NumpyMLP(weights=self.weights)
+    
+    def build_features(self):
+        """Espacio de características con el que se entrenó (vocabulario o hashing)"""
+        return build_features(self.metadata.get('features'), self.words)
+
+
+def _weights_match(weights: List[np.ndarray], words: List[str], classes: List[str],
+                metadata: Optional[Dict[str, Any]]) -> bool:
+    """Primera capa acorde a la entrada y salida acorde a las clases"""
+    if not weights or weights[0].shape[0] != input_size(words, metadata):
+        return False
+    hierarchy = (metadata or {}).get('hierarchy')
+    if hierarchy:
+        return HierarchicalModel.weights_match(weights, hierarchy, len(classes))
+    return weights[-1].shape[0] == len(classes)
+
+
+def _sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_files(paths: Iterable[Path]) -> str:
+    """Hash SHA-256 combinado de varios archivos (p. ej. los de intenciones)"""
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+def _fsync(path: Path):
+    """fsync de archivo o directorio (sin efecto donde no está soportado)"""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_json(path: Path, data: Any):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def bundles_root(models_dir: Path) -> Path:
+    return Path(models_dir) / BUNDLES_DIR
+
+
+def current_version(models_dir: Path) -> Optional[str]:
+    """Versión a la que apunta `current` (None si no hay bundle publicado)"""
+    pointer = Path(models_dir) / CURRENT_FILE
+    try:
+        version = pointer.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def list_versions(models_dir: Path) -> List[str]:
+    """Versiones publicadas, de la más antigua a la más reciente"""
+    root = bundles_root(models_dir)
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir()
+                if p.is_dir() and not p.name.startswith('.') and (p / MANIFEST_FILE).exists())
+
+
+def set_current(models_dir: Path, version: str):
+    """Apunta `current` a una versión existente (reemplazo atómico)"""
+    if not (bundles_root(models_dir) / version / MANIFEST_FILE).exists():
+        raise BundleError(f"Versión de bundle inexistente: {version}")
+    pointer = Path(models_dir) / CURRENT_FILE
+    tmp_pointer = Path(models_dir) / f".{CURRENT_FILE}.{os.getpid()}.tmp"
+    with open(tmp_pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+    _fsync(Path(models_dir))
+
+
+def publish_bundle(models_dir: Path, weights: List[np.ndarray], words: List[str],
+                classes: List[str], metadata: Dict[str, Any] = None, keep: int = 5,
+                activate: bool = True) -> str:
+    """
+    Escribe un bundle nuevo y lo activa
+
+    Args:
+        models_dir: Directorio de modelos
+        weights: Pesos en orden Keras [W1, b1, W2, b2, ...]
+        words: Vocabulario
+        classes: Clases
+        metadata: Metadatos de entrenamiento (JSON-serializables)
+        keep: Bundles a conservar (los más antiguos se eliminan; nunca el activo)
+        activate: Apuntar `current` al bundle (False para candidatos pendientes de validar)
+
+    Returns:
+        Versión publicada
+    """
+    weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+    if not _weights_match(weights, words, classes, metadata):
+        raise BundleError("Los pesos no coinciden con el vocabulario o las clases")
+
+    root = bundles_root(models_dir)
+    root.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    for w in weights:
+        digest.update(w.tobytes())
+    # Prefijo temporal con microsegundos: el orden alfabético es el cronológico
+    version = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{digest.hexdigest()[:8]}"
+    staging = root / f".tmp-{version}-{os.getpid()}"
+    if staging.exists():
+        shutil.rmtree(staging)
+    (staging / 'weights').mkdir(parents=True)
+
+    try:
+        for i, w in enumerate(weights):
+            with open(staging / 'weights' / f'w{i}.npy', 'wb') as f:
+                np.save(f, w)
+                f.flush()
+                os.fsync(f.fileno())
+        _write_json(staging / 'vocab.json', list(words))
+        _write_json(staging / 'classes.json', list(classes))
+        _write_json(staging / 'metadata.json', {
+            'format_version': FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'layers': [list(w.shape) for w in weights],
+            'vocabulary_size': len(words),
+            'classes_count': len(classes),
+            **(metadata or {})
+        })
+
+        manifest = {}
+        for path in sorted(p for p in staging.rglob('*') if p.is_file()):
+            relative = path.relative_to(staging).as_posix()
+            manifest[relative] = {'size': path.stat().st_size, 'sha256': _sha256(path)}
+        _write_json(staging / MANIFEST_FILE, manifest)
+        _fsync(staging / 'weights')
+        _fsync(staging)
+
+        target = root / version
+        if target.exists():
+            # Misma versión ya publicada: reutilizarla
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, target)
+            _fsync(root)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if activate:
+        set_current(models_dir, version)
+    prune_bundles(models_dir, keep)
+    return version
+
+
+def prune_bundles(models_dir: Path, keep: int = 5) -> List[str]:
+    """Elimina bundles antiguos conservando los `keep` más recientes y el activo"""
+    versions = list_versions(models_dir)
+    active = current_version(models_dir)
+    removable = [v for v in versions[:max(0, len(versions) - max(1, keep))] if v != active]
+    for version in removable:
+        shutil.rmtree(bundles_root(models_dir) / version, ignore_errors=True)
+    # Restos de publicaciones interrumpidas
+    root = bundles_root(models_dir)
+    for staging in root.glob('.tmp-*'):
+        if time.time() - staging.stat().st_mtime > 3600:
+            shutil.rmtree(staging, ignore_errors=True)
+    return removable
+
+
+def load_bundle(models_dir: Path, version: str = None, verify_checksums: bool = False) -> ModelBundle:
+    """
+    Carga un bundle en una sola llamada
+
+    La validación por defecto es barata (presencia y tamaño de cada archivo del
+    manifiesto y coherencia de formas); `verify_checksums` recalcula SHA-256.
+
+    Args:
+        models_dir: Directorio de modelos
+        version: Versión a cargar (None = la apuntada por `current`)
+        verify_checksums: Verificar hashes completos
+
+    Returns:
+        ModelBundle con pesos memory-mapped
+
+    Raises:
+        BundleError: Si no hay bundle o no supera la validación
+    """
+    version = version or current_version(models_dir)
+    if not version:
+        raise BundleError("No hay bundle publicado")
+    path = bundles_root(models_dir) / version
+    manifest_path = path / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise BundleError(f"Bundle incompleto: {path}")
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    for relative, entry in manifest.items():
+        file_path = path / relative
+        if not file_path.exists() or file_path.stat().st_size != entry['size']:
+            raise BundleError(f"Archivo ausente o truncado en el bundle: {relative}")
+        if verify_checksums and _sha256(file_path) != entry['sha256']:
+            raise BundleError(f"Checksum inválido en el bundle: {relative}")
+
+    weight_files = sorted((r for r in manifest if r.startswith('weights/')),
+                        key=lambda r: int(Path(r).stem[1:]))
+    weights = [np.load(path / r, mmap_mode='r', allow_pickle=False) for r in weight_files]
+    with open(path / 'vocab.json', 'r', encoding='utf-8') as f:
+        words = json.load(f)
+    with open(path / 'classes.json', 'r', encoding='utf-8') as f:
+        classes = json.load(f)
+    with open(path / 'metadata.json', 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    if not _weights_match(weights, words, classes, metadata):
+        raise BundleError(f"Pesos incoherentes con vocabulario/clases en {path}")
+    return ModelBundle(path, weights, words, classes, metadata)
@@ -0,0 +1,213 @@
+"""
+Gestor de Modelo en Caliente
+============================
+
+Mantiene el modelo que sirve LucyAI y permite cambiarlo sin reiniciar:
+detecta una nueva versión de bundle en `models_dir`, la carga y calienta en
+un hilo de fondo y sustituye la referencia activa de forma atómica. Las
+peticiones en curso conservan su propia referencia al modelo anterior, que
+se libera cuando terminan.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .logging_system import log_performance
+from .features import VocabularyFeatures
+from .model_bundle import ModelBundle, current_version, list_versions, load_bundle, set_current
+
+
+class ServingModel:
+    """Instantánea inmutable de lo necesario para predecir (modelo + características + clases)"""
+
+    def __init__(self, words: List[str] = None, classes: List[str] = None,
+                model: Any = None, version: Optional[str] = None, features: Any = None):
+        self.words = list(words or [])
+        self.classes = list(classes or [])
+        self.model = model
+        self.version = version
+        self.features = features or VocabularyFeatures(self.words)
+        self.word_index = getattr(self.features, 'word_index', {})
+        self.loaded_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        """Hay modelo, clases y entrada no vacía"""
+        return self.model is not None and bool(self.classes) and self.features.size > 0
+
+    def predict_tokens(self, tokens: List[str]) -> np.ndarray:
+        """
+        Probabilidades por clase para un mensaje ya lematizado
+
+        Con modelos que lo soportan (`predict_active`) la primera capa es una
+        suma de filas de los índices activos; si no, se usa el vector denso.
+        """
+        index, values = self.features.indices(tokens)
+        predict_active = getattr(self.model, 'predict_active', None)
+        if predict_active is not None:
+            return predict_active(index, values)
+        vector = np.zeros((1, self.features.size), dtype=np.float32)
+        vector[0, index] = values
+        return self.model.predict(vector, verbose=0)[0]
+
+    @classmethod
+    def from_bundle(cls, bundle: ModelBundle) -> 'ServingModel':
+        return cls(bundle.words, bundle.classes, bundle.build_model(), bundle.version,
+                bundle.build_features())
+
+
+class ModelManager:
+    """Detecta, carga, calienta e intercambia versiones del modelo"""
+
+    def __init__(self, models_dir: Path, initial: ServingModel,
+                warmup: Callable[[ServingModel], None] = None,
+                verify_checksums: bool = False, poll_seconds: float = 10.0):
+        """
+        Inicializa el gestor
+
+        Args:
+            models_dir: Directorio de modelos (bundles y puntero `current`)
+            initial: Modelo activo inicial
+            warmup: Función que ejercita un modelo candidato antes del cambio
+            verify_checksums: Verificar SHA-256 al cargar bundles
+            poll_seconds: Intervalo del vigilante de nuevas versiones
+        """
+        self.logger = logging.getLogger(__name__)
+        self.models_dir = Path(models_dir)
+        self.active = initial
+        self.previous_version: Optional[str] = None
+        self.warmup = warmup
+        self.verify_checksums = verify_checksums
+        self.poll_seconds = float(poll_seconds)
+        self.stats: Dict[str, Any] = {
+            'swaps': 0,
+            'rollbacks': 0,
+            'failures': 0,
+            'last_swap_seconds': None,
+            'last_swap_at': None,
+            'last_error': None
+        }
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Cambio de versión
+    # ------------------------------------------------------------------
+    def check_for_update(self) -> Optional[str]:
+        """Versión publicada distinta de la activa (None si no hay cambios)"""
+        version = current_version(self.models_dir)
+        if version and version != self.active.version:
+            return version
+        return None
+
+    def reload(self, version: str = None, wait: bool = False) -> Optional[bool]:
+        """
+        Carga una versión en segundo plano y la activa
+
+        Args:
+            version: Versión a activar (None = la apuntada por `current`);
+                si se indica, también se actualiza `current`
+            wait: Esperar al resultado
+
+        Returns:
+            Resultado del cambio si wait=True; None si se lanzó en segundo plano
+        """
+        if not wait:
+            threading.Thread(target=self._swap_to, args=(version,),
+                            name='lucy-model-swap', daemon=True).start()
+            return None
+        return self._swap_to(version)
+
+    def rollback(self, wait: bool = True) -> Optional[bool]:
+        """Vuelve a la versión anterior (o a la previa en el historial de bundles)"""
+        target = self.previous_version
+        if not target:
+            versions = list_versions(self.models_dir)
+            if self.active.version in versions:
+                index = versions.index(self.active.version)
+                target = versions[index - 1] if index > 0 else None
+        if not target:
+            self.logger.warning("No hay versión anterior a la que volver")
+            return False
+        self.stats['rollbacks'] += 1
+        return self.reload(target, wait=wait)
+
+    def _swap_to(self, version: Optional[str]) -> bool:
+        with self._swap_lock:
+            target = version or current_version(self.models_dir)
+            if not target:
+                return False
+            if target == self.active.version:
+                return True
+
+            start = time.perf_counter()
+            try:
+                candidate = ServingModel.from_bundle(
+                    load_bundle(self.models_dir, target, verify_checksums=self.verify_checksums)
+                )
+                if self.warmup:
+                    self.warmup(candidate)
+                if version:
+                    # Persistir la elección para que el vigilante y otros procesos coincidan
+                    set_current(self.models_dir, target)
+            except Exception as e:
+                self.stats['failures'] += 1
+                self.stats['last_error'] = str(e)
+                self.logger.error(f"No se pudo activar el modelo {target}: {e}")
+                return False
+
+            # Asignación de referencia: atómica para los lectores. Quien ya
+            # tomó `active` termina con el modelo anterior.
+            self.previous_version = self.active.version
+            self.active = candidate
+            elapsed = time.perf_counter() - start
+
+            self.stats['swaps'] += 1
+            self.stats['last_swap_seconds'] = elapsed
+            self.stats['last_swap_at'] = time.time()
+            self.stats['last_error'] = None
+            log_performance('model.swap_duration', elapsed, unit='s', tags={'version': target})
+            self.logger.info(f"[OK] Modelo activo: {target} (cambio en {elapsed * 1000:.1f} ms)")
+            return True
+
+    # ------------------------------------------------------------------
+    # Vigilante
+    # ------------------------------------------------------------------
+    def start_watcher(self):
+        """Comprueba periódicamente si hay una versión nueva y la activa"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='lucy-model-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                if self.check_for_update():
+                    self._swap_to(None)
+            except Exception as e:
+                self.logger.error(f"Error vigilando nuevas versiones del modelo: {e}")
+
+    def stop(self):
+        """Detiene el vigilante"""
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Versión activa, anterior, publicada y estadísticas de cambios"""
+        return {
+            'active_version': self.active.version,
+            'previous_version': self.previous_version,
+            'published_version': current_version(self.models_dir),
+            'available_versions': list_versions(self.models_dir),
+            'watcher_running': bool(self._watcher and self._watcher.is_alive()),
+            **self.stats
+        }
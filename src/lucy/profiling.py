@@ -0,0 +1,255 @@
+"""
+Perfilado por Etapas del Entrenamiento
+======================================
+
+Registra, para cada etapa del entrenamiento, tiempo de pared, tiempo de CPU
+y memoria pico (RSS del proceso vía `resource` y, opcionalmente, pico de
+asignaciones de Python vía `tracemalloc`). Las etapas se anidan como rutas
+`padre;hija` (formato de flame graph) y se agregan si se repiten (épocas).
+
+Tres formas de medir:
+- `stage(nombre)` / `@profile_stage(nombre)`: etapas con principio y fin claros
+- `timed(nombre, fn)` / `timed_iter(nombre, it)`: acumulan el coste de
+  llamadas intercaladas (tokenización y lematización dentro de un mismo bucle)
+- `lap(nombre)`: callback que mide el intervalo entre llamadas (épocas)
+"""
+
+import functools
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """RSS máximo del proceso hasta ahora en MB (None si no está disponible)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB; macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageProfiler:
+    """Acumula tiempos y memoria por etapa"""
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = False):
+        """
+        Args:
+            enabled: Si es False todas las operaciones son no-ops
+            trace_memory: Activar `tracemalloc` (más preciso, con sobrecoste)
+        """
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        # Etapas acumuladas por timed/timed_iter: [wall, cpu, llamadas]
+        self._accumulators: Dict[str, List[float]] = {}
+        self._stack: List[str] = []
+        # Orden de primera aparición de cada etapa (para el resumen)
+        self._order: Dict[str, int] = {}
+        # Pico de tracemalloc de cada etapa abierta visto antes de reiniciarlo
+        self._stack_peaks: List[float] = []
+        self._started_tracing = False
+        self._start_wall = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def _path(self, name: str) -> str:
+        path = ';'.join(self._stack + [name])
+        self._order.setdefault(path, len(self._order))
+        return path
+
+    def _record(self, path: str, wall: float, cpu: float,
+                traced_peak: Optional[float] = None, rss: Optional[float] = None, calls: int = 1):
+        entry = self.stages.setdefault(path, {
+            'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+            'wall_min': None, 'wall_max': None,
+            'peak_traced_mb': None, 'peak_rss_mb': None
+        })
+        entry['calls'] += calls
+        entry['wall_seconds'] += wall
+        entry['cpu_seconds'] += cpu
+        if calls == 1:
+            entry['wall_min'] = wall if entry['wall_min'] is None else min(entry['wall_min'], wall)
+            entry['wall_max'] = wall if entry['wall_max'] is None else max(entry['wall_max'], wall)
+        if traced_peak is not None:
+            entry['peak_traced_mb'] = max(entry['peak_traced_mb'] or 0.0, traced_peak)
+        if rss is not None:
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, rss)
+
+    def _traced_peak_mb(self) -> Optional[float]:
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+    def _reset_traced_peak(self):
+        """Reinicia el pico sin perderlo para las etapas abiertas"""
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = self._traced_peak_mb()
+            self._stack_peaks = [max(p, peak) for p in self._stack_peaks]
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Mide una etapa; las etapas abiertas dentro quedan como hijas"""
+        if not self.enabled:
+            yield
+            return
+        path = self._path(name)
+        self._reset_traced_peak()
+        self._stack.append(name)
+        self._stack_peaks.append(0.0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            elapsed, cpu_elapsed = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+            seen = self._stack_peaks.pop()
+            current = self._traced_peak_mb()
+            traced_peak = max(seen, current) if current is not None else None
+            self._stack_peaks = [max(p, traced_peak or 0.0) for p in self._stack_peaks]
+            self._record(path, elapsed, cpu_elapsed, traced_peak, peak_rss_mb())
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """Envuelve una función para acumular su coste bajo la etapa actual"""
+        if not self.enabled:
+            return func
+        path = self._path(name)
+        totals = self._accumulator(path)
+
+        def wrapper(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                totals[0] += time.perf_counter() - wall
+                totals[1] += time.process_time() - cpu
+                totals[2] += 1
+        return wrapper
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Acumula el tiempo empleado en producir cada elemento de un iterador"""
+        if not self.enabled:
+            yield from iterable
+            return
+        totals = self._accumulator(self._path(name))
+        iterator = iter(iterable)
+        while True:
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                totals[0] += time.perf_counter() - wall
+                totals[1] += time.process_time() - cpu
+            totals[2] += 1
+            yield item
+
+    def _accumulator(self, path: str) -> List[float]:
+        return self._accumulators.setdefault(path, [0.0, 0.0, 0])
+
+    def lap(self, name: str) -> Callable[..., None]:
+        """
+        Callback que registra el intervalo desde la llamada anterior
+
+        Útil para épocas cuando el backend solo avisa al final de cada una.
+        """
+        if not self.enabled:
+            return lambda *args, **kwargs: None
+        path = self._path(name)
+        last = [time.perf_counter(), time.process_time()]
+        self._reset_traced_peak()
+
+        def record(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.process_time()
+            self._record(path, wall - last[0], cpu - last[1], self._traced_peak_mb(), peak_rss_mb())
+            self._reset_traced_peak()
+            last[0], last[1] = time.perf_counter(), time.process_time()
+        return record
+
+    def _flush_accumulators(self):
+        for path, (wall, cpu, calls) in self._accumulators.items():
+            if calls:
+                self._record(path, wall, cpu, calls=int(calls))
+        self._accumulators = {}
+
+    def report(self) -> Dict[str, Any]:
+        """Sección `profile` del reporte de entrenamiento"""
+        self._flush_accumulators()
+        total = time.perf_counter() - self._start_wall
+        stages = []
+        for path, entry in self.stages.items():
+            parts = path.split(';')
+            stages.append(dict(
+                entry, stage=path,
+                share=entry['wall_seconds'] / total if total > 0 else 0.0,
+                order=[self._order.get(';'.join(parts[:i + 1]), 0) for i in range(len(parts))]
+            ))
+        stages.sort(key=lambda entry: entry['order'])
+        return {
+            'total_seconds': total,
+            'peak_rss_mb': peak_rss_mb(),
+            'trace_memory': self.trace_memory,
+            'stages': stages
+        }
+
+    def close(self):
+        """Detiene tracemalloc si lo inició este perfilador"""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+
+
+def profile_stage(name: str):
+    """Decorador de métodos: mide cada llamada como etapa de `self.profiler`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None:
+                return func(self, *args, **kwargs)
+            with profiler.stage(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_profile(profile: Dict[str, Any], width: int = 30) -> str:
+    """
+    Resumen estilo flame graph: árbol de etapas con barras proporcionales
+
+    Args:
+        profile: Salida de `StageProfiler.report()`
+        width: Ancho de la barra para el 100 % del tiempo total
+
+    Returns:
+        Texto multilínea para la consola
+    """
+    total = profile.get('total_seconds') or 0.0
+    lines = [f"Perfil de entrenamiento ({total:.2f}s, RSS pico "
+            f"{profile['peak_rss_mb']:.0f} MB)" if profile.get('peak_rss_mb') is not None
+            else f"Perfil de entrenamiento ({total:.2f}s)"]
+    for entry in profile.get('stages', []):
+        parts = entry['stage'].split(';')
+        share = entry.get('share', 0.0)
+        bar = '█' * max(1 if share > 0 else 0, int(round(share * width)))
+        calls = f" ×{entry['calls']}" if entry['calls'] > 1 else ''
+        memory = []
+        if entry.get('peak_traced_mb') is not None:
+            memory.append(f"py {entry['peak_traced_mb']:.1f} MB")
+        if entry.get('peak_rss_mb') is not None:
+            memory.append(f"rss {entry['peak_rss_mb']:.0f} MB")
+        lines.append(f"{'  ' * (len(parts) - 1)}{parts[-1]:<{24 - 2 * (len(parts) - 1)}} "
+                    f"{bar:<{width}} {share:6.1%} {entry['wall_seconds']:8.3f}s "
+                    f"cpu {entry['cpu_seconds']:7.3f}s{calls}"
+                    f"{'  ' + ', '.join(memory) if memory else ''}")
+    return '\n'.join(lines)
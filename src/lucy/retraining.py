@@ -0,0 +1,280 @@
+"""
+Re-entrenamiento Automático
+===========================
+
+Orquestador que actúa sobre `training.auto_retrain` y `retrain_threshold`:
+cuenta las filas nuevas de `learning_data` y los turnos de baja confianza
+desde la última ejecución y, al superar el umbral, entrena un candidato en
+un subproceso de baja prioridad con hilos limitados (sin afectar a la
+latencia del servicio). El candidato se publica sin activar; solo se
+promueve a `current` si no empeora frente al modelo en servicio, y LucyAI lo
+recoge con el cambio en caliente. El historial queda en la tabla `metrics`.
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .logging_system import log_performance
+from .model_bundle import bundles_root, set_current
+
+RUN_METRIC = 'retrain.run'
+
+# Variables que limitan los hilos de BLAS/OpenMP/TensorFlow del subproceso
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'NUMEXPR_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+
+class RetrainOrchestrator:
+    """Decide cuándo re-entrenar, lanza el entrenamiento y promueve el candidato"""
+
+    def __init__(self, config_manager, db):
+        """
+        Inicializa el orquestador
+
+        Args:
+            config_manager: Gestor de configuración
+            db: `ConversationDB` con learning_data, conversations y metrics
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config_manager = config_manager
+        self.db = db
+
+        training_cfg = config_manager.get('training', {}) or {}
+        retrain_cfg = training_cfg.get('retrain', {}) or {}
+        self.enabled = bool(training_cfg.get('auto_retrain', False))
+        self.threshold = int(training_cfg.get('retrain_threshold', 100))
+        self.check_interval = float(retrain_cfg.get('check_interval_seconds', 300))
+        self.low_confidence = float(retrain_cfg.get('low_confidence_threshold', 0.4))
+        self.max_threads = max(1, int(retrain_cfg.get('max_threads', 2)))
+        self.nice = int(retrain_cfg.get('nice', 10))
+        self.max_accuracy_drop = float(retrain_cfg.get('max_accuracy_drop', 0.0))
+        self.timeout = float(retrain_cfg.get('timeout_seconds', 3600))
+        self.include_learning_data = bool(retrain_cfg.get('include_learning_data', True))
+        self.models_dir = Path(config_manager.get_path('models_dir'))
+
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    # ------------------------------------------------------------------
+    # Decisión
+    # ------------------------------------------------------------------
+    def pending_signals(self) -> Dict[str, int]:
+        """Datos nuevos desde la marca de la última ejecución"""
+        last = self.db.get_latest_metric(RUN_METRIC) or {}
+        signals = self.db.count_retrain_signals(
+            after_learning_id=int(last.get('learning_id', 0)),
+            after_conversation_id=int(last.get('conversation_id', 0)),
+            low_confidence=self.low_confidence
+        )
+        signals['total'] = signals['learning_data'] + signals['low_confidence']
+        return signals
+
+    def should_retrain(self, signals: Dict[str, int] = None) -> bool:
+        signals = signals or self.pending_signals()
+        return signals['total'] >= self.threshold
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+    def run_once(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Comprueba el umbral y, si procede, entrena y evalúa un candidato
+
+        Args:
+            force: Ignorar el umbral
+
+        Returns:
+            Registro de la ejecución (None si no se lanzó)
+        """
+        if not self._run_lock.acquire(blocking=False):
+            self.logger.info("Re-entrenamiento ya en curso")
+            return None
+        try:
+            signals = self.pending_signals()
+            if not force and not self.should_retrain(signals):
+                return None
+
+            self.logger.info(f"🔁 Re-entrenamiento automático: {signals['learning_data']} patrones nuevos, "
+                            f"{signals['low_confidence']} turnos de baja confianza")
+            start = time.time()
+            record: Dict[str, Any] = {
+                'started_at': datetime.now().isoformat(),
+                'learning_id': signals['learning_id'],
+                'conversation_id': signals['conversation_id'],
+                'signals': {k: signals[k] for k in ('learning_data', 'low_confidence')}
+            }
+            try:
+                result = self._train_candidate()
+                record.update(self._decide(result))
+            except Exception as e:
+                record.update(status='failed', promoted=False, reason=str(e))
+                self.logger.error(f"Re-entrenamiento automático fallido: {e}")
+
+            record['duration_seconds'] = time.time() - start
+            # La marca avanza también si el candidato se descarta: se
+            # re-entrena de nuevo al acumular otro umbral de datos
+            self.db.save_metric(RUN_METRIC, record)
+            log_performance('retrain.duration', record['duration_seconds'], unit='s',
+                            tags={'status': record['status']})
+            self.last_result = record
+            return record
+        finally:
+            self._run_lock.release()
+
+    def _command(self, result_path: Path) -> List[str]:
+        command = [sys.executable, '-m', 'src.lucy.training', '--candidate', '--force',
+                '--result', str(result_path)]
+        config_path = getattr(self.config_manager, 'config_path', None)
+        if config_path:
+            command += ['--config', str(config_path)]
+        if self.include_learning_data:
+            command.append('--learning-data')
+        return command
+
+    def _environment(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        for name in _THREAD_ENV_VARS:
+            env[name] = str(self.max_threads)
+        env.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+        return env
+
+    def _popen_options(self) -> Dict[str, Any]:
+        """Prioridad baja del subproceso en Windows (en POSIX ver `_niced`)"""
+        if os.name == 'nt':
+            return {'creationflags': getattr(subprocess, 'BELOW_NORMAL_PRIORITY_CLASS', 0)}
+        return {}
+
+    def _niced(self, command: List[str]) -> List[str]:
+        """
+        Antepone `nice -n N` al comando en POSIX
+
+        Sin preexec_fn, que no es seguro con hilos en el proceso padre; si no
+        hay `nice` en el PATH, `_train_candidate` baja la prioridad con
+        os.setpriority tras lanzar el subproceso.
+        """
+        if os.name == 'nt' or self.nice <= 0 or not shutil.which('nice'):
+            return command
+        return ['nice', '-n', str(self.nice)] + command
+
+    def _train_candidate(self) -> Dict[str, Any]:
+        """Entrena el candidato en un subproceso y devuelve su resultado"""
+        workdir = Path(tempfile.mkdtemp(prefix='lucy-retrain-'))
+        result_path = workdir / 'result.json'
+        try:
+            command = self._command(result_path)
+            niced = self._niced(command)
+            process = subprocess.Popen(
+                niced,
+                cwd=str(self.config_manager.project_root),
+                env=self._environment(),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                **self._popen_options()
+            )
+            if niced is command and os.name != 'nt' and self.nice > 0:
+                try:
+                    os.setpriority(os.PRIO_PROCESS, process.pid, self.nice)
+                except OSError as e:
+                    self.logger.warning(f"[WARN] No se pudo bajar la prioridad del entrenamiento: {e}")
+            try:
+                _, stderr = process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise RuntimeError(f"Entrenamiento candidato excedió {self.timeout:.0f}s")
+            if not result_path.exists():
+                tail = (stderr or b'').decode('utf-8', errors='replace')[-500:]
+                raise RuntimeError(f"Entrenamiento candidato terminó con código {process.returncode}: {tail}")
+            with open(result_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _decide(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Promueve el candidato solo si no empeora al modelo en servicio
+
+        Sin una comparación válida (modelo en servicio sin bundle, bundle no
+        evaluable o validación no comparable) el candidato queda publicado
+        sin activar (`held`) para promoverlo a mano; solo se promueve sin
+        comparar cuando no hay ningún modelo en servicio.
+        """
+        version = result.get('version')
+        if not result.get('success') or not version:
+            return {'status': 'failed', 'promoted': False, 'candidate_version': version,
+                    'reason': 'entrenamiento sin éxito'}
+
+        candidate = result.get('candidate') or {}
+        baseline = result.get('baseline')
+        decision = {
+            'candidate_version': version,
+            'candidate_accuracy': candidate.get('accuracy'),
+            'baseline_version': baseline.get('version') if baseline else None,
+            'baseline_accuracy': baseline.get('accuracy') if baseline else None
+        }
+
+        if baseline is None and result.get('serving_model', 'none') != 'none':
+            self.logger.warning(f"[WARN] Candidato {version} sin promover: el modelo en servicio "
+                                f"({result.get('serving_model')}) no se pudo evaluar")
+            return dict(decision, status='held', promoted=False, reason='modelo en servicio sin evaluar')
+        if baseline is not None and not baseline.get('comparable', False):
+            self.logger.warning(f"[WARN] Candidato {version} sin promover: la validación no es "
+                                f"comparable con la del modelo en servicio")
+            return dict(decision, status='held', promoted=False, reason='validación no comparable')
+
+        if baseline and candidate.get('accuracy', 0.0) < baseline['accuracy'] - self.max_accuracy_drop:
+            # Descartar el bundle para que nadie lo active por error
+            shutil.rmtree(bundles_root(self.models_dir) / version, ignore_errors=True)
+            self.logger.warning(f"[WARN] Candidato {version} descartado: accuracy "
+                                f"{candidate.get('accuracy', 0.0):.4f} < {baseline['accuracy']:.4f}")
+            return dict(decision, status='rejected', promoted=False, reason='regresión de accuracy')
+
+        set_current(self.models_dir, version)
+        self.logger.info(f"[OK] Candidato {version} promovido a modelo en servicio")
+        return dict(decision, status='promoted', promoted=True)
+
+    # ------------------------------------------------------------------
+    # Planificador
+    # ------------------------------------------------------------------
+    def start(self):
+        """Inicia la comprobación periódica (solo si auto_retrain está activo)"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='lucy-retrain', daemon=True)
+        self._thread.start()
+        self.logger.info(f"[OK] Re-entrenamiento automático activo (umbral {self.threshold})")
+
+    def _loop(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error(f"Error en el planificador de re-entrenamiento: {e}")
+
+    def stop(self):
+        """Detiene el planificador (no interrumpe un entrenamiento en curso)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'running': self._run_lock.locked(),
+            'pending': self.pending_signals(),
+            'last_run': self.last_result or self.db.get_latest_metric(RUN_METRIC)
+        }
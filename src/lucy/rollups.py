@@ -0,0 +1,215 @@
+"""
+Agregados de Conversaciones (rollups)
+=====================================
+
+Resúmenes por hora y por día de la tabla `conversations`, para que
+`get_metrics_summary` y los paneles sumen unas pocas filas en lugar de
+recorrer las conversaciones de la ventana.
+
+Por cubo (hora o día), idioma e intención se guardan el número de
+conversaciones, sumas y recuentos de confianza y tiempo de respuesta y un
+histograma de tiempos de respuesta (`HISTOGRAM_BOUNDS`). Las sesiones
+distintas de cada cubo se guardan como un `SessionSketch` (HyperLogLog),
+que se combina entre cubos sin contar dos veces una sesión.
+
+Este módulo solo contiene la aritmética; las tablas y su actualización
+incremental están en `ConversationDB.refresh_rollups`.
+"""
+
+import hashlib
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Límites superiores (segundos) de los cubos del histograma; el último cubo es el resto
+HISTOGRAM_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+GRANULARITIES = ('hour', 'day')
+
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def bucket_of(timestamp: str, granularity: str) -> str:
+    """Cubo de una marca de tiempo: 'YYYY-MM-DD HH:00:00' (hora) o 'YYYY-MM-DD' (día)"""
+    timestamp = str(timestamp or '')
+    return f"{timestamp[:13]}:00:00" if granularity == 'hour' else timestamp[:10]
+
+
+def window_buckets(since: str) -> Tuple[str, str]:
+    """
+    Reparte la ventana [since, ...) entre cubos completos
+
+    Returns:
+        (first_hour, first_day): las filas en [since, first_hour) no llenan
+        su hora y se calculan en vivo; las horas desde `first_hour` hasta
+        `first_day` (excluido) y los días desde `first_day` salen de los
+        agregados.
+    """
+    start = datetime.strptime(since, _TIMESTAMP_FORMAT)
+    hour = start.replace(minute=0, second=0)
+    if hour < start:
+        hour += timedelta(hours=1)
+    day = hour.replace(hour=0)
+    if day < hour:
+        day += timedelta(days=1)
+    return hour.strftime(_TIMESTAMP_FORMAT), day.strftime("%Y-%m-%d")
+
+
+def _histogram_sql() -> str:
+    slots = []
+    lower = None
+    for bound in HISTOGRAM_BOUNDS + (None,):
+        conditions = ['response_time IS NOT NULL']
+        if lower is not None:
+            conditions.append(f'response_time > {lower}')
+        if bound is not None:
+            conditions.append(f'response_time <= {bound}')
+        slots.append(f"SUM({' AND '.join(conditions)})")
+        lower = bound
+    return " || ',' || ".join(slots)
+
+
+# Columnas de conversation_rollups calculadas en vivo sobre `conversations`
+# (agrupando por idioma e intención), para RollupTotals.from_row
+LIVE_TOTALS_SQL = f'''
+    COALESCE(language, '') AS language, COALESCE(intent, '') AS intent,
+    COUNT(*) AS conversations,
+    COUNT(confidence) AS confidence_count, COALESCE(SUM(confidence), 0) AS confidence_sum,
+    COUNT(response_time) AS response_time_count, COALESCE(SUM(response_time), 0) AS response_time_sum,
+    {_histogram_sql()} AS response_time_hist
+'''
+
+
+class SessionSketch:
+    """HyperLogLog de identificadores de sesión (2^precision registros de un byte)"""
+
+    def __init__(self, registers: Optional[bytes] = None, precision: int = 10):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("Tamaño de registros incompatible con la precisión")
+
+    def add(self, value: Any):
+        h = int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: Optional[bytes]):
+        if other:
+            self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other))
+
+    def estimate(self) -> int:
+        m = self.size
+        zeros = self.registers.count(0)
+        if zeros == m:
+            return 0
+        raw = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in self.registers)
+        # Corrección de rango bajo (linear counting): casi exacta con pocas sesiones
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+class RollupTotals:
+    """Contadores de un grupo (cubo/idioma/intención o una ventana completa)"""
+
+    __slots__ = ('conversations', 'confidence_count', 'confidence_sum',
+                 'response_time_count', 'response_time_sum', 'histogram')
+
+    def __init__(self):
+        self.conversations = 0
+        self.confidence_count = 0
+        self.confidence_sum = 0.0
+        self.response_time_count = 0
+        self.response_time_sum = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, confidence: Optional[float], response_time: Optional[float]):
+        self.conversations += 1
+        if confidence is not None:
+            self.confidence_count += 1
+            self.confidence_sum += confidence
+        if response_time is not None:
+            self.response_time_count += 1
+            self.response_time_sum += response_time
+            slot = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS) if response_time <= bound),
+                        len(HISTOGRAM_BOUNDS))
+            self.histogram[slot] += 1
+
+    def merge(self, other: 'RollupTotals'):
+        self.conversations += other.conversations
+        self.confidence_count += other.confidence_count
+        self.confidence_sum += other.confidence_sum
+        self.response_time_count += other.response_time_count
+        self.response_time_sum += other.response_time_sum
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    @classmethod
+    def from_row(cls, row) -> 'RollupTotals':
+        totals = cls()
+        totals.conversations = row['conversations']
+        totals.confidence_count = row['confidence_count']
+        totals.confidence_sum = row['confidence_sum']
+        totals.response_time_count = row['response_time_count']
+        totals.response_time_sum = row['response_time_sum']
+        totals.histogram = [int(x) for x in row['response_time_hist'].split(',')]
+        return totals
+
+    def to_row(self) -> Tuple:
+        return (self.conversations, self.confidence_count, self.confidence_sum,
+                self.response_time_count, self.response_time_sum, ','.join(map(str, self.histogram)))
+
+
+class RollupAccumulator:
+    """Agrega filas de conversaciones por cubo, idioma e intención"""
+
+    def __init__(self, granularities: Iterable[str] = GRANULARITIES):
+        self.granularities = tuple(granularities)
+        self.groups: Dict[Tuple[str, str, str, str], RollupTotals] = {}
+        self.sessions: Dict[Tuple[str, str], SessionSketch] = {}
+
+    def add(self, row):
+        for granularity in self.granularities:
+            bucket = bucket_of(row['timestamp'], granularity)
+            key = (granularity, bucket, row['language'] or '', row['intent'] or '')
+            self.groups.setdefault(key, RollupTotals()).add(row['confidence'], row['response_time'])
+            self.sessions.setdefault((granularity, bucket), SessionSketch()).add(row['session_id'])
+
+
+def summarize(groups: Iterable[Tuple[str, str, RollupTotals]], sketch: SessionSketch,
+              hours: int) -> Dict[str, Any]:
+    """Resumen de `get_metrics_summary` a partir de (idioma, intención, totales)"""
+    total = RollupTotals()
+    languages: Dict[str, int] = {}
+    intents: Dict[str, int] = {}
+    for language, intent, totals in groups:
+        total.merge(totals)
+        languages[language] = languages.get(language, 0) + totals.conversations
+        if intent:
+            intents[intent] = intents.get(intent, 0) + totals.conversations
+
+    def ranked(counts: Dict[str, int], name: str) -> List[Dict[str, Any]]:
+        return [{name: key, 'count': count}
+                for key, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])) if count]
+
+    return {
+        'total_conversations': total.conversations,
+        'average_confidence': total.confidence_sum / total.confidence_count if total.confidence_count else None,
+        'languages_usage': ranked(languages, 'language'),
+        'active_sessions': sketch.estimate(),
+        'period_hours': hours,
+        'intents_usage': ranked(intents, 'intent'),
+        'average_response_time': (total.response_time_sum / total.response_time_count
+                                  if total.response_time_count else None),
+        'response_time_histogram': {
+            'bounds': list(HISTOGRAM_BOUNDS),
+            'counts': total.histogram
+        }
+    }
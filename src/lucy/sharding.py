@@ -0,0 +1,108 @@
+"""
+Modelos por Idioma (Shards)
+===========================
+
+Además del modelo conjunto, el entrenador puede emitir un modelo más pequeño
+por idioma, entrenado en paralelo. Cada shard es un directorio de bundles
+independiente:
+
+    <models_dir>/shards/<idioma>/bundles/<versión>/...
+    <models_dir>/shards/<idioma>/current
+
+El vocabulario y la capa softmax de cada shard solo contienen su idioma, de
+modo que LucyAI paga memoria y cómputo únicamente por el idioma detectado y
+recurre al modelo conjunto si no hay shard o si el conjunto es más
+reciente (un candidato promovido no reentrena los shards).
+"""
+
+import copy
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SHARDS_DIR = 'shards'
+
+logger = logging.getLogger(__name__)
+
+
+def shard_dir(models_dir: Path, language: str) -> Path:
+    """Directorio de bundles del shard de un idioma"""
+    return Path(models_dir) / SHARDS_DIR / language
+
+
+def _train_shard(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Entrena el shard de un idioma (se ejecuta en un proceso hijo)"""
+    from .config_manager import ConfigManager
+    from .training import LucyTrainer
+
+    start = time.perf_counter()
+    trainer = LucyTrainer(ConfigManager(config_path=task['config_path'], auto_reload=False))
+    success = trainer.run_full_training(languages=[task['language']], force_retrain=True)
+    return {
+        'language': task['language'],
+        'success': bool(success),
+        'version': trainer.bundle_version,
+        'vocabulary_size': len(trainer.words),
+        'classes_count': len(trainer.classes),
+        'samples': trainer.documents_count,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def train_language_shards(trainer: Any, languages: List[str],
+                        workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Entrena un modelo por idioma en procesos paralelos
+
+    Args:
+        trainer: `LucyTrainer` cuya configuración efectiva heredan los shards
+        languages: Idiomas a entrenar
+        workers: Procesos en paralelo (None/0 = min(idiomas, CPUs))
+
+    Returns:
+        Resultado por idioma y duración total
+    """
+    workers = int(workers or min(len(languages), os.cpu_count() or 1)) or 1
+    models_dir = Path(trainer.data_paths['models_dir'])
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='lucy_shards_') as tmp:
+        tasks = []
+        for language in languages:
+            # Misma configuración efectiva (incluye overrides de CLI) con su
+            # propio directorio de modelos; los shards no generan shards
+            config = copy.deepcopy(trainer.config_manager.get_all())
+            config.setdefault('model', {}).update(training_epochs=trainer.epochs,
+                                                batch_size=trainer.batch_size,
+                                                dropout_rate=trainer.dropout_rate)
+            config.setdefault('training', {}).update(backend=trainer.backend,
+                                                    learning_rate=trainer.learning_rate,
+                                                    input_pipeline=trainer.input_pipeline,
+                                                    seed=trainer.seed,
+                                                    shards={'enabled': False})
+            config['training']['learning_data'] = dict(trainer.learning_data_config)
+            config.setdefault('paths', {})['models_dir'] = str(shard_dir(models_dir, language))
+            config_path = Path(tmp) / f'config_{language}.json'
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f)
+            tasks.append({'language': language, 'config_path': str(config_path)})
+
+        logger.info(f"🌐 Entrenando {len(tasks)} shards por idioma en {workers} procesos")
+        if workers == 1:
+            results = [_train_shard(task) for task in tasks]
+        else:
+            # 'spawn' evita heredar el estado de TensorFlow del proceso padre
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+                results = list(pool.map(_train_shard, tasks))
+
+    return {
+        'languages': {result['language']: result for result in results},
+        'workers': workers,
+        'seconds': time.perf_counter() - start
+    }
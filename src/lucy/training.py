@@ -8,30 +8,56 @@ procesamiento de intenciones y optimización del modelo.
 
 import os
 import json
+import time
 import pickle
-import random
 import logging
 import numpy as np
+from scipy import sparse
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterator, List, Tuple, Any
 import random as pyrandom
 
 # Configurar TensorFlow antes de importar
-from .utils import suppress_tf_logs, load_json_file, measure_execution_time
+from .utils import suppress_tf_logs, measure_execution_time
 from .logging_system import log_performance
 from .config_manager import get_config_manager
 
-# Importaciones con supresión de logs
+from .backends import NumpyMLP, SklearnMLP, BACKENDS
+from .evaluation import classification_metrics, compare_feature_spaces, run_cross_validation
+from .ingestion import (build_vocabulary, holdout_fraction, iter_feature_batches, iter_intent_groups,
+                        iter_intent_patterns, sparse_feature_matrix,
+                        iter_learning_patterns, normalize_documents)
+from .model_bundle import BundleError, ModelBundle, current_version, hash_files, load_bundle, publish_bundle
+from .sharding import train_language_shards
+from .features import HASHING, VocabularyFeatures, build_features, prune_vocabulary
+from .hierarchy import AUTO_GROUP_PREFIX, HierarchicalModel, assign_groups
+from .profiling import StageProfiler, format_profile, profile_stage
+from .checkpoints import (CheckpointWriter, make_checkpoint_callback,
+                        make_keras_checkpoint_callback, restore_keras_optimizer_state)
+
+# Importaciones con supresión de logs. TensorFlow/Keras se importa de forma
+# diferida solo cuando training.backend == 'keras'.
 with suppress_tf_logs():
     import nltk
     from nltk.stem import WordNetLemmatizer
-    from tensorflow.keras.models import Sequential
-    from tensorflow.keras.layers import Dense, Activation, Dropout
-    from tensorflow.keras.optimizers import SGD
-    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, CSVLogger
     from sklearn.model_selection import train_test_split
 
 
+def _json_default(value: Any) -> Any:
+    """Convierte tipos de NumPy a tipos nativos para json.dump"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+# Esquema de la validación fija por hash de contenido (ingestion.holdout_fraction)
+HOLDOUT_SCHEME = 'content-hash-v1'
+
+
 class LucyTrainer:
     """Sistema de entrenamiento para Lucy AI"""
     
@@ -51,16 +77,70 @@ class LucyTrainer:
         self.batch_size = self.config.get('model', {}).get('batch_size', 5)
         self.dropout_rate = self.config.get('model', {}).get('dropout_rate', 0.5)
         self.validation_split = self.config.get('training', {}).get('validation_split', 0.2)
+        # Validación fija por contenido (ver _split_validation): máscara por fila
+        # de prepare_training_data y esquema usado en la última división
+        self.holdout_mask = None
+        self.validation_scheme = None
         self.seed = int(self.config.get('training', {}).get('seed', 42))
         self.enable_early_stopping = bool(self.config.get('training', {}).get('early_stopping', True))
         self.enable_lr_schedule = bool(self.config.get('training', {}).get('reduce_lr_on_plateau', True))
         self.enable_csv_logger = bool(self.config.get('training', {}).get('csv_logger', True))
+        self.learning_rate = float(self.config.get('training', {}).get('learning_rate', 0.01))
+        
+        # Pipeline de entrada: 'numpy' (arrays directos a fit) o 'tf_data'
+        self.input_pipeline = str(self.config.get('training', {}).get('input_pipeline', 'numpy')).lower()
+        self.shuffle_buffer = int(self.config.get('training', {}).get('shuffle_buffer', 1024))
+        self.autotune_config = self.config.get('training', {}).get('autotune', {}) or {}
+        self.cv_config = self.config.get('training', {}).get('cross_validation', {}) or {}
+        self.shards_config = self.config.get('training', {}).get('shards', {}) or {}
+        # Espacio de características: vocabulario exacto o hashing con signo
+        self.features_config = self.config.get('training', {}).get('features', {}) or {}
+        # Entrada dispersa (CSR): la memoria de X escala con los tokens, no con N × V
+        self.sparse_inputs = bool(self.config.get('training', {}).get('sparse_inputs', True))
+        # Modo jerárquico: clasificador por grupos + cabezas por grupo
+        self.hierarchy_config = self.config.get('training', {}).get('hierarchy', {}) or {}
+        # Poda del vocabulario (frecuencia mínima, tamaño máximo, chi²/MI)
+        self.pruning_config = self.config.get('training', {}).get('pruning', {}) or {}
+        
+        # Checkpoints asíncronos: cada N épocas, se conservan los K mejores
+        self.save_checkpoints = bool(self.config.get('training', {}).get('save_checkpoints', True))
+        self.checkpoint_interval = int(self.config.get('training', {}).get('checkpoint_interval', 50))
+        self.keep_best_checkpoints = int(self.config.get('training', {}).get('keep_best_checkpoints', 3))
+        self.resume = False
+        
+        # Ingesta en streaming (archivos de intenciones y learning_data)
+        self.ingestion_config = self.config.get('training', {}).get('ingestion', {}) or {}
+        self.learning_data_config = self.config.get('training', {}).get('learning_data', {}) or {}
+        self.keep_documents = bool(self.ingestion_config.get('keep_documents', False))
+        self.bundles_to_keep = int(self.config.get('training', {}).get('bundles_to_keep', 5))
+        self.bundle_version = None
+        # Modo candidato (re-entrenamiento automático): el bundle se publica
+        # sin activarlo y se compara con el modelo en servicio
+        self.candidate = False
+        
+        # Backend de entrenamiento: 'keras', 'numpy' o 'sklearn'
+        self.backend = str(self.config.get('training', {}).get('backend', 'keras')).lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend de entrenamiento no soportado: {self.backend}")
+        
+        # Secciones adicionales para training_report.json
+        self.report_sections: Dict[str, Any] = {}
+        
+        # Perfil por etapas (tiempo de pared, CPU y memoria pico)
+        profiling_cfg = self.config.get('training', {}).get('profiling', {}) or {}
+        self.profiler = StageProfiler(enabled=bool(profiling_cfg.get('enabled', True)),
+                                    trace_memory=bool(profiling_cfg.get('trace_memory', False)))
+        self.profile = None
         
         # Componentes del modelo
         self.lemmatizer = WordNetLemmatizer()
         self.words = []
         self.classes = []
+        self.features = VocabularyFeatures([])
+        self.pruning = None
         self.documents = []
+        self.documents_count = 0
+        self.languages = None
         self.ignore_words = ['?', '¿', '¡', '!', '.', ',', "'", '"', ':', ';']
         
         # Paths
@@ -79,7 +159,9 @@ class LucyTrainer:
             'models_dir': Path(self.config_manager.get_path('models_dir')),
             'words_file': Path(self.config_manager.get_path('models_dir')) / 'words.pkl',
             'classes_file': Path(self.config_manager.get_path('models_dir')) / 'classes.pkl',
-            'model_file': Path(self.config_manager.get_path('models_dir')) / 'lucy_model.h5'
+            'model_file': Path(self.config_manager.get_path('models_dir')) / 'lucy_model.h5',
+            'weights_file': Path(self.config_manager.get_path('models_dir')) / 'lucy_model.npz',
+            'checkpoints_dir': Path(self.config_manager.get_path('models_dir')) / 'checkpoints'
         }
         
         # Crear directorios si no existen
@@ -87,6 +169,7 @@ class LucyTrainer:
         
         return paths
     
+    @profile_stage('nltk_check')
     def _ensure_nltk_data(self):
         """Asegura que los datos de NLTK estén disponibles"""
         try:
@@ -113,17 +196,104 @@ class LucyTrainer:
         try:
             np.random.seed(self.seed)
             pyrandom.seed(self.seed)
-            with suppress_tf_logs():
-                import tensorflow as tf
-                tf.random.set_seed(self.seed)
+            if self.backend == 'keras':
+                with suppress_tf_logs():
+                    import tensorflow as tf
+                    tf.random.set_seed(self.seed)
             self.logger.debug(f"[OK] Semillas fijadas: {self.seed}")
         except Exception as e:
             self.logger.warning(f"No se pudieron fijar semillas completamente: {e}")
     
+    @property
+    def model_artifact(self) -> Path:
+        """Archivo de pesos que produce el backend configurado"""
+        if self.backend == 'keras':
+            return self.data_paths['model_file']
+        return self.data_paths['weights_file']
+    
+    def _intent_files(self, languages: List[str]) -> List[Tuple[str, Path]]:
+        """Archivo de intenciones por idioma (se prefiere .jsonl si existe)"""
+        files = []
+        for language in languages:
+            jsonl_file = self.data_paths['intents_dir'] / f'intents_{language}.jsonl'
+            json_file = self.data_paths['intents_dir'] / f'intents_{language}.json'
+            intent_file = jsonl_file if jsonl_file.exists() else json_file
+            if not intent_file.exists():
+                self.logger.warning(f"[WARN] Archivo no encontrado: {intent_file}")
+                continue
+            files.append((language, intent_file))
+        return files
+    
+    def _learning_db(self):
+        """ConversationDB configurada (database.path, relativo a la raíz del proyecto)"""
+        from .database import ConversationDB, offline_settings
+        db_cfg = self.config.get('database', {})
+        db_path = Path(db_cfg.get('path', 'data/conversations.db'))
+        if not db_path.is_absolute():
+            db_path = Path(self.config_manager.project_root) / db_path
+        # Solo lectura de learning_data: sin hilos de mantenimiento ni escritura diferida
+        return ConversationDB(str(db_path), offline_settings(db_cfg))
+    
+    def iter_samples(self, languages: List[str] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Itera pares (tag, patrón) de todas las fuentes de entrenamiento
+        
+        Recorre los archivos de intenciones en streaming y, si
+        training.learning_data.enabled, la tabla learning_data filtrada por
+        frecuencia/efectividad. De learning_data solo se aceptan intenciones
+        presentes en los archivos (son las que tienen respuestas).
+        
+        Args:
+            languages: Idiomas a procesar (None para todos)
+        """
+        if languages is None:
+            languages = self.config.get('model', {}).get('supported_languages', ['es', 'en'])
+        
+        known_tags = set()
+        for language, intent_file in self._intent_files(languages):
+            count = 0
+            for tag, pattern in iter_intent_patterns(intent_file, self.ingestion_config.get('chunk_size', 65536)):
+                known_tags.add(tag)
+                count += 1
+                yield tag, pattern
+            self.logger.info(f"[OK] Cargado {language}: {count} patrones desde {intent_file.name}")
+        
+        if self.learning_data_config.get('enabled', False):
+            count = 0
+            db = self._learning_db()
+            try:
+                for tag, pattern in iter_learning_patterns(
+                    db, languages,
+                    min_frequency=int(self.learning_data_config.get('min_frequency', 2)),
+                    min_effectiveness=float(self.learning_data_config.get('min_effectiveness', 0.0)),
+                    page_size=int(self.learning_data_config.get('page_size', 1000))
+                ):
+                    if tag in known_tags:
+                        count += 1
+                        yield tag, pattern
+            finally:
+                db.close()
+            self.logger.info(f"[OK] learning_data: {count} patrones aceptados")
+    
+    def _iter_documents(self, languages: List[str] = None) -> Iterator[Tuple[List[str], str]]:
+        """Documentos (tokens lematizados, tag) listos para vocabulario y características"""
+        # Lectura, tokenización y lematización se intercalan: se perfilan por separado
+        return normalize_documents(self.profiler.timed_iter('read', self.iter_samples(languages)),
+                                self.profiler.timed('tokenize', nltk.word_tokenize),
+                                self.profiler.timed('lemmatize', self.lemmatizer.lemmatize),
+                                self.ignore_words)
+    
     @measure_execution_time
+    @profile_stage('load_data')
     def load_training_data(self, languages: List[str] = None) -> bool:
         """
-        Carga los datos de entrenamiento desde archivos de intenciones
+        Carga los datos de entrenamiento y construye vocabulario y clases
+        
+        Los patrones se leen en streaming y, por defecto, no se retienen:
+        prepare_training_data (y con él la validación cruzada y los shards)
+        vuelve a recorrer las fuentes y la memoria queda acotada al
+        vocabulario. training.ingestion.keep_documents los conserva en
+        self.documents para ahorrar la segunda lectura a cambio de memoria.
         
         Args:
             languages: Lista de idiomas a procesar (None para todos)
@@ -138,62 +308,28 @@ class LucyTrainer:
             self.words = []
             self.classes = []
             self.documents = []
+            self.languages = languages
             
-            # Idiomas a procesar
-            if languages is None:
-                languages = self.config.get('model', {}).get('supported_languages', ['es', 'en'])
-            
-            total_patterns = 0
-            total_intents = 0
+            documents = self._iter_documents(languages)
+            if self.keep_documents:
+                self.documents = list(documents)
+                documents = iter(self.documents)
             
-            for language in languages:
-                intent_file = self.data_paths['intents_dir'] / f'intents_{language}.json'
-                
-                if not intent_file.exists():
-                    self.logger.warning(f"[WARN] Archivo no encontrado: {intent_file}")
-                    continue
-                
-                # Cargar intenciones
-                intents_data = load_json_file(str(intent_file))
-                if not intents_data or 'intents' not in intents_data:
-                    self.logger.warning(f"[WARN] Datos inválidos en: {intent_file}")
-                    continue
-                
-                # Procesar cada intención
-                for intent in intents_data['intents']:
-                    tag = intent.get('tag')
-                    patterns = intent.get('patterns', [])
-                    
-                    if not tag or not patterns:
-                        continue
-                    
-                    # Agregar clase si no existe
-                    if tag not in self.classes:
-                        self.classes.append(tag)
-                    
-                    # Procesar cada patrón
-                    for pattern in patterns:
-                        # Tokenizar patrón
-                        word_list = nltk.word_tokenize(pattern.lower())
-                        self.words.extend(word_list)
-                        self.documents.append((word_list, tag))
-                        total_patterns += 1
-                    
-                    total_intents += 1
-                
-                self.logger.info(f"[OK] Cargado {language}: {len(intents_data['intents'])} intenciones")
+            self.words, self.classes, self.documents_count = build_vocabulary(documents)
             
-            if not self.documents:
+            if not self.documents_count:
                 raise ValueError("No se encontraron datos de entrenamiento válidos")
             
-            # Procesar vocabulario
-            self.words = [self.lemmatizer.lemmatize(word.lower()) 
-                        for word in self.words if word not in self.ignore_words]
-            self.words = sorted(list(set(self.words)))
-            self.classes = sorted(self.classes)
+            self.features = build_features(self.features_config, self.words)
+            self.pruning = None
+            if self.features.mode == HASHING:
+                self.logger.info(f"[OK] Características hashing: {self.features.size} cubos "
+                            f"(vocabulario observado: {len(self.words)} palabras)")
+            elif self.pruning_config.get('enabled', False):
+                self.prune_vocabulary()
             
-            self.logger.info(f"[OK] Datos cargados: {total_patterns} patrones, "
-                        f"{total_intents} intenciones, {len(self.words)} palabras únicas")
+            self.logger.info(f"[OK] Datos cargados: {self.documents_count} patrones, "
+                        f"{len(self.classes)} intenciones, {len(self.words)} palabras únicas")
             
             return True
             
@@ -201,7 +337,50 @@ class LucyTrainer:
             self.logger.error(f"Error cargando datos: {e}")
             return False
     
+    @profile_stage('prune')
+    def prune_vocabulary(self, documents: List[Tuple[List[str], str]] = None) -> Dict[str, Any]:
+        """
+        Poda el vocabulario cargado según training.pruning (ver features.prune_vocabulary)
+        
+        Recorre los documentos una vez para construir la matriz dispersa completa.
+        
+        Args:
+            documents: Documentos ya lematizados (None vuelve a leer las fuentes)
+            
+        Returns:
+            Estadísticas de la poda (también en self.pruning)
+        """
+        min_df = self.pruning_config.get('min_df', 1)
+        max_features = self.pruning_config.get('max_features')
+        method = self.pruning_config.get('method', 'chi2')
+        
+        if documents is None:
+            documents = self.documents if self.keep_documents else self._iter_documents(self.languages)
+        x, labels = sparse_feature_matrix(documents, self.classes, VocabularyFeatures(self.words))
+        self.words, self.pruning = prune_vocabulary(x, labels, self.words, len(self.classes),
+                                                    min_df, max_features, method)
+        self.features = VocabularyFeatures(self.words)
+        
+        self.logger.info(f"✂️ Vocabulario podado: {self.pruning['original_size']} → "
+                    f"{self.pruning['size']} palabras (min_df {min_df}: "
+                    f"-{self.pruning['removed_min_df']}, {self.pruning['method']}: "
+                    f"-{self.pruning['removed_selection']})")
+        return self.pruning
+    
+    def _pruning_summary(self, model: Any) -> Dict[str, Any]:
+        """Estadísticas de la poda con los parámetros que ahorra en la primera capa"""
+        first_layer = model.get_weights()[0]
+        removed = self.pruning['original_size'] - self.pruning['size']
+        parameters = int(model.count_params())
+        return dict(
+            self.pruning,
+            parameters=parameters,
+            parameters_removed=int(removed * first_layer.shape[1]),
+            parameters_reduction=removed * first_layer.shape[1] / (parameters + removed * first_layer.shape[1])
+        )
+    
     @measure_execution_time
+    @profile_stage('features')
     def prepare_training_data(self) -> Tuple[np.ndarray, np.ndarray]:
         """
         Prepara los datos para el entrenamiento del modelo
@@ -212,37 +391,45 @@ class LucyTrainer:
         try:
             self.logger.info("🔄 Preparando datos de entrenamiento...")
             
-            training = []
-            output_empty = [0] * len(self.classes)
-            
-            # Crear datos de entrenamiento
-            for document in self.documents:
-                bag = []
-                word_patterns = document[0]
-                
-                # Lematizar patrones de palabras
-                word_patterns = [self.lemmatizer.lemmatize(word.lower()) 
-                            for word in word_patterns]
-                
-                # Crear bolsa de palabras
-                for word in self.words:
-                    bag.append(1) if word in word_patterns else bag.append(0)
-                
-                # Crear vector de salida
-                output_row = list(output_empty)
-                output_row[self.classes.index(document[1])] = 1
+            documents = self.documents if self.keep_documents else self._iter_documents(self.languages)
+            # Lado de la validación fija de cada fila (los tags desconocidos se descartan aquí)
+            holdout: List[bool] = []
+            class_set = set(self.classes)
+            
+            def tracked(docs):
+                for tokens, tag in docs:
+                    if tag in class_set:
+                        holdout.append(holdout_fraction(tokens, tag) < self.validation_split)
+                        yield tokens, tag
+            
+            documents = tracked(documents)
+            if self.sparse_inputs:
+                train_x, labels = sparse_feature_matrix(documents, self.classes, self.features)
+                row = train_x.shape[0]
+                train_y = np.zeros((row, len(self.classes)), dtype=np.float32)
+                train_y[np.arange(row), labels] = 1
+            else:
+                train_x = np.zeros((self.documents_count, self.features.size), dtype=np.float32)
+                train_y = np.zeros((self.documents_count, len(self.classes)), dtype=np.float32)
                 
-                training.append([bag, output_row])
+                # Rellenar por lotes: nunca se materializa una lista de listas por muestra
+                row = 0
+                for batch_x, batch_y in iter_feature_batches(documents, self.words, self.classes,
+                                                            self.ingestion_config.get('feature_batch_size', 4096),
+                                                            features=self.features):
+                    train_x[row:row + len(batch_x)] = batch_x
+                    train_y[row:row + len(batch_y)] = batch_y
+                    row += len(batch_x)
+                train_x, train_y = train_x[:row], train_y[:row]
             
             # Mezclar datos
-            random.shuffle(training)
-            
-            # Separar características y etiquetas
-            train_x = np.array([item[0] for item in training])
-            train_y = np.array([item[1] for item in training])
+            order = np.random.default_rng(self.seed).permutation(row)
+            train_x, train_y = train_x[order], train_y[order]
+            self.holdout_mask = np.asarray(holdout, dtype=bool)[order]
             
             self.logger.info(f"✅ Datos preparados: {train_x.shape[0]} muestras, "
-                        f"{train_x.shape[1]} características")
+                        f"{train_x.shape[1]} características"
+                        f"{f' (CSR, {train_x.nnz} activas)' if sparse.issparse(train_x) else ''}")
             
             return train_x, train_y
             
@@ -250,38 +437,77 @@ class LucyTrainer:
             self.logger.error(f"Error preparando datos: {e}")
             raise
     
-    def create_model(self, input_size: int, output_size: int) -> Sequential:
+    @profile_stage('build_model')
+    def create_model(self, input_size: int, output_size: int,
+                    learning_rate: float = None) -> Any:
         """
-        Crea el modelo de red neuronal
-        
+        Crea el modelo de red neuronal para el backend configurado
+
         Args:
             input_size: Tamaño de entrada (vocabulario)
             output_size: Tamaño de salida (clases)
-            
+            learning_rate: LR del optimizador (None usa el configurado)
+
         Returns:
-            Modelo de Keras
+            Modelo de Keras, `NumpyMLP` o `SklearnMLP`
         """
         try:
-            self.logger.info("🔄 Creando modelo de red neuronal...")
-            
-            model = Sequential([
-                Dense(128, input_shape=(input_size,), activation='relu'),
-                Dropout(self.dropout_rate),
-                Dense(64, activation='relu'),
-                Dropout(self.dropout_rate),
-                Dense(output_size, activation='softmax')
-            ])
-            
-            # Configurar optimizador
-            learning_rate = float(self.config.get('training', {}).get('learning_rate', 0.01))
-            optimizer = SGD(learning_rate=learning_rate, momentum=0.9, nesterov=True)
-            
-            # Compilar modelo
-            model.compile(
-                optimizer=optimizer,
-                loss='categorical_crossentropy',
-                metrics=['accuracy']
-            )
+            self.logger.info(f"🔄 Creando modelo de red neuronal (backend: {self.backend})...")
+            
+            if learning_rate is None:
+                learning_rate = self.learning_rate
+            training_cfg = self.config.get('training', {})
+            
+            if self.backend == 'numpy':
+                model = NumpyMLP(
+                    input_size=input_size,
+                    output_size=output_size,
+                    dropout_rate=self.dropout_rate,
+                    learning_rate=learning_rate,
+                    momentum=0.9,
+                    nesterov=True,
+                    early_stopping_patience=int(training_cfg.get('early_stopping_patience', 10))
+                    if self.enable_early_stopping else None,
+                    reduce_lr_factor=float(training_cfg.get('reduce_lr_factor', 0.5)),
+                    reduce_lr_patience=int(training_cfg.get('reduce_lr_patience', 5))
+                    if self.enable_lr_schedule else None,
+                    reduce_lr_min=float(training_cfg.get('reduce_lr_min', 1e-5)),
+                    seed=self.seed
+                )
+            elif self.backend == 'sklearn':
+                model = SklearnMLP(
+                    input_size=input_size,
+                    output_size=output_size,
+                    learning_rate=learning_rate,
+                    momentum=0.9,
+                    nesterov=True,
+                    early_stopping_patience=int(training_cfg.get('early_stopping_patience', 10))
+                    if self.enable_early_stopping else None,
+                    seed=self.seed
+                )
+            else:
+                with suppress_tf_logs():
+                    from tensorflow.keras.models import Sequential
+                    from tensorflow.keras.layers import Dense, Dropout
+                    from tensorflow.keras.optimizers import SGD
+                
+                model = Sequential([
+                    Dense(128, input_shape=(input_size,), activation='relu'),
+                    Dropout(self.dropout_rate),
+                    Dense(64, activation='relu'),
+                    Dropout(self.dropout_rate),
+                    Dense(output_size, activation='softmax')
+                ])
+                
+                # Configurar optimizador
+                optimizer = SGD(learning_rate=learning_rate, momentum=0.9, nesterov=True)
+                
+                # Compilar modelo
+                model.compile(
+                    optimizer=optimizer,
+                    loss='categorical_crossentropy',
+                    metrics=['accuracy']
+                )
             
             self.logger.info("✅ Modelo creado y compilado")
             self.logger.info(f"   - Capas: {len(model.layers)}")
@@ -295,13 +521,14 @@ class LucyTrainer:
             raise
     
     @measure_execution_time
-    def train_model(self, model: Sequential, train_x: np.ndarray, 
+    @profile_stage('train')
+    def train_model(self, model: Any, train_x: np.ndarray, 
                 train_y: np.ndarray, validation_data: Tuple = None) -> Dict[str, Any]:
         """
         Entrena el modelo de red neuronal
         
         Args:
-            model: Modelo de Keras a entrenar
+            model: Modelo a entrenar (ver create_model)
             train_x: Datos de entrada
             train_y: Etiquetas
             validation_data: Datos de validación (opcional)
@@ -315,87 +542,298 @@ class LucyTrainer:
             self.logger.info(f"   - Batch size: {self.batch_size}")
             self.logger.info(f"   - Dropout: {self.dropout_rate}")
             
-            # Configurar callbacks si está habilitado
-            callbacks = []
-            
-            if self.config.get('training', {}).get('save_checkpoints', True):
-                from tensorflow.keras.callbacks import ModelCheckpoint
-                checkpoint_path = self.data_paths['models_dir'] / 'checkpoint_{epoch:02d}.h5'
-                checkpoint = ModelCheckpoint(
-                    str(checkpoint_path),
-                    save_best_only=True,
-                    monitor='val_loss' if validation_data else 'loss',
-                    mode='min'
-                )
-                callbacks.append(checkpoint)
-
-            # EarlyStopping
-            if self.enable_early_stopping:
-                patience = int(self.config.get('training', {}).get('early_stopping_patience', 10))
-                es = EarlyStopping(
-                    monitor='val_loss' if validation_data else 'loss',
-                    mode='min',
-                    patience=patience,
-                    restore_best_weights=True
-                )
-                callbacks.append(es)
-
-            # ReduceLROnPlateau
-            if self.enable_lr_schedule:
-                factor = float(self.config.get('training', {}).get('reduce_lr_factor', 0.5))
-                patience_rlr = int(self.config.get('training', {}).get('reduce_lr_patience', 5))
-                min_lr = float(self.config.get('training', {}).get('reduce_lr_min', 1e-5))
-                rlr = ReduceLROnPlateau(
-                    monitor='val_loss' if validation_data else 'loss',
-                    mode='min',
-                    factor=factor,
-                    patience=patience_rlr,
-                    min_lr=min_lr,
-                    verbose=1
-                )
-                callbacks.append(rlr)
-
-            # CSV Logger
-            if self.enable_csv_logger:
-                csv_path = self.data_paths['models_dir'] / 'training_log.csv'
-                csv_logger = CSVLogger(str(csv_path), append=False)
-                callbacks.append(csv_logger)
+            # Reanudar desde el último checkpoint si se solicitó
+            initial_epoch = self._restore_checkpoint(model) if self.resume else 0
+            
+            # Escritor de checkpoints en segundo plano
+            monitor = 'val_loss' if validation_data else 'loss'
+            writer = None
+            if self.save_checkpoints:
+                writer = CheckpointWriter(self.data_paths['checkpoints_dir'],
+                                        keep_best=self.keep_best_checkpoints,
+                                        reset=initial_epoch == 0)
+            
+            # Configurar callbacks (Keras usa sus callbacks; los backends
+            # NumPy/sklearn aplican early stopping y reducción de LR internamente)
+            if self.backend == 'keras':
+                callbacks = self._build_keras_callbacks(validation_data, writer)
+            elif writer is not None:
+                callbacks = [make_checkpoint_callback(writer, self.checkpoint_interval,
+                                                    monitor, self.epochs)]
+            else:
+                callbacks = []
+            
+            # Perfil por época (intervalo entre finales de época)
+            epoch_lap = self.profiler.lap('epoch')
+            if self.backend == 'keras':
+                with suppress_tf_logs():
+                    from tensorflow.keras.callbacks import LambdaCallback
+                callbacks.append(LambdaCallback(on_epoch_end=lambda epoch, logs: epoch_lap()))
+            else:
+                callbacks.append(epoch_lap)
             
             # Entrenar modelo
-            with suppress_tf_logs():
-                history = model.fit(
-                    train_x, train_y,
-                    epochs=self.epochs,
-                    batch_size=self.batch_size,
-                    validation_data=validation_data,
-                    callbacks=callbacks,
-                    verbose=1 if self.logger.level <= logging.INFO else 0
-                )
-            
+            fit_start = time.perf_counter()
+            try:
+                with suppress_tf_logs():
+                    history = self._fit(
+                        model, train_x, train_y,
+                        epochs=self.epochs,
+                        batch_size=self.batch_size,
+                        validation_data=validation_data,
+                        callbacks=callbacks,
+                        initial_epoch=initial_epoch,
+                        verbose=1 if self.logger.level <= logging.INFO else 0
+                    )
+            finally:
+                if writer is not None:
+                    writer.close()
+            fit_seconds = time.perf_counter() - fit_start
+            epochs_run = len(history.history['loss'])
+            epochs_completed = initial_epoch + epochs_run
+            samples_per_sec = (epochs_run * train_x.shape[0]) / fit_seconds if fit_seconds > 0 else 0.0
+            
+            if self.backend != 'keras' and self.enable_csv_logger:
+                self._write_history_csv(history.history)
+
             # Evaluar modelo final (en conjunto de entrenamiento)
             final_loss, final_accuracy = model.evaluate(train_x, train_y, verbose=0)
-            
+
             self.logger.info(f"✅ Entrenamiento completado:")
             self.logger.info(f"   - Pérdida final: {final_loss:.4f}")
             self.logger.info(f"   - Precisión final: {final_accuracy:.4f}")
-            
+            self.logger.info(f"   - Throughput: {samples_per_sec:.1f} muestras/s ({self.input_pipeline})")
+
             return {
                 'history': history.history,
                 'final_loss': final_loss,
                 'final_accuracy': final_accuracy,
-                'epochs_completed': len(history.history['loss'])
+                'epochs_completed': epochs_completed,
+                'initial_epoch': initial_epoch,
+                'fit_seconds': fit_seconds,
+                'samples_per_sec': samples_per_sec,
+                'checkpoints': {
+                    'written': writer.written if writer else 0,
+                    'write_seconds': writer.write_seconds if writer else 0.0,
+                    'errors': writer.errors if writer else []
+                }
             }
             
         except Exception as e:
             self.logger.error(f"Error en entrenamiento: {e}")
             raise
+
+    def _build_keras_callbacks(self, validation_data: Tuple = None,
+                            writer: CheckpointWriter = None) -> List[Any]:
+        """Construye los callbacks de Keras según la configuración"""
+        with suppress_tf_logs():
+            from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, CSVLogger
+        
+        callbacks = []
+        
+        if writer is not None:
+            callbacks.append(make_keras_checkpoint_callback(
+                writer, self.checkpoint_interval,
+                'val_loss' if validation_data else 'loss', self.epochs
+            ))
+
+        # EarlyStopping
+        if self.enable_early_stopping:
+            patience = int(self.config.get('training', {}).get('early_stopping_patience', 10))
+            es = EarlyStopping(
+                monitor='val_loss' if validation_data else 'loss',
+                mode='min',
+                patience=patience,
+                restore_best_weights=True
+            )
+            callbacks.append(es)
+
+        # ReduceLROnPlateau
+        if self.enable_lr_schedule:
+            factor = float(self.config.get('training', {}).get('reduce_lr_factor', 0.5))
+            patience_rlr = int(self.config.get('training', {}).get('reduce_lr_patience', 5))
+            min_lr = float(self.config.get('training', {}).get('reduce_lr_min', 1e-5))
+            rlr = ReduceLROnPlateau(
+                monitor='val_loss' if validation_data else 'loss',
+                mode='min',
+                factor=factor,
+                patience=patience_rlr,
+                min_lr=min_lr,
+                verbose=1
+            )
+            callbacks.append(rlr)
+
+        # CSV Logger
+        if self.enable_csv_logger:
+            csv_path = self.data_paths['models_dir'] / 'training_log.csv'
+            csv_logger = CSVLogger(str(csv_path), append=False)
+            callbacks.append(csv_logger)
+        
+        return callbacks
+
+    def _restore_checkpoint(self, model: Any) -> int:
+        """
+        Carga pesos y estado del optimizador del último checkpoint
+        
+        Returns:
+            Época desde la que continuar (0 si no hay checkpoint compatible)
+        """
+        checkpoint = CheckpointWriter.load_latest(self.data_paths['checkpoints_dir'])
+        if checkpoint is None:
+            self.logger.warning("[WARN] No hay checkpoints para reanudar; entrenando desde cero")
+            return 0
+        
+        expected = [tuple(w.shape) for w in model.get_weights()]
+        found = [tuple(w.shape) for w in checkpoint['weights']]
+        if expected != found:
+            self.logger.warning("[WARN] El checkpoint no coincide con el modelo actual "
+                            "(vocabulario o clases cambiaron); entrenando desde cero")
+            return 0
+        
+        model.set_weights(checkpoint['weights'])
+        if self.backend == 'keras':
+            restore_keras_optimizer_state(model, checkpoint['optimizer_state'])
+        else:
+            model.set_optimizer_state(checkpoint['optimizer_state'])
+        
+        initial_epoch = checkpoint['epoch'] + 1
+        self.logger.info(f"[REFRESH] Reanudando desde la época {initial_epoch} "
+                    f"({checkpoint['monitor']}={checkpoint['metric']})")
+        return initial_epoch
     
-    def save_model_components(self, model: Sequential) -> bool:
+    def _write_history_csv(self, history: Dict[str, List[float]]):
+        """Escribe el historial en training_log.csv (equivalente a CSVLogger)"""
+        import csv
+        csv_path = self.data_paths['models_dir'] / 'training_log.csv'
+        keys = sorted(history.keys())
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['epoch'] + keys)
+            for epoch, values in enumerate(zip(*(history[k] for k in keys))):
+                writer.writerow([epoch] + list(values))
+
+    def _make_dataset(self, x: np.ndarray, y: np.ndarray, batch_size: int,
+                    shuffle: bool = True):
+        """
+        Construye un pipeline tf.data con caché, mezcla, batching y prefetch
+
+        Args:
+            x: Datos de entrada
+            y: Etiquetas
+            batch_size: Tamaño de batch
+            shuffle: Mezclar en cada época (solo entrenamiento)
+
+        Returns:
+            tf.data.Dataset listo para model.fit
+        """
+        import tensorflow as tf
+
+        if sparse.issparse(x):
+            # Las filas CSR viajan como tf.SparseTensor hasta la primera capa
+            coo = x.tocoo()
+            features = tf.SparseTensor(np.stack([coo.row, coo.col], axis=1).astype(np.int64),
+                                    coo.data.astype(np.float32), coo.shape)
+        else:
+            features = x.astype(np.float32)
+        dataset = tf.data.Dataset.from_tensor_slices((features, y.astype(np.float32))).cache()
+        if shuffle:
+            buffer_size = max(1, min(self.shuffle_buffer, x.shape[0]))
+            dataset = dataset.shuffle(buffer_size, seed=self.seed,
+                                    reshuffle_each_iteration=True)
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    def _fit(self, model: Any, train_x: np.ndarray, train_y: np.ndarray,
+            epochs: int, batch_size: int, validation_data: Tuple = None, **fit_kwargs):
+        """Llama a model.fit usando el pipeline de entrada configurado"""
+        if self.input_pipeline == 'tf_data' and self.backend == 'keras':
+            train_ds = self._make_dataset(train_x, train_y, batch_size, shuffle=True)
+            val_ds = None
+            if validation_data is not None:
+                val_ds = self._make_dataset(validation_data[0], validation_data[1],
+                                            batch_size, shuffle=False)
+            return model.fit(train_ds, epochs=epochs, validation_data=val_ds, **fit_kwargs)
+
+        return model.fit(train_x, train_y, epochs=epochs, batch_size=batch_size,
+                        validation_data=validation_data, **fit_kwargs)
+
+    @measure_execution_time
+    @profile_stage('autotune')
+    def autotune_batch_size(self, train_x: np.ndarray, train_y: np.ndarray,
+                            validation_data: Tuple = None) -> Dict[str, Any]:
+        """
+        Mide throughput y pérdida de validación para combinaciones de batch
+        size y escala de learning rate, y aplica la más rápida que no empeore
+        la pérdida más allá de la tolerancia configurada.
+
+        Args:
+            train_x: Datos de entrada
+            train_y: Etiquetas
+            validation_data: Datos de validación (opcional)
+
+        Returns:
+            Resultados de las pruebas y configuración seleccionada
+        """
+        batch_sizes = [int(b) for b in self.autotune_config.get('batch_sizes', [self.batch_size, 16, 32, 64])]
+        lr_scales = [float(s) for s in self.autotune_config.get('lr_scales', [1.0])]
+        trial_epochs = int(self.autotune_config.get('trial_epochs', 5))
+        tolerance = float(self.autotune_config.get('loss_tolerance', 0.05))
+        monitor = 'val_loss' if validation_data is not None else 'loss'
+
+        self.logger.info(f"⏱️ Auto-tuning: batch sizes {batch_sizes}, escalas LR {lr_scales}, "
+                        f"{trial_epochs} épocas por prueba")
+
+        trials = []
+        for batch_size in sorted(set(b for b in batch_sizes if b > 0)):
+            for scale in lr_scales:
+                self._set_global_seeds()
+                learning_rate = self.learning_rate * scale
+                model = self.create_model(train_x.shape[1], train_y.shape[1], learning_rate=learning_rate)
+                start = time.perf_counter()
+                with suppress_tf_logs():
+                    history = self._fit(model, train_x, train_y, epochs=trial_epochs,
+                                        batch_size=batch_size, validation_data=validation_data,
+                                        verbose=0)
+                elapsed = time.perf_counter() - start
+                trials.append({
+                    'batch_size': batch_size,
+                    'lr_scale': scale,
+                    'learning_rate': learning_rate,
+                    'samples_per_sec': (trial_epochs * train_x.shape[0]) / elapsed if elapsed > 0 else 0.0,
+                    monitor: float(history.history[monitor][-1])
+                })
+                self.logger.debug(f"   - bs={batch_size} lr×{scale}: {trials[-1]}")
+
+        if not trials:
+            return {'trials': [], 'selected': None}
+
+        best_loss = min(t[monitor] for t in trials)
+        acceptable = [t for t in trials if t[monitor] <= best_loss * (1 + tolerance) + 1e-12]
+        selected = max(acceptable, key=lambda t: t['samples_per_sec'])
+
+        self.batch_size = selected['batch_size']
+        self.learning_rate = selected['learning_rate']
+        self.logger.info(f"✅ Auto-tuning: batch size {self.batch_size}, LR {self.learning_rate:.5f} "
+                        f"({selected['samples_per_sec']:.1f} muestras/s)")
+
+        return {
+            'monitor': monitor,
+            'trial_epochs': trial_epochs,
+            'loss_tolerance': tolerance,
+            'trials': trials,
+            'selected': selected
+        }
+
+    @profile_stage('save')
+    def save_model_components(self, model: Any, metadata: Dict[str, Any] = None) -> bool:
         """
         Guarda el modelo y sus componentes
         
+        Publica un bundle versionado (ver model_bundle) y mantiene los
+        archivos sueltos words.pkl/classes.pkl/modelo por compatibilidad.
+        
         Args:
             model: Modelo entrenado a guardar
+            metadata: Metadatos de entrenamiento para el bundle
             
         Returns:
             True si se guardó exitosamente
@@ -403,6 +841,39 @@ class LucyTrainer:
         try:
             self.logger.info("💾 Guardando modelo y componentes...")
             
+            # Bundle versionado con publicación atómica
+            intent_files = [path for _, path in self._intent_files(
+                self.languages or self.config.get('model', {}).get('supported_languages', ['es', 'en'])
+            )]
+            bundle_metadata = {
+                'backend': self.backend,
+                'intents_hash': hash_files(intent_files),
+                'intents_files': [path.name for path in intent_files],
+                'seed': self.seed,
+                'features': self.features.to_metadata(),
+                'pruning': self.pruning,
+                'validation': self._validation_metadata(),
+                'training': metadata or {}
+            }
+            if isinstance(model, HierarchicalModel):
+                bundle_metadata['hierarchy'] = model.to_metadata()
+            # Con hashing no se necesita vocabulario para servir
+            bundle_words = [] if self.features.mode == HASHING else self.words
+            self.bundle_version = publish_bundle(
+                self.data_paths['models_dir'], model.get_weights(), bundle_words, self.classes,
+                bundle_metadata, keep=self.bundles_to_keep, activate=not self.candidate
+            )
+            
+            if self.candidate:
+                # Los archivos sueltos siguen describiendo el modelo en servicio
+                self.logger.info(f"✅ Bundle candidato publicado (sin activar): {self.bundle_version}")
+                return True
+            
+            if self.features.mode == HASHING or isinstance(model, HierarchicalModel):
+                # Los archivos sueltos solo describen modelos planos de vocabulario
+                self.logger.info(f"✅ Modelo guardado exitosamente (bundle {self.bundle_version})")
+                return True
+            
             # Guardar vocabulario
             with open(self.data_paths['words_file'], 'wb') as f:
                 pickle.dump(self.words, f)
@@ -411,14 +882,19 @@ class LucyTrainer:
             with open(self.data_paths['classes_file'], 'wb') as f:
                 pickle.dump(self.classes, f)
             
-            # Guardar modelo
+            # Guardar modelo (.h5 para Keras, .npz para NumPy/sklearn)
             with suppress_tf_logs():
-                model.save(str(self.data_paths['model_file']))
+                model.save(str(self.model_artifact))
+            if self.model_artifact != self.data_paths['weights_file']:
+                # Los mismos pesos en .npz: el servicio usa NumpyMLP y su
+                # primera capa dispersa (predict_active) también con Keras
+                NumpyMLP(weights=model.get_weights()).save(str(self.data_paths['weights_file']))
             
             self.logger.info("✅ Modelo guardado exitosamente:")
+            self.logger.info(f"   - Bundle: {self.bundle_version}")
             self.logger.info(f"   - Vocabulario: {self.data_paths['words_file']}")
             self.logger.info(f"   - Clases: {self.data_paths['classes_file']}")
-            self.logger.info(f"   - Modelo: {self.data_paths['model_file']}")
+            self.logger.info(f"   - Modelo: {self.model_artifact}")
             
             return True
             
@@ -426,15 +902,102 @@ class LucyTrainer:
             self.logger.error(f"Error guardando modelo: {e}")
             return False
     
-    def validate_model(self, model: Sequential, train_x: np.ndarray, 
-                    train_y: np.ndarray) -> Dict[str, Any]:
+    def _intent_groups(self) -> Dict[str, str]:
+        """Grupo declarado (campo `group`) de cada intención de los archivos cargados"""
+        languages = self.languages or self.config.get('model', {}).get('supported_languages', ['es', 'en'])
+        groups = {}
+        for _, path in self._intent_files(languages):
+            groups.update(iter_intent_groups(path))
+        return groups
+    
+    @measure_execution_time
+    @profile_stage('hierarchy')
+    def train_hierarchical(self, train_x: Any, train_y: np.ndarray,
+                        validation_data: Tuple = None) -> Tuple[HierarchicalModel, Dict[str, Any]]:
+        """
+        Entrena el clasificador jerárquico (ver hierarchy)
+        
+        El clasificador grueso usa el backend configurado con una salida por
+        grupo; las cabezas son NumpyMLP pequeñas entrenadas sobre su primera
+        capa oculta y solo con las muestras de su grupo, de modo que el coste
+        de cada una depende del tamaño del grupo y no del total de intenciones.
+        
+        Args:
+            train_x: Datos de entrada (densos o CSR)
+            train_y: Etiquetas one-hot de intención
+            validation_data: Datos de validación (opcional)
+            
+        Returns:
+            Tupla (modelo, resultados del clasificador grueso + sección `hierarchy`)
+        """
+        cfg = self.hierarchy_config
+        labels = np.argmax(train_y, axis=1)
+        groups, class_group = assign_groups(train_x, labels, self.classes, self._intent_groups(),
+                                            int(cfg.get('groups', 0) or 0), self.seed)
+        self.logger.info(f"🌳 Modo jerárquico: {len(self.classes)} intenciones en {len(groups)} grupos")
+        
+        def group_labels(y):
+            return np.eye(len(groups), dtype=np.float32)[class_group[np.argmax(y, axis=1)]]
+        
+        coarse_validation = None
+        if validation_data is not None:
+            coarse_validation = (validation_data[0], group_labels(validation_data[1]))
+        coarse = self.create_model(train_x.shape[1], len(groups))
+        results = self.train_model(coarse, train_x, group_labels(train_y), coarse_validation)
+        
+        weights = [np.asarray(w, dtype=np.float32) for w in coarse.get_weights()]
+        embedding = weights[:2]
+        hidden = np.maximum(np.asarray(train_x @ embedding[0]) + embedding[1], 0.0)
+        
+        start = time.perf_counter()
+        heads, group_classes = [], []
+        training_cfg = self.config.get('training', {})
+        for group in range(len(groups)):
+            classes = np.flatnonzero(class_group == group)
+            group_classes.append(classes)
+            if len(classes) == 1:
+                heads.append(None)
+                continue
+            rows = np.isin(labels, classes)
+            head = NumpyMLP(
+                input_size=hidden.shape[1],
+                output_size=len(classes),
+                hidden_sizes=tuple(cfg.get('head_hidden_sizes', [32])),
+                dropout_rate=self.dropout_rate,
+                learning_rate=self.learning_rate,
+                early_stopping_patience=int(training_cfg.get('early_stopping_patience', 10))
+                if self.enable_early_stopping else None,
+                seed=self.seed + group
+            )
+            head.fit(hidden[rows], train_y[rows][:, classes], epochs=self.epochs, batch_size=self.batch_size)
+            heads.append(head)
+        
+        model = HierarchicalModel(embedding, NumpyMLP(weights=weights[2:]), heads, group_classes,
+                                groups, len(self.classes), int(cfg.get('top_groups', 2)))
+        sizes = [len(classes) for classes in group_classes]
+        results['hierarchy'] = {
+            'groups': len(groups),
+            'explicit_groups': sum(1 for name in groups if not name.startswith(AUTO_GROUP_PREFIX)),
+            'heads': sum(1 for head in heads if head is not None),
+            'largest_group': max(sizes),
+            'top_groups': model.top_groups,
+            'heads_seconds': time.perf_counter() - start,
+            'parameters': model.count_params()
+        }
+        self.logger.info(f"✅ {results['hierarchy']['heads']} cabezas entrenadas en "
+                    f"{results['hierarchy']['heads_seconds']:.2f}s (grupo mayor: {max(sizes)} intenciones)")
+        return model, results
+    
+    @profile_stage('validate')
+    def validate_model(self, model: Any, eval_x: np.ndarray, 
+                    eval_y: np.ndarray) -> Dict[str, Any]:
         """
         Valida el modelo entrenado
         
         Args:
             model: Modelo a validar
-            train_x: Datos de entrada
-            train_y: Etiquetas
+            eval_x: Datos de entrada (idealmente no vistos en entrenamiento)
+            eval_y: Etiquetas
             
         Returns:
             Métricas de validación
@@ -444,30 +1007,25 @@ class LucyTrainer:
             
             # Predicciones
             with suppress_tf_logs():
-                predictions = model.predict(train_x, verbose=0)
-            
-            # Calcular métricas
-            predicted_classes = np.argmax(predictions, axis=1)
-            true_classes = np.argmax(train_y, axis=1)
+                predictions = model.predict(eval_x, verbose=0)
             
-            # Accuracy
-            accuracy = np.mean(predicted_classes == true_classes)
-            
-            # Confianza promedio
-            avg_confidence = np.mean(np.max(predictions, axis=1))
+            metrics = classification_metrics(eval_y, predictions, len(eval_y[0]))
             
             # Distribución de confianzas
             confidence_threshold = self.config.get('model', {}).get('confidence_threshold', 0.25)
-            high_confidence_count = np.sum(np.max(predictions, axis=1) >= confidence_threshold)
+            high_confidence_count = int(np.sum(np.max(predictions, axis=1) >= confidence_threshold))
             
             validation_results = {
-                'accuracy': accuracy,
-                'average_confidence': avg_confidence,
+                'accuracy': metrics['accuracy'],
+                'average_confidence': metrics['average_confidence'],
                 'high_confidence_predictions': high_confidence_count,
                 'total_predictions': len(predictions),
                 'high_confidence_ratio': high_confidence_count / len(predictions),
+                'macro_precision': metrics['macro_precision'],
+                'macro_recall': metrics['macro_recall'],
                 'classes_count': len(self.classes),
-                'vocabulary_size': len(self.words)
+                'vocabulary_size': len(self.words),
+                'input_size': self.features.size
             }
             
             self.logger.info("✅ Validación completada:")
@@ -477,12 +1035,325 @@ class LucyTrainer:
                 else:
                     self.logger.info(f"   - {key}: {value}")
             
+            validation_results['per_class'] = self._per_class_report(metrics)
             return validation_results
             
         except Exception as e:
             self.logger.error(f"Error en validación: {e}")
             return {'error': str(e)}
     
+    def evaluate_bundle(self, bundle: ModelBundle, eval_x: np.ndarray,
+                        eval_y: np.ndarray) -> Dict[str, Any]:
+        """
+        Evalúa un bundle publicado sobre los mismos datos de validación
+        
+        Las columnas de la bolsa de palabras se reasignan al vocabulario del
+        bundle y las predicciones se comparan por nombre de intención. Con
+        hashing la entrada solo es comparable si la configuración coincide.
+        
+        Args:
+            bundle: Bundle a evaluar (p. ej. el modelo en servicio)
+            eval_x: Datos de entrada con el espacio de características actual
+            eval_y: Etiquetas con las clases actuales
+            
+        Returns:
+            Accuracy y confianza media del bundle
+            
+        Raises:
+            BundleError: Si los espacios de características no son comparables
+        """
+        bundle_features = bundle.build_features()
+        if bundle_features.mode == HASHING or self.features.mode == HASHING:
+            if bundle_features.to_metadata() != self.features.to_metadata():
+                raise BundleError("Espacios de características incompatibles")
+            x = eval_x
+        else:
+            # Matriz de reasignación de columnas: vale para entrada densa o CSR
+            word_index = {word: i for i, word in enumerate(bundle.words)}
+            pairs = [(i, word_index[word]) for i, word in enumerate(self.words) if word in word_index]
+            source, target = (list(columns) for columns in zip(*pairs)) if pairs else ([], [])
+            mapping = sparse.csr_matrix((np.ones(len(pairs), dtype=np.float32), (source, target)),
+                                        shape=(len(self.words), len(bundle.words)))
+            x = eval_x @ mapping
+        
+        probs = bundle.build_model().predict(x)
+        predicted = [bundle.classes[i] for i in np.argmax(probs, axis=1)]
+        expected = [self.classes[i] for i in np.argmax(eval_y, axis=1)]
+        hits = sum(p == e for p, e in zip(predicted, expected))
+        return {
+            'version': bundle.version,
+            'accuracy': hits / max(1, len(expected)),
+            'average_confidence': float(np.mean(np.max(probs, axis=1))) if len(probs) else 0.0
+        }
+    
+    def _validation_metadata(self) -> Dict[str, Any]:
+        return {'scheme': self.validation_scheme, 'split': self.validation_split}
+    
+    def _compare_with_current(self, eval_x: np.ndarray, eval_y: np.ndarray,
+                            validation_results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Métricas del candidato frente al modelo en servicio (mismo conjunto)
+        
+        La comparación solo es `comparable` si el conjunto es la validación
+        fija y el bundle en servicio se entrenó con el mismo esquema (no ha
+        visto esas muestras). `serving_model` indica qué hay en servicio:
+        'bundle', 'loose' (solo archivos sueltos, sin evaluar) o 'none'.
+        """
+        comparison = {
+            'candidate': {
+                'accuracy': float(validation_results.get('accuracy', 0.0)),
+                'average_confidence': float(validation_results.get('average_confidence', 0.0)),
+                'macro_recall': float(validation_results.get('macro_recall', 0.0))
+            },
+            'baseline': None,
+            'samples': eval_x.shape[0],
+            'serving_model': 'none'
+        }
+        if current_version(self.data_paths['models_dir']):
+            comparison['serving_model'] = 'bundle'
+            try:
+                bundle = load_bundle(self.data_paths['models_dir'])
+                baseline = self.evaluate_bundle(bundle, eval_x, eval_y)
+                baseline['comparable'] = (self.validation_scheme == HOLDOUT_SCHEME and
+                                        bundle.metadata.get('validation') == self._validation_metadata())
+                comparison['baseline'] = baseline
+            except BundleError as e:
+                self.logger.warning(f"No se pudo evaluar el modelo en servicio: {e}")
+        elif self.model_artifact.exists():
+            comparison['serving_model'] = 'loose'
+        return comparison
+    
+    def _per_class_report(self, metrics: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Asocia las métricas por clase con el nombre de cada intención"""
+        return {
+            tag: {
+                'precision': float(metrics['precision'][i]),
+                'recall': float(metrics['recall'][i]),
+                'support': int(metrics['support'][i])
+            }
+            for i, tag in enumerate(self.classes)
+        }
+    
+    @profile_stage('split')
+    def _split_validation(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """
+        División entrenamiento/validación
+        
+        Con la máscara de prepare_training_data la validación es fija: cada
+        documento va a un lado según un hash de su contenido, así que ningún
+        modelo entrenado con este esquema ha visto la validación de otro y el
+        modelo en servicio se puede comparar con el candidato sin ventaja.
+        Sin máscara (o si deja un lado vacío) se usa una división aleatoria
+        estratificada cuando es posible.
+        """
+        mask = self.holdout_mask
+        if mask is not None and len(mask) == x.shape[0] and 0 < mask.sum() < len(mask):
+            self.validation_scheme = HOLDOUT_SCHEME
+            return x[~mask], x[mask], y[~mask], y[mask]
+        self.validation_scheme = 'random'
+        try:
+            return train_test_split(x, y, test_size=self.validation_split,
+                                    random_state=self.seed, stratify=np.argmax(y, axis=1))
+        except ValueError:
+            # Clases con un solo patrón o validación menor que el número de clases
+            return train_test_split(x, y, test_size=self.validation_split, random_state=self.seed)
+    
+    def run_cross_validation(self, folds: int = None, languages: List[str] = None,
+                            workers: int = None) -> Dict[str, Any]:
+        """
+        Evalúa la configuración actual con validación cruzada estratificada
+        
+        Los folds se entrenan en procesos paralelos sobre el mismo dataset
+        preprocesado; el reporte se guarda en `cv_report.json`.
+        
+        Args:
+            folds: Número de folds K (None usa training.cross_validation.folds)
+            languages: Idiomas a evaluar (None para todos)
+            workers: Procesos en paralelo (None usa la configuración)
+            
+        Returns:
+            Reporte de validación cruzada
+        """
+        folds = int(folds or self.cv_config.get('folds', 5))
+        if workers is None:
+            workers = self.cv_config.get('workers') or None
+        bins = int(self.cv_config.get('confidence_bins', 10))
+        
+        if not self.load_training_data(languages):
+            raise ValueError("No se pudieron cargar datos de entrenamiento")
+        x, y = self.prepare_training_data()
+        
+        results = run_cross_validation(self, x, y, folds=folds, workers=workers, bins=bins)
+        aggregate = results['aggregate']
+        
+        report = {
+            'timestamp': self._get_timestamp(),
+            'configuration': {
+                'folds': folds,
+                'workers': results['workers'],
+                'epochs': self.epochs,
+                'batch_size': self.batch_size,
+                'learning_rate': self.learning_rate,
+                'backend': self.backend,
+                'seed': self.seed
+            },
+            'data_statistics': {
+                'total_samples': x.shape[0],
+                'total_words': len(self.words),
+                'total_classes': len(self.classes)
+            },
+            'classes': self.classes,
+            'seconds': results['seconds'],
+            'aggregate': dict(aggregate, per_class=self._per_class_report(aggregate)),
+            'folds': results['folds']
+        }
+        
+        report_path = self.data_paths['models_dir'] / 'cv_report.json'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=_json_default)
+        
+        log_performance('cv.accuracy_mean', aggregate['accuracy_mean'])
+        log_performance('cv.accuracy_std', aggregate['accuracy_std'])
+        log_performance('cv.duration', results['seconds'], unit='s')
+        
+        self.logger.info(f"✅ Validación cruzada ({folds} folds): "
+                    f"accuracy {aggregate['accuracy_mean']:.4f} ± {aggregate['accuracy_std']:.4f}, "
+                    f"precisión macro {aggregate['macro_precision']:.4f}, "
+                    f"recall macro {aggregate['macro_recall']:.4f}")
+        self.logger.info(f"📄 Reporte guardado: {report_path}")
+        
+        return report
+    
+    def compare_feature_spaces(self, bucket_sizes: List[int], languages: List[str] = None,
+                            char_ngrams: List[int] = None) -> Dict[str, Any]:
+        """
+        Compara el vocabulario exacto con hashing a varios tamaños de cubo
+        
+        El reporte (accuracy, parámetros y latencia por mensaje) se guarda en
+        `feature_space_report.json`; no se publica ningún modelo.
+        
+        Args:
+            bucket_sizes: Número de cubos a evaluar (ej: 256 1024 4096)
+            languages: Idiomas a evaluar (None para todos)
+            char_ngrams: Rango [min, max] de n-gramas de caracteres para hashing
+            
+        Returns:
+            Reporte de la comparación
+        """
+        if not self.load_training_data(languages):
+            raise ValueError("No se pudieron cargar datos de entrenamiento")
+        # Herramienta offline: el split y la sonda de latencia indexan por muestra
+        documents = self.documents if self.keep_documents else list(self._iter_documents(languages))
+        signed = bool(self.features_config.get('signed', True))
+        spaces = [{'mode': 'vocabulary'}] + [
+            {'mode': HASHING, 'buckets': int(buckets), 'char_ngrams': char_ngrams, 'signed': signed}
+            for buckets in bucket_sizes
+        ]
+        
+        # Las ejecuciones de comparación no dejan checkpoints ni CSV
+        save_checkpoints, csv_logger = self.save_checkpoints, self.enable_csv_logger
+        self.save_checkpoints, self.enable_csv_logger = False, False
+        try:
+            results = compare_feature_spaces(self, documents, spaces)
+        finally:
+            self.save_checkpoints, self.enable_csv_logger = save_checkpoints, csv_logger
+        
+        report = dict(results, timestamp=self._get_timestamp(), vocabulary_size=len(self.words),
+                    classes=self.classes, backend=self.backend, epochs=self.epochs)
+        report_path = self.data_paths['models_dir'] / 'feature_space_report.json'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=_json_default)
+        self.logger.info(f"📄 Reporte guardado: {report_path}")
+        return report
+    
+    def compare_pruning(self, languages: List[str] = None) -> Dict[str, Any]:
+        """
+        Mide el efecto de training.pruning frente al vocabulario completo
+        
+        Entrena ambos modelos sobre el mismo split y guarda en
+        `pruning_report.json` la reducción de parámetros y de latencia por
+        mensaje junto al cambio de accuracy. No se publica ningún modelo.
+        
+        Args:
+            languages: Idiomas a evaluar (None para todos)
+            
+        Returns:
+            Reporte de la comparación
+        """
+        pruning_config = self.pruning_config
+        self.pruning_config = dict(pruning_config, enabled=False)
+        try:
+            if not self.load_training_data(languages):
+                raise ValueError("No se pudieron cargar datos de entrenamiento")
+        finally:
+            self.pruning_config = pruning_config
+        # Herramienta offline: el split y la sonda de latencia indexan por muestra
+        documents = self.documents if self.keep_documents else list(self._iter_documents(languages))
+        full = VocabularyFeatures(self.words)
+        stats = self.prune_vocabulary(documents)
+        pruned = self.features
+        
+        save_checkpoints, csv_logger = self.save_checkpoints, self.enable_csv_logger
+        self.save_checkpoints, self.enable_csv_logger = False, False
+        try:
+            results = compare_feature_spaces(self, documents, [full, pruned])
+        finally:
+            self.save_checkpoints, self.enable_csv_logger = save_checkpoints, csv_logger
+        
+        before, after = results['spaces']
+        report = {
+            'timestamp': self._get_timestamp(),
+            'pruning': stats,
+            'train_samples': results['train_samples'],
+            'validation_samples': results['validation_samples'],
+            'full': before,
+            'pruned': after,
+            'parameters_reduction': 1 - after['parameters'] / before['parameters'],
+            'latency_reduction': (1 - after['latency_us_mean'] / before['latency_us_mean']
+                                if before['latency_us_mean'] else 0.0),
+            'accuracy_change': after['accuracy'] - before['accuracy']
+        }
+        report_path = self.data_paths['models_dir'] / 'pruning_report.json'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=_json_default)
+        
+        self.logger.info(f"✂️ Poda: parámetros -{report['parameters_reduction']:.1%}, "
+                    f"latencia -{report['latency_reduction']:.1%}, "
+                    f"accuracy {report['accuracy_change']:+.4f}")
+        self.logger.info(f"📄 Reporte guardado: {report_path}")
+        return report
+    
+    def train_language_shards(self, languages: List[str] = None,
+                            workers: int = None) -> Dict[str, Any]:
+        """
+        Entrena un modelo por idioma en paralelo (ver sharding)
+        
+        Args:
+            languages: Idiomas (None para todos los soportados)
+            workers: Procesos en paralelo (None usa training.shards.workers)
+            
+        Returns:
+            Resultado por idioma; los fallos no invalidan el modelo conjunto
+        """
+        languages = languages or self.config.get('model', {}).get('supported_languages', ['es', 'en'])
+        languages = [language for language, _ in self._intent_files(languages)]
+        if workers is None:
+            workers = self.shards_config.get('workers') or None
+        try:
+            with self.profiler.stage('shards'):
+                results = train_language_shards(self, languages, workers)
+        except Exception as e:
+            self.logger.error(f"Error entrenando shards por idioma: {e}")
+            return {'error': str(e)}
+        
+        for language, result in results['languages'].items():
+            if result['success']:
+                self.logger.info(f"✅ Shard {language}: {result['vocabulary_size']} palabras, "
+                            f"{result['classes_count']} clases ({result['version']})")
+            else:
+                self.logger.warning(f"[WARN] Shard {language} sin éxito; se usará el modelo conjunto")
+        return results
+    
     def run_full_training(self, languages: List[str] = None, 
                         force_retrain: bool = False) -> bool:
         """
@@ -497,7 +1368,7 @@ class LucyTrainer:
         """
         try:
             # Verificar si ya existe un modelo
-            if not force_retrain and self.data_paths['model_file'].exists():
+            if not force_retrain and not self.resume and not self.candidate and self.model_artifact.exists():
                 self.logger.info("ℹ️ Modelo existente encontrado. Use force_retrain=True para re-entrenar")
                 return True
             
@@ -513,20 +1384,26 @@ class LucyTrainer:
             # 3. Dividir en entrenamiento y validación
             validation_data = None
             if self.validation_split > 0:
-                train_x, val_x, train_y, val_y = train_test_split(
-                    train_x, train_y, 
-                    test_size=self.validation_split, 
-                    random_state=42
-                )
+                train_x, val_x, train_y, val_y = self._split_validation(train_x, train_y)
                 validation_data = (val_x, val_y)
                 self.logger.info(f"📊 División de datos: "
-                            f"{len(train_x)} entrenamiento, {len(val_x)} validación")
+                            f"{train_x.shape[0]} entrenamiento, {val_x.shape[0]} validación")
             
-            # 4. Crear modelo
-            model = self.create_model(len(train_x[0]), len(train_y[0]))
+            # 4. Auto-tuning opcional de batch size / learning rate
+            if self.autotune_config.get('enabled', False) and not self.resume:
+                self.report_sections['autotune'] = self.autotune_batch_size(
+                    train_x, train_y, validation_data
+                )
             
-            # 5. Entrenar modelo
-            training_results = self.train_model(model, train_x, train_y, validation_data)
+            # 5-6. Crear y entrenar modelo (plano o jerárquico)
+            if self.hierarchy_config.get('enabled', False):
+                model, training_results = self.train_hierarchical(train_x, train_y, validation_data)
+                self.report_sections['hierarchy'] = training_results['hierarchy']
+            else:
+                model = self.create_model(train_x.shape[1], train_y.shape[1])
+                training_results = self.train_model(model, train_x, train_y, validation_data)
+            if self.pruning:
+                self.report_sections['pruning'] = self._pruning_summary(model)
             # Emitir métricas al sistema de logging (tiempo total de entrenamiento, si disponible)
             try:
                 if 'history' in training_results and 'loss' in training_results['history']:
@@ -539,8 +1416,9 @@ class LucyTrainer:
             except Exception:
                 pass
             
-            # 6. Validar modelo
-            validation_results = self.validate_model(model, train_x, train_y)
+            # 7. Validar modelo sobre datos no vistos (si hay división)
+            eval_x, eval_y = validation_data if validation_data is not None else (train_x, train_y)
+            validation_results = self.validate_model(model, eval_x, eval_y)
             try:
                 if 'accuracy' in validation_results:
                     log_performance('validation.accuracy', float(validation_results['accuracy']))
@@ -549,11 +1427,27 @@ class LucyTrainer:
             except Exception:
                 pass
             
-            # 7. Guardar modelo
-            if not self.save_model_components(model):
+            if self.candidate:
+                self.report_sections['promotion'] = self._compare_with_current(
+                    eval_x, eval_y, validation_results
+                )
+            
+            # 8. Guardar modelo
+            bundle_metadata = {
+                'epochs_completed': training_results.get('epochs_completed'),
+                'final_loss': float(training_results.get('final_loss', 0.0)),
+                'final_accuracy': float(training_results.get('final_accuracy', 0.0)),
+                'validation_accuracy': float(validation_results.get('accuracy', 0.0)),
+                'samples': self.documents_count
+            }
+            if not self.save_model_components(model, bundle_metadata):
                 return False
             
-            # 8. Generar reporte
+            # 9. Modelos por idioma (opcional; el conjunto queda como respaldo)
+            if self.shards_config.get('enabled', False) and not self.candidate:
+                self.report_sections['shards'] = self.train_language_shards(languages)
+            
+            # 10. Generar reporte
             self._generate_training_report(training_results, validation_results)
             
             self.logger.info("🎉 Entrenamiento completado exitosamente!")
@@ -562,6 +1456,8 @@ class LucyTrainer:
         except Exception as e:
             self.logger.error(f"Error en entrenamiento completo: {e}")
             return False
+        finally:
+            self.profiler.close()
     
     def _generate_training_report(self, training_results: Dict[str, Any], 
                                 validation_results: Dict[str, Any]):
@@ -575,25 +1471,36 @@ class LucyTrainer:
         try:
             report = {
                 'timestamp': self._get_timestamp(),
+                'bundle_version': self.bundle_version,
                 'configuration': {
                     'epochs': self.epochs,
                     'batch_size': self.batch_size,
                     'dropout_rate': self.dropout_rate,
-                    'validation_split': self.validation_split
+                    'validation_split': self.validation_split,
+                    'learning_rate': self.learning_rate,
+                    'input_pipeline': self.input_pipeline,
+                    'backend': self.backend,
+                    'features': self.features.to_metadata()
                 },
                 'data_statistics': {
                     'total_words': len(self.words),
                     'total_classes': len(self.classes),
-                    'total_documents': len(self.documents)
+                    'total_documents': self.documents_count
                 },
                 'training_results': training_results,
                 'validation_results': validation_results
             }
+            report.update(self.report_sections)
+            self.profile = self.profiler.report()
+            report['profile'] = self.profile
             
-            # Guardar reporte
-            report_path = self.data_paths['models_dir'] / 'training_report.json'
+            # Guardar reporte (el de un candidato no sustituye al del modelo en servicio)
+            if self.candidate:
+                report_path = self.data_paths['models_dir'] / f'candidate_report_{self.bundle_version}.json'
+            else:
+                report_path = self.data_paths['models_dir'] / 'training_report.json'
             with open(report_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
+                json.dump(report, f, indent=2, ensure_ascii=False, default=_json_default)
             
             self.logger.info(f"📄 Reporte guardado: {report_path}")
             
@@ -615,17 +1522,19 @@ class LucyTrainer:
         return {
             'words_count': len(self.words),
             'classes_count': len(self.classes),
-            'documents_count': len(self.documents),
+            'documents_count': self.documents_count,
             'configuration': {
                 'epochs': self.epochs,
                 'batch_size': self.batch_size,
                 'dropout_rate': self.dropout_rate,
-                'validation_split': self.validation_split
+                'validation_split': self.validation_split,
+                'input_pipeline': self.input_pipeline,
+                'backend': self.backend
             },
             'files_exist': {
                 'words': self.data_paths['words_file'].exists(),
                 'classes': self.data_paths['classes_file'].exists(),
-                'model': self.data_paths['model_file'].exists()
+                'model': self.model_artifact.exists()
             }
         }
 
@@ -647,6 +1556,34 @@ def main():
                     help='Tamaño de batch')
     parser.add_argument('--validate', action='store_true',
                     help='Solo validar modelo existente')
+    parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                    help='Backend de entrenamiento (keras, numpy, sklearn)')
+    parser.add_argument('--pipeline', choices=['numpy', 'tf_data'], default=None,
+                    help='Pipeline de entrada para el entrenamiento')
+    parser.add_argument('--autotune', action='store_true',
+                    help='Auto-ajustar batch size y learning rate antes del entrenamiento')
+    parser.add_argument('--cv', type=int, default=None, metavar='K',
+                    help='Evaluar con validación cruzada estratificada de K folds')
+    parser.add_argument('--cv-workers', type=int, default=None,
+                    help='Procesos en paralelo para la validación cruzada')
+    parser.add_argument('--resume', action='store_true',
+                    help='Continuar un entrenamiento interrumpido desde el último checkpoint')
+    parser.add_argument('--profile', action='store_true',
+                    help='Perfilar también la memoria de Python (tracemalloc) y mostrar el resumen')
+    parser.add_argument('--shards', action='store_true',
+                    help='Entrenar además un modelo por idioma (en paralelo)')
+    parser.add_argument('--candidate', action='store_true',
+                    help='Publicar el bundle sin activarlo y compararlo con el modelo en servicio')
+    parser.add_argument('--learning-data', action='store_true',
+                    help='Incluir la tabla learning_data en los datos de entrenamiento')
+    parser.add_argument('--result', type=str, default=None,
+                    help='Archivo JSON donde escribir el resultado del candidato')
+    parser.add_argument('--compare-features', type=int, nargs='+', default=None, metavar='BUCKETS',
+                    help='Comparar vocabulario exacto con hashing a estos tamaños de cubo')
+    parser.add_argument('--compare-pruning', action='store_true',
+                    help='Comparar el vocabulario podado (training.pruning) con el completo')
+    parser.add_argument('--char-ngrams', type=int, nargs=2, default=None, metavar=('MIN', 'MAX'),
+                    help='N-gramas de caracteres para hashing (con --compare-features)')
     
     args = parser.parse_args()
     
@@ -658,7 +1595,12 @@ def main():
         )
         
         # Inicializar entrenador
-        config_manager = get_config_manager(args.config) if args.config else None
+        config_manager = get_config_manager(args.config) if args.config else get_config_manager()
+        if args.backend:
+            config_manager.set('training.backend', args.backend)
+        if args.profile:
+            config_manager.set('training.profiling.enabled', True)
+            config_manager.set('training.profiling.trace_memory', True)
         trainer = LucyTrainer(config_manager)
         
         # Aplicar parámetros de línea de comandos
@@ -666,13 +1608,50 @@ def main():
             trainer.epochs = args.epochs
         if args.batch_size:
             trainer.batch_size = args.batch_size
+        if args.pipeline:
+            trainer.input_pipeline = args.pipeline
+        if args.autotune:
+            trainer.autotune_config = dict(trainer.autotune_config, enabled=True)
+        if args.resume:
+            trainer.resume = True
+        if args.candidate:
+            trainer.candidate = True
+        if args.shards:
+            trainer.shards_config = dict(trainer.shards_config, enabled=True)
+        if args.learning_data:
+            trainer.learning_data_config = dict(trainer.learning_data_config, enabled=True)
+        
+        if args.cv:
+            report = trainer.run_cross_validation(args.cv, languages=args.languages,
+                                                workers=args.cv_workers)
+            aggregate = report['aggregate']
+            print(f"✅ Validación cruzada: accuracy {aggregate['accuracy_mean']:.4f} "
+                f"± {aggregate['accuracy_std']:.4f}")
+            return True
+        
+        if args.compare_features:
+            report = trainer.compare_feature_spaces(args.compare_features, languages=args.languages,
+                                                    char_ngrams=args.char_ngrams)
+            for space in report['spaces']:
+                print(f"{space['features']['mode']:<10} {space['input_size']:>6}  "
+                    f"accuracy {space['accuracy']:.4f}  parámetros {space['parameters']:>8}  "
+                    f"{space['latency_us_mean']:8.0f} µs/mensaje")
+            return True
+        
+        if args.compare_pruning:
+            report = trainer.compare_pruning(languages=args.languages)
+            print(f"✂️ Vocabulario {report['pruning']['original_size']} → {report['pruning']['size']}: "
+                f"parámetros -{report['parameters_reduction']:.1%}, "
+                f"latencia -{report['latency_reduction']:.1%}, "
+                f"accuracy {report['accuracy_change']:+.4f}")
+            return True
         
         if args.validate:
             # Solo validar modelo existente
             print("🔍 Validando modelo existente...")
             
             # Verificar que existe el modelo
-            if not trainer.data_paths['model_file'].exists():
+            if not trainer.model_artifact.exists():
                 print("❌ No se encontró modelo para validar")
                 return False
             
@@ -681,9 +1660,12 @@ def main():
             train_x, train_y = trainer.prepare_training_data()
             
             # Cargar modelo existente
-            with suppress_tf_logs():
-                from tensorflow.keras.models import load_model
-                model = load_model(str(trainer.data_paths['model_file']))
+            if trainer.backend == 'keras':
+                with suppress_tf_logs():
+                    from tensorflow.keras.models import load_model
+                    model = load_model(str(trainer.model_artifact))
+            else:
+                model = NumpyMLP.load(str(trainer.model_artifact))
             
             # Validar
             results = trainer.validate_model(model, train_x, train_y)
@@ -698,6 +1680,18 @@ def main():
                 force_retrain=args.force
             )
             
+            if args.result:
+                result = {
+                    'success': bool(success),
+                    'version': trainer.bundle_version,
+                    **trainer.report_sections.get('promotion', {})
+                }
+                with open(args.result, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, indent=2, ensure_ascii=False, default=_json_default)
+            
+            if trainer.profile:
+                print(format_profile(trainer.profile))
+            
             if success:
                 print("🎉 ¡Entrenamiento exitoso!")
                 return True
@@ -1,4 +1,5 @@
 from typing import Optional, Dict, Any
+import asyncio
 import os
 import time
 import uuid
@@ -7,7 +8,7 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.wsgi import WSGIMiddleware
 from django.core.wsgi import get_wsgi_application
 from pydantic import BaseModel, EmailStr
@@ -18,6 +19,9 @@ from .. import get_config_manager
 from ..lucy_ai import LucyAI
 from ..utils import suppress_tf_logs
 from ..database import ConversationDB
+from ..async_db import AsyncConversationDB
+from ..export import FORMATS as EXPORT_FORMATS, MEDIA_TYPES as EXPORT_MEDIA_TYPES, iter_gzip, iter_lines
+from ..retraining import RetrainOrchestrator
 from ..logging_system import log_conversation, log_performance, get_logger
 
 
@@ -56,9 +60,19 @@ def create_app() -> FastAPI:
     assets_dir = static_dir / "assets"
 
     app.state.config_manager = config_manager
-    app.state.db = ConversationDB(config.get("database", {}).get("path", "data/conversations.db"))
+    db_cfg = config.get("database", {})
+    # Las llamadas a la base de datos se ejecutan en hilos propios, fuera del bucle de eventos
+    pool_cfg = db_cfg.get("pool", {}) or {}
+    app.state.db = AsyncConversationDB(
+        ConversationDB(db_cfg.get("path", "data/conversations.db"), db_cfg),
+        workers=db_cfg.get("async_workers", int(pool_cfg.get("readers", 4)) + 1)
+    )
+    # Entradas de las ventanas de contexto 'recent' y 'theme:<intent>'
+    context_window = int(db_cfg.get("context_window_size", 10))
     with suppress_tf_logs():
         app.state.engine = LucyAI(config_manager)
+    app.state.retrainer = RetrainOrchestrator(config_manager, app.state.db.sync)
+    app.state.retrainer.start()
     app.state.rate_limit = {
         "enabled": api_cfg.get("rate_limit", {}).get("enabled", True),
         "rpm": int(api_cfg.get("rate_limit", {}).get("requests_per_minute", 60)),
@@ -99,6 +113,12 @@ def create_app() -> FastAPI:
         exp = float(info.get("exp", 0))
         return exp > time.time()
 
+    def _require_admin(request: Request) -> bool:
+        # Sin token configurado no se expone ninguna operación administrativa
+        expected = str(app.state.config_manager.get("api.admin_token", "") or "")
+        provided = request.headers.get("x-admin-token") or ""
+        return bool(expected) and secrets.compare_digest(provided, expected)
+
     @app.post("/api/chat")
     async def chat(req: ChatRequest, request: Request):
         if not _require_auth(request):
@@ -134,7 +154,8 @@ def create_app() -> FastAPI:
             pass
 
         try:
-            app.state.db.save_conversation(
+            intent_name = app.state.engine.get_last_intent() or "unknown"
+            await app.state.db.enqueue_turn(
                 session_id=session_id,
                 user_input=req.message,
                 bot_response=response,
@@ -142,17 +163,10 @@ def create_app() -> FastAPI:
                 confidence=app.state.engine.get_last_confidence(),
                 intent=app.state.engine.get_last_intent(),
                 response_time=elapsed,
-                context=req.context or {}
+                context=req.context or {},
+                windows=(f"theme:{intent_name}", "recent"),
+                window_size=context_window
             )
-            intent_name = app.state.engine.get_last_intent() or "unknown"
-            prev = app.state.db.get_context(session_id, f"theme:{intent_name}") or []
-            prev.append({"user": req.message, "bot": response})
-            prev = prev[-10:]
-            app.state.db.set_context(session_id, f"theme:{intent_name}", prev)
-            recent = app.state.db.get_context(session_id, "recent") or []
-            recent.append({"user": req.message, "bot": response})
-            recent = recent[-10:]
-            app.state.db.set_context(session_id, "recent", recent)
         except Exception:
             logger.warning("No se pudo guardar conversación en DB")
 
@@ -202,7 +216,7 @@ def create_app() -> FastAPI:
             return JSONResponse(status_code=422, content={"error": "Contraseña inválida: mínimo 8, incluye mayúscula, minúscula y dígito"})
 
         try:
-            created = app.state.db.create_user(u, req.email, fn, ln, req.dob.isoformat(), pw)
+            created = await app.state.db.create_user(u, req.email, fn, ln, req.dob.isoformat(), pw)
             if not created:
                 return JSONResponse(status_code=409, content={"error": "Usuario o correo ya existe"})
         except Exception:
@@ -231,7 +245,7 @@ def create_app() -> FastAPI:
             return JSONResponse(status_code=422, content={"error": "Credenciales obligatorias"})
 
         try:
-            ok, user = app.state.db.verify_login(identifier, password)
+            ok, user = await app.state.db.verify_login(identifier, password)
             if not ok:
                 return JSONResponse(status_code=401, content={"error": "Usuario/contraseña inválidos"})
         except Exception:
@@ -254,7 +268,7 @@ def create_app() -> FastAPI:
     async def context(session_id: str):
         return {
             "session_id": session_id,
-            "history": app.state.db.get_conversation_history(session_id, limit=20),
+            "history": await app.state.db.get_conversation_history(session_id, limit=20),
             "engine_context": app.state.engine.get_conversation_context(),
         }
 
@@ -268,7 +282,7 @@ def create_app() -> FastAPI:
         app.state.engine.set_language(code)
         sid = request.headers.get("X-Session-ID")
         if sid:
-            app.state.db.update_session_settings(sid, {"preferred_language": code})
+            await app.state.db.update_session_settings(sid, {"preferred_language": code})
         return {"ok": True, "language": app.state.engine.get_current_language()}
 
     @app.post("/api/clear")
@@ -279,7 +293,7 @@ def create_app() -> FastAPI:
         if not session_id:
             return JSONResponse(status_code=400, content={"error": "Falta session_id"})
         try:
-            deleted = app.state.db.clear_session_context(session_id)
+            deleted = await app.state.db.clear_session_context(session_id)
             app.state.engine.clear_context()
         except Exception:
             return JSONResponse(status_code=500, content={"error": "Error al limpiar contexto"})
@@ -289,13 +303,85 @@ def create_app() -> FastAPI:
     async def stats():
         return {
             "engine": app.state.engine.get_statistics(),
-            "db": app.state.db.get_database_stats(),
+            "db": await app.state.db.get_database_stats(),
+        }
+
+    @app.get("/api/admin/stats")
+    async def admin_stats(request: Request):
+        if not _require_admin(request):
+            return JSONResponse(status_code=403, content={"error": "Prohibido"})
+        return {
+            "db": await app.state.db.get_database_stats(),
+            "operations": await app.state.db.get_operational_stats(),
+            "async_db": app.state.db.stats(),
         }
 
+    @app.get("/api/admin/model")
+    async def admin_model_status(request: Request):
+        if not _require_admin(request):
+            return JSONResponse(status_code=403, content={"error": "Prohibido"})
+        return app.state.engine.get_model_status()
+
+    @app.post("/api/admin/model/reload")
+    async def admin_model_reload(request: Request):
+        if not _require_admin(request):
+            return JSONResponse(status_code=403, content={"error": "Prohibido"})
+        version = request.query_params.get("version") or None
+        wait = request.query_params.get("wait", "").lower() in ("1", "true", "yes")
+        if not wait:
+            # La carga y el calentamiento siguen en segundo plano
+            app.state.engine.reload_model(version)
+            return JSONResponse(status_code=202, content={"ok": True, "scheduled": True, "version": version})
+        ok = await asyncio.to_thread(app.state.engine.reload_model, version, True)
+        status = app.state.engine.get_model_status()
+        if not ok:
+            return JSONResponse(status_code=409, content={"ok": False, **status})
+        return {"ok": True, **status}
+
+    @app.post("/api/admin/model/rollback")
+    async def admin_model_rollback(request: Request):
+        if not _require_admin(request):
+            return JSONResponse(status_code=403, content={"error": "Prohibido"})
+        ok = await asyncio.to_thread(app.state.engine.rollback_model)
+        status = app.state.engine.get_model_status()
+        if not ok:
+            return JSONResponse(status_code=409, content={"ok": False, **status})
+        return {"ok": True, **status}
+
+    @app.get("/api/admin/export")
+    async def admin_export(request: Request):
+        if not _require_admin(request):
+            return JSONResponse(status_code=403, content={"error": "Prohibido"})
+        params = request.query_params
+        fmt = params.get("format", "jsonl")
+        if fmt not in EXPORT_FORMATS:
+            return JSONResponse(status_code=400, content={"error": f"Formato no soportado: {fmt}"})
+        compress = params.get("gzip", "").lower() in ("1", "true", "yes")
+        archived = params.get("archived", "").lower() in ("1", "true", "yes")
+        rows = app.state.db.sync.iter_conversations(
+            params.get("session_id") or None, params.get("language") or None, params.get("intent") or None,
+            params.get("since") or None, params.get("until") or None, include_archived=archived
+        )
+        # Generador síncrono: Starlette lo consume en el threadpool, página a página
+        body = iter_lines(rows, fmt)
+        filename = f"conversations.{fmt}"
+        if compress:
+            body = iter_gzip(body)
+            filename += ".gz"
+        media_type = "application/gzip" if compress else EXPORT_MEDIA_TYPES[fmt]
+        return StreamingResponse(body, media_type=media_type,
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        app.state.retrainer.stop()
+        app.state.engine.close()
+        await app.state.db.close()
+
     @app.get("/api/health")
     async def health():
         try:
-            return {"ok": True, "engine": True}
+            return {"ok": True, "engine": True, "db": (await app.state.db.health_check())["ok"]}
         except Exception:
             return {"ok": False}
 
@@ -343,7 +429,8 @@ def create_app() -> FastAPI:
                 else:
                     await ws.send_json({"session_id": session_id, "final": True, "response": response, "t": elapsed})
                     try:
-                        app.state.db.save_conversation(
+                        intent_name = app.state.engine.get_last_intent() or "unknown"
+                        await app.state.db.enqueue_turn(
                             session_id=session_id,
                             user_input=message,
                             bot_response=response,
@@ -351,17 +438,10 @@ def create_app() -> FastAPI:
                             confidence=app.state.engine.get_last_confidence(),
                             intent=app.state.engine.get_last_intent(),
                             response_time=elapsed,
-                            context={}
+                            context={},
+                            windows=(f"theme:{intent_name}", "recent"),
+                            window_size=context_window
                         )
-                        intent_name = app.state.engine.get_last_intent() or "unknown"
-                        prev = app.state.db.get_context(session_id, f"theme:{intent_name}") or []
-                        prev.append({"user": message, "bot": response})
-                        prev = prev[-10:]
-                        app.state.db.set_context(session_id, f"theme:{intent_name}", prev)
-                        recent = app.state.db.get_context(session_id, "recent") or []
-                        recent.append({"user": message, "bot": response})
-                        recent = recent[-10:]
-                        app.state.db.set_context(session_id, "recent", recent)
                     except Exception:
                         pass
         except WebSocketDisconnect:
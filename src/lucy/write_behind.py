@@ -0,0 +1,244 @@
+"""
+Cola de Escritura Diferida (write-behind)
+=========================================
+
+Guardar cada turno de chat de forma síncrona mete una transacción y un
+fsync en la latencia de cada petición. `WriteBehindQueue` acepta registros
+en una cola acotada y un hilo en segundo plano los escribe por lotes (una
+sola transacción con `executemany`) cada `batch_size` registros o cada
+`flush_ms` milisegundos, lo que ocurra antes.
+
+Si un lote falla se reintenta por mitades, de modo que un registro inválido
+no arrastra al resto: solo cuentan como fallidos los que fallan solos.
+
+Si la cola está llena se aplica la política configurada:
+
+- `block`: el productor espera hasta `block_timeout_ms` (contrapresión) y,
+  si sigue llena, el registro se descarta.
+- `drop`: el registro se descarta de inmediato.
+- `overflow`: el registro se escribe de forma síncrona en el hilo del
+  productor.
+
+`flush()` espera a que todo lo encolado hasta ese momento esté escrito y
+`close()` vacía la cola antes de detener el hilo.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .logging_system import get_logger
+
+POLICIES = ('block', 'drop', 'overflow')
+
+
+class WriteBehindQueue:
+    """Cola acotada con un hilo que escribe los registros por lotes"""
+
+    def __init__(self, flush_fn: Callable[[List[Any]], Any], max_size: int = 10000,
+                batch_size: int = 200, flush_ms: float = 50.0, policy: str = 'block',
+                block_timeout_ms: float = 1000.0, name: str = 'write-behind'):
+        """
+        Args:
+            flush_fn: Escribe una lista de registros en una transacción
+            max_size: Capacidad de la cola
+            batch_size: Registros que disparan una escritura
+            flush_ms: Espera máxima de un registro antes de escribirse
+            policy: 'block', 'drop' u 'overflow' cuando la cola está llena
+            block_timeout_ms: Espera máxima del productor con la política 'block'
+            name: Nombre del hilo (para logs)
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Política no soportada: {policy} (use {', '.join(POLICIES)})")
+        self.flush_fn = flush_fn
+        self.max_size = max(1, int(max_size))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = max(0.0, float(flush_ms)) / 1000.0
+        self.policy = policy
+        self.block_timeout = max(0.0, float(block_timeout_ms)) / 1000.0
+        self.logger = get_logger(__name__)
+
+        self._queue: 'queue.Queue[Any]' = queue.Queue(maxsize=self.max_size)
+        self._closed = False
+        self._wake = threading.Event()
+        self._flush_now = threading.Event()
+        # Secuencias para flush(): registros aceptados y registros ya procesados
+        self._done = threading.Condition()
+        self._accepted = 0
+        self._processed = 0
+        self._lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'overflowed': 0, 'failed': 0,
+                    'flushes': 0, 'max_depth': 0, 'flush_seconds': 0.0, 'max_flush_seconds': 0.0,
+                    'last_flush_seconds': None}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, record: Any) -> bool:
+        """
+        Encola un registro
+
+        Returns:
+            True si se encoló o se escribió (overflow), False si se descartó
+        """
+        if self._closed:
+            raise RuntimeError("La cola de escritura diferida está cerrada")
+        with self._done:
+            self._accepted += 1
+        try:
+            if self.policy == 'block':
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            return self._on_full(record)
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['enqueued'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], depth)
+        if depth >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def _on_full(self, record: Any) -> bool:
+        if self.policy == 'overflow':
+            self._write([record])
+            with self._lock:
+                self._stats['overflowed'] += 1
+            self._mark_processed(1)
+            return True
+        with self._lock:
+            self._stats['dropped'] += 1
+            dropped = self._stats['dropped']
+        self._mark_processed(1)
+        # Avisar sin inundar el log cuando la cola se satura de forma sostenida
+        if dropped == 1 or dropped % 1000 == 0:
+            self.logger.warning(f"[WARN] Cola de escritura llena: {dropped} registros descartados")
+        return False
+
+    def _mark_processed(self, count: int):
+        with self._done:
+            self._processed += count
+            self._done.notify_all()
+
+    def _write(self, batch: List[Any]):
+        start = time.perf_counter()
+        written, failed = self._write_batch(batch)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['failed'] += failed
+            self._stats['flushes'] += 1
+            self._stats['flush_seconds'] += elapsed
+            self._stats['last_flush_seconds'] = elapsed
+            self._stats['max_flush_seconds'] = max(self._stats['max_flush_seconds'], elapsed)
+
+    def _write_batch(self, batch: List[Any]) -> Tuple[int, int]:
+        """
+        Escribe un lote; si falla, lo parte en mitades hasta aislar los
+        registros que fallan por sí solos
+
+        Returns:
+            (registros escritos, registros fallidos)
+        """
+        try:
+            self.flush_fn(batch)
+            return len(batch), 0
+        except Exception as e:
+            if len(batch) == 1:
+                self.logger.error(f"Error escribiendo registro: {e}")
+                return 0, 1
+        middle = len(batch) // 2
+        left = self._write_batch(batch[:middle])
+        right = self._write_batch(batch[middle:])
+        return left[0] + right[0], left[1] + right[1]
+
+    def _run(self):
+        while True:
+            # Esperar al primer registro del lote (o a la orden de cerrar)
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed or self._flush_now.is_set():
+                    break
+                self._wake.wait(remaining)
+                self._wake.clear()
+            if self._queue.empty():
+                self._flush_now.clear()
+            self._write(batch)
+            self._mark_processed(len(batch))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se escriba todo lo encolado hasta ahora
+
+        Returns:
+            False si se agotó el tiempo de espera
+        """
+        with self._done:
+            target = self._accepted
+        self._flush_now.set()
+        self._wake.set()
+        with self._done:
+            return self._done.wait_for(lambda: self._processed >= target, timeout=timeout)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidad de la cola, contadores y latencia de escritura por lote"""
+        with self._lock:
+            st = dict(self._stats)
+        flushes = st['flushes']
+        last = st['last_flush_seconds']
+        return {
+            'depth': self.depth,
+            'capacity': self.max_size,
+            'policy': self.policy,
+            'enqueued': st['enqueued'],
+            'written': st['written'],
+            'dropped': st['dropped'],
+            'overflowed': st['overflowed'],
+            'failed': st['failed'],
+            'max_depth': st['max_depth'],
+            'flushes': flushes,
+            'avg_batch': (st['written'] + st['failed']) / flushes if flushes else 0.0,
+            'avg_flush_ms': 1000.0 * st['flush_seconds'] / flushes if flushes else None,
+            'max_flush_ms': 1000.0 * st['max_flush_seconds'],
+            'last_flush_ms': 1000.0 * last if last is not None else None
+        }
+
+    def close(self, timeout: float = 30.0):
+        """Rechaza registros nuevos, escribe los pendientes y detiene el hilo"""
+        if self._closed:
+            return
+        self._closed = True
+        self._flush_now.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            self.logger.warning(f"[WARN] Cola de escritura no vaciada: {self.depth} registros pendientes")
+            return
+        # Registros encolados mientras el hilo terminaba
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftovers:
+            self._write(leftovers)
+            self._mark_processed(len(leftovers))
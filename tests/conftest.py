@@ -18,18 +18,19 @@ def temp_db_path(tmp_path):
 def conversation_db(temp_db_path):
     db = ConversationDB(temp_db_path)
     yield db
-    # No persistent connection; logger handles close message
+    db.close()
 
 @pytest.fixture
 def test_config_path(tmp_path):
     cfg = {
         "app": {"name": "Test Lucy", "version": "1.0.0"},
         "model": {"default_language": "es", "confidence_threshold": 0.3},
+        # Rutas absolutas bajo tmp_path: las pruebas nunca escriben en data/ ni logs/ del repositorio
         "paths": {
-            "data_dir": "data",
-            "models_dir": "data/models",
-            "intents_dir": "data/intents",
-            "logs_dir": "logs"
+            "data_dir": str(tmp_path / "data"),
+            "models_dir": str(tmp_path / "data" / "models"),
+            "intents_dir": str(tmp_path / "data" / "intents"),
+            "logs_dir": str(tmp_path / "logs")
         },
         "logging": {"level": "INFO", "file_enabled": True}
     }
@@ -40,4 +41,45 @@ def test_config_path(tmp_path):
 @pytest.fixture
 def config_manager(test_config_path):
     # Desactivar auto_reload para evitar hilos en pruebas
-    return ConfigManager(config_path=test_config_path, auto_reload=False)
\ No newline at end of file
+    return ConfigManager(config_path=test_config_path, auto_reload=False)
+
+@pytest.fixture
+def make_trainer(tmp_path):
+    """Fábrica de LucyTrainer sobre una configuración mínima en tmp_path"""
+    from src.lucy.training import LucyTrainer
+
+    def make(training=None, model=None):
+        cfg = {
+            "app": {"name": "Test Lucy", "version": "1.0.0"},
+            "model": dict({"default_language": "es", "confidence_threshold": 0.3,
+                           "training_epochs": 3, "batch_size": 4}, **(model or {})),
+            "paths": {
+                "data_dir": str(tmp_path / "data"),
+                "models_dir": str(tmp_path / "data" / "models"),
+                "intents_dir": str(tmp_path / "data" / "intents"),
+                "logs_dir": str(tmp_path / "logs")
+            },
+            "logging": {"level": "INFO", "file_enabled": False},
+            "training": dict({"save_checkpoints": False, "csv_logger": False}, **(training or {}))
+        }
+        cfg_path = tmp_path / "config.json"
+        cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+        return LucyTrainer(ConfigManager(config_path=str(cfg_path), auto_reload=False))
+
+    return make
+
+
+@pytest.fixture
+def synthetic_data():
+    """Generador de datos densos aprendibles: (x, y one-hot)"""
+    import numpy as np
+
+    def make(n=60, features=20, classes=3, seed=0):
+        rng = np.random.default_rng(seed)
+        labels = rng.integers(0, classes, n)
+        x = (rng.random((n, features)) > 0.8).astype(np.float32)
+        # Una característica dominante por clase para que el problema sea aprendible
+        x[np.arange(n), labels] = 1.0
+        return x, np.eye(classes, dtype=np.float32)[labels]
+
+    return make
@@ -0,0 +1,75 @@
+import gzip
+import json
+
+from src.lucy.archive import ConversationArchive
+from src.lucy.database import ConversationDB
+from src.lucy.maintenance import RetentionManager
+
+
+def _db(temp_db_path, tmp_path):
+    return ConversationDB(temp_db_path, {"retention": {"archive": {"enabled": True, "dir": str(tmp_path / "archive")}}})
+
+
+def _seed(db, n=10):
+    with db._get_connection() as conn:
+        for i in range(n):
+            conn.execute(
+                "INSERT INTO conversations (session_id, user_input, bot_response, language, timestamp) "
+                "VALUES (?, ?, ?, 'es', ?)",
+                (f"s{i % 2}", f"canción número {i}", "respuesta", f"2023-0{1 + i // 4}-15 10:00:0{i % 10}")
+            )
+
+
+def test_cleanup_archives_by_month_in_batches(temp_db_path, tmp_path):
+    db = _db(temp_db_path, tmp_path)
+    _seed(db)
+    db.save_conversation("s0", "mensaje reciente", "respuesta", "es")
+
+    result = db.cleanup_old_data(days_to_keep=30, batch_size=3)
+    assert result["conversations_deleted"] == 10
+    assert db.count_conversations() == 1
+    assert db.archive.months() == ["2023-01", "2023-02", "2023-03"]
+
+    # Cada lote es un miembro gzip; el archivo se lee como un único JSONL
+    with gzip.open(tmp_path / "archive" / "conversations-2023-01.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == [1, 2, 3, 4]
+
+    # Lectura transparente: primero el archivo y después la base de datos
+    rows = list(db.iter_conversations(include_archived=True, page_size=2))
+    assert [r["user_input"] for r in rows][-2:] == ["canción número 9", "mensaje reciente"]
+    assert len(list(db.iter_conversations(session_id="s1", include_archived=True))) == 5
+    assert len(list(db.iter_conversations(include_archived=True, since="2023-02-01", until="2023-03-01"))) == 4
+
+    assert db.search_conversations("cancion") == []
+    found = db.search_conversations("cancion numero", include_archived=True, limit=3)
+    assert [r["user_input"] for r in found] == ["canción número 9", "canción número 8", "canción número 7"]
+    assert all(r["archived"] for r in found)
+    db.close()
+
+
+def test_retention_enforces_max_conversations(temp_db_path, tmp_path):
+    db = _db(temp_db_path, tmp_path)
+    _seed(db)
+    manager = RetentionManager(db, max_conversations=4, batch_size=4, max_batches=10)
+
+    result = manager.run_once()
+    assert result["archived_by_cap"] == 6
+    assert [r["id"] for r in db.iter_conversations()] == [7, 8, 9, 10]
+    assert [r["id"] for r in db.archive.iter_rows()] == [1, 2, 3, 4, 5, 6]
+    assert manager.run_once()["archived_by_cap"] == 0
+    stats = manager.stats()
+    assert stats["runs"] == 2 and stats["archived_by_cap"] == 6 and stats["max_conversations"] == 4
+    db.close()
+
+
+def test_archive_skips_repeated_and_truncated_batches(tmp_path):
+    archive = ConversationArchive(str(tmp_path))
+    rows = [{"id": i, "timestamp": f"2024-05-0{i} 00:00:00", "session_id": "s"} for i in range(1, 4)]
+    archive.append(rows)
+    # Un corte entre archivar y borrar vuelve a archivar el mismo lote
+    archive.append(rows[1:])
+    with open(tmp_path / "conversations-2024-05.jsonl.gz", "ab") as f:
+        f.write(gzip.compress(b'{"id": 99}\n')[:10])
+
+    assert [r["id"] for r in archive.iter_rows()] == [1, 2, 3]
+    assert archive.stats()["months"] == 1
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from src.lucy.async_db import AsyncConversationDB
+from src.lucy.database import ConversationDB
+
+
+def test_async_facade_runs_calls_off_the_event_loop(temp_db_path):
+    async def scenario():
+        adb = AsyncConversationDB(ConversationDB(temp_db_path), workers=2)
+        loop_thread = threading.current_thread()
+
+        await asyncio.gather(*(adb.save_conversation("s", f"msg {i}", "resp", "es") for i in range(20)))
+        history = await adb.get_conversation_history("s", limit=50)
+        worker = await adb.run(threading.current_thread)
+        rows = [row async for row in adb.stream("iter_conversations", session_id="s", chunk_size=7)]
+        stats = adb.stats()
+        await adb.close()
+        return loop_thread, worker, history, rows, stats
+
+    loop_thread, worker, history, rows, stats = asyncio.run(scenario())
+    assert worker is not loop_thread and worker.name.startswith("lucy-db")
+    assert len(history) == 20
+    # Los guardados concurrentes terminan en cualquier orden; el stream va por id
+    assert sorted(r["user_input"] for r in rows) == sorted(f"msg {i}" for i in range(20))
+    assert [r["id"] for r in rows] == sorted(r["id"] for r in rows)
+    assert stats["pending"] == 0 and stats["calls"] >= 22
+
+
+def test_async_facade_keeps_sync_api_and_attributes(temp_db_path):
+    db = ConversationDB(temp_db_path)
+    adb = AsyncConversationDB(db)
+    assert adb.sync is db
+    assert adb.db_path == db.db_path
+    db.save_conversation("s", "hola", "hola!", "es")
+    assert asyncio.run(adb.count_conversations()) == 1
+    asyncio.run(adb.close())
@@ -0,0 +1,49 @@
+from src.lucy.cascade import IntentCascade, normalize_text
+
+INTENTS = {
+    "es": {"intents": [
+        {"tag": "saludo", "patterns": ["¡Hola!", "buenos días", "hola qué tal"]},
+        {"tag": "saludos", "patterns": ["hola"]},
+        {"tag": "clima", "patterns": ["qué tiempo hace hoy", "va a llover mañana"]},
+        {"tag": "hora", "patterns": ["qué hora es"]},
+    ]},
+    "en": {"intents": [{"tag": "greeting", "patterns": ["good morning"]}]},
+}
+
+
+def test_normalize_text_strips_case_accents_and_punctuation():
+    assert normalize_text("  ¿Qué  HORA es?! ") == "que hora es"
+    assert normalize_text("Buenos Días") == "buenos dias"
+
+
+def test_exact_tier_answers_unique_patterns_only():
+    cascade = IntentCascade(INTENTS)
+
+    hit = cascade.match("Buenos dias!!")
+    assert hit == {"tier": "exact", "language": "es", "intent": "saludo", "probability": 1.0}
+    assert cascade.match("good morning")["language"] == "en"
+    # "hola" lo declaran dos intenciones: no se resuelve en el nivel exacto
+    assert cascade.match("hola") is None
+
+
+def test_lexical_tier_requires_score_and_margin():
+    cascade = IntentCascade(INTENTS, min_score=0.7, min_margin=0.2)
+
+    hit = cascade.match("qué tiempo hace hoy en Lima")
+    assert hit["tier"] == "lexical" and hit["intent"] == "clima"
+    # Comparte tokens con "hora" y "clima": ambiguo, se deja al modelo
+    assert cascade.match("qué hora hace") is None
+    assert cascade.match("xyz") is None
+    assert IntentCascade(INTENTS, lexical=False).match("qué tiempo hace hoy en Lima") is None
+
+
+def test_stats_report_fractions_and_saved_time():
+    cascade = IntentCascade(INTENTS)
+    cascade.record("exact", 0.0001)
+    cascade.record("exact", 0.0001)
+    cascade.record("model", 0.0101)
+
+    stats = cascade.stats()
+    assert stats["total"] == 3
+    assert abs(stats["tiers"]["exact"]["fraction"] - 2 / 3) < 1e-9
+    assert abs(stats["estimated_saved_ms"] - 20.0) < 1e-6
@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.lucy.checkpoints import CheckpointWriter
+
+
+def test_writer_keeps_best_k_and_latest(tmp_path):
+    writer = CheckpointWriter(tmp_path, keep_best=2)
+    for epoch, metric in enumerate([0.9, 0.3, 0.5, 0.2, 0.8]):
+        writer.submit(epoch, [np.full((2, 2), epoch, dtype=np.float32)],
+                    {"velocities": [np.ones(3) * epoch], "learning_rate": 0.01 * (epoch + 1)},
+                    metric=metric)
+    writer.close()
+
+    files = sorted(p.name for p in tmp_path.glob("checkpoint_*.npz"))
+    # Mejores: épocas 3 (0.2) y 1 (0.3); la última (4) se conserva para reanudar
+    assert files == ["checkpoint_0002.npz", "checkpoint_0004.npz", "checkpoint_0005.npz"]
+    assert writer.errors == []
+
+    latest = CheckpointWriter.load_latest(tmp_path)
+    assert latest["epoch"] == 4
+    np.testing.assert_array_equal(latest["weights"][0], np.full((2, 2), 4))
+    np.testing.assert_array_equal(latest["optimizer_state"]["velocities"][0], np.ones(3) * 4)
+    assert latest["optimizer_state"]["learning_rate"] == 0.05
+
+
+def test_numpy_training_resumes_from_checkpoint(make_trainer, synthetic_data):
+    training = {"backend": "numpy", "save_checkpoints": True, "checkpoint_interval": 2,
+                "early_stopping": False}
+    x, y = synthetic_data()
+
+    first = make_trainer(training=training, model={"training_epochs": 4})
+    model = first.create_model(x.shape[1], y.shape[1])
+    results = first.train_model(model, x, y)
+    assert results["checkpoints"]["written"] == 2
+
+    second = make_trainer(training=training, model={"training_epochs": 6})
+    second.resume = True
+    resumed = second.create_model(x.shape[1], y.shape[1])
+    results = second.train_model(resumed, x, y)
+    assert results["initial_epoch"] == 4
+    assert results["epochs_completed"] == 6
+    assert len(results["history"]["loss"]) == 2
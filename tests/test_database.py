@@ -72,4 +72,227 @@ def test_metrics_summary_and_cleanup(conversation_db):
 
     # Confirmar que historia está vacía para una sesión insertada antes
     h = conversation_db.get_conversation_history(session_id="s0")
-    assert len(h) == 0
\ No newline at end of file
+    assert len(h) == 0
+
+def test_pool_uses_wal_and_reuses_connections(conversation_db):
+    for i in range(20):
+        conversation_db.save_conversation("s", f"msg {i}", "resp", "es")
+        conversation_db.get_conversation_history("s")
+
+    with conversation_db._read_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    stats = conversation_db.pool.stats()
+    assert stats["connections_opened"] <= 1 + stats["readers"]
+    assert conversation_db.health_check()["ok"]
+
+
+def test_pool_handles_concurrent_readers_and_writer(conversation_db):
+    import threading
+
+    errors = []
+
+    def write(k):
+        try:
+            for i in range(25):
+                conversation_db.save_conversation(f"w{k}", f"msg {i}", "resp", "es")
+        except Exception as e:
+            errors.append(e)
+
+    def read(k):
+        try:
+            for _ in range(25):
+                conversation_db.get_conversation_history(f"w{k % 3}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(k,)) for k in range(3)]
+    threads += [threading.Thread(target=read, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert conversation_db.get_database_stats()["total_conversations"] == 75
+    assert conversation_db.pool.stats()["open_readers"] <= 4
+
+
+def test_pool_rolls_back_failed_writes_and_closes_cleanly(temp_db_path):
+    import sqlite3
+
+    db = ConversationDB(temp_db_path, {"pool": {"health_check_seconds": 0}})
+    with pytest.raises(sqlite3.IntegrityError):
+        with db._get_connection() as conn:
+            conn.execute("INSERT INTO metrics (metric_name, metric_value) VALUES ('a', '1')")
+            conn.execute("INSERT INTO metrics (metric_name, metric_value) VALUES (NULL, '1')")
+    assert db.get_latest_metric("a") is None
+
+    # Una conexión rota no vuelve al pool
+    with db._read_connection() as conn:
+        conn.close()
+    assert db.get_latest_metric("a") is None
+    assert db.pool.stats()["discarded"] == 1
+
+    db.create_session(user_name="ana")
+    db.close()
+    assert not Path(temp_db_path + "-wal").exists() or Path(temp_db_path + "-wal").stat().st_size == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.get_latest_metric("a")
+
+    # Modo anterior (sin pool): la sesión creada quedó confirmada
+    legacy = ConversationDB(temp_db_path, {"pool": {"enabled": False}, "pragmas": {"journal_mode": "DELETE"}})
+    with legacy._read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions WHERE user_name = 'ana'").fetchone()[0] == 1
+    legacy.close()
+
+
+def test_record_turn_upserts_session_and_bounds_context_windows(conversation_db):
+    session_id = conversation_db.create_session(user_name="ana", settings={"theme": "dark"})
+
+    for i in range(5):
+        conversation_db.record_turn(session_id, f"hola {i}", f"resp {i}", "es", 0.9, "saludo",
+                                    windows=("theme:saludo", "recent"), window_size=3)
+    conversation_db.update_session_settings(session_id, {"theme": "light"})
+
+    info = conversation_db.get_session_info(session_id)
+    assert info["user_name"] == "ana" and info["total_messages"] == 5
+    assert json.loads(info["settings"]) == {"theme": "light"}
+    recent = conversation_db.get_context(session_id, "recent")
+    assert [entry["user"] for entry in recent] == ["hola 2", "hola 3", "hola 4"]
+    assert conversation_db.get_context(session_id, "theme:saludo") == recent
+
+
+def test_record_turns_is_atomic(conversation_db):
+    import sqlite3
+
+    good = conversation_db._make_turn("s1", "hola", "hola!", "es", windows=("recent",))
+    bad = conversation_db._make_turn("s1", None, "sin entrada", "es")
+    with pytest.raises(sqlite3.IntegrityError):
+        conversation_db.record_turns([good, bad])
+
+    assert conversation_db.get_conversation_history("s1") == []
+    assert conversation_db.get_session_info("s1") is None
+    assert conversation_db.get_context("s1", "recent") is None
+
+
+def test_search_uses_fts_ranking_snippets_and_filters(conversation_db):
+    conversation_db.save_conversation("s1", "¿Qué canción me recomiendas?", "Prueba una balada", "es")
+    conversation_db.save_conversation("s1", "Hola", "Te recomiendo una canción y otra canción", "es")
+    conversation_db.save_conversation("s2", "Recommend a song", "Try a cancion playlist", "en")
+
+    results = conversation_db.search_conversations("cancion")
+    assert len(results) == 3
+    # La coincidencia en user_input pesa más que en bot_response
+    assert results[0]["user_input"] == "¿Qué canción me recomiendas?"
+    assert "[canción]" in results[0]["input_snippet"]
+    assert [r["language"] for r in conversation_db.search_conversations("cancion", language="en")] == ["en"]
+    assert len(conversation_db.search_conversations("recom", session_id="s1")) == 2
+    # Caracteres especiales de FTS5 no rompen la consulta
+    assert conversation_db.search_conversations('canci"ón OR (') == []
+
+    conversation_db.cleanup_old_data(days_to_keep=-1)
+    assert conversation_db.search_conversations("cancion") == []
+
+
+def test_search_index_backfills_existing_rows_in_chunks(temp_db_path):
+    db = ConversationDB(temp_db_path, {"fts": {"enabled": False}})
+    for i in range(7):
+        db.save_conversation("s", f"mensaje número {i}", "respuesta", "es")
+    db.close()
+
+    db = ConversationDB(temp_db_path, {"fts": {"backfill_chunk": 3}})
+    assert db.fts_enabled
+    assert len(db.search_conversations("numero")) == 7
+    db.save_conversation("s", "otro número", "respuesta", "es")
+    assert len(db.search_conversations("numero")) == 8
+    with db._read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM schema_meta WHERE key LIKE 'fts_%'").fetchone()[0] == 0
+    db.close()
+
+
+def test_context_reads_are_pure_and_sweeper_deletes_in_batches(temp_db_path):
+    from src.lucy.maintenance import ContextSweeper
+
+    db = ConversationDB(temp_db_path)
+    db.set_context("s1", "fresh", {"a": 1}, expiry_minutes=5)
+    db.set_context("s1", "forever", [1, 2])
+    with db._get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO context (session_id, context_key, context_value, expires_at) VALUES (?, ?, ?, ?)",
+            [("s1", f"old{i}", "1", "2000-01-01 00:00:00") for i in range(7)])
+
+    assert db.get_context("s1", "old0") is None
+    assert db.get_session_context("s1") == {"fresh": {"a": 1}, "forever": [1, 2]}
+    with db._read_connection() as conn:
+        # Las lecturas no borran: las filas caducadas siguen ahí
+        assert conn.execute("SELECT COUNT(*) FROM context").fetchone()[0] == 9
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM context WHERE expires_at < CURRENT_TIMESTAMP "
+                            "ORDER BY expires_at LIMIT 3").fetchall()
+        assert any("idx_context_expiry" in row[-1] for row in plan)
+
+    sweeper = ContextSweeper(db, batch_size=3, max_batches=2)
+    assert sweeper.run_once() == 6
+    assert sweeper.run_once() == 1
+    stats = sweeper.stats()
+    assert stats["rows_swept"] == 7 and stats["runs"] == 2 and stats["last_seconds"] is not None
+    assert db.get_session_context("s1") == {"fresh": {"a": 1}, "forever": [1, 2]}
+    db.close()
+
+
+def test_periodic_job_requires_run_once(temp_db_path):
+    from src.lucy.maintenance import PeriodicJob
+
+    class Incomplete(PeriodicJob):
+        pass
+
+    db = ConversationDB(temp_db_path)
+    with pytest.raises(TypeError):
+        Incomplete(db, interval_seconds=1, batch_size=1)
+    db.close()
+
+
+def test_table_counters_track_inserts_and_deletes(temp_db_path):
+    db = ConversationDB(temp_db_path)
+    for i in range(6):
+        db.save_conversation(f"s{i % 2}", f"msg {i}", "resp", "es")
+    db.save_metric("latency", 0.1)
+    db.create_session("ana")
+    with db._get_connection() as conn:
+        conn.execute("UPDATE conversations SET timestamp = '2000-01-01 00:00:00' WHERE id <= 4")
+    db.cleanup_old_data(days_to_keep=30, batch_size=3)
+    db.close()
+
+    # Semilla inicial sobre una base existente y recuentos exactos tras reabrir
+    db = ConversationDB(temp_db_path)
+    with db._read_connection() as conn:
+        actual = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                  for t in ("conversations", "sessions", "learning_data", "metrics")}
+    assert db.get_table_counts() == actual
+    assert db.count_conversations() == 2
+    db.close()
+
+
+def test_database_stats_snapshot_is_cached(temp_db_path):
+    db = ConversationDB(temp_db_path, {"stats_cache_seconds": 60})
+    db.save_conversation("s", "hola", "hola!", "es")
+    first = db.get_database_stats()
+    db.save_conversation("s", "otra", "vale", "es")
+    assert db.get_database_stats()["total_conversations"] == first["total_conversations"] == 1
+
+    db.stats_cache_seconds = 0
+    assert db.get_database_stats()["total_conversations"] == 2
+    db.close()
+
+
+def test_public_stats_exclude_operational_sections(temp_db_path, tmp_path):
+    db = ConversationDB(temp_db_path, {"write_behind": {"enabled": True},
+                                       "retention": {"archive": {"enabled": True, "dir": str(tmp_path / "archive")}}})
+    stats = db.get_database_stats()
+    assert {"pool", "write_behind", "archive"}.isdisjoint(stats)
+    assert "total_conversations" in stats
+
+    operations = db.get_operational_stats()
+    assert {"pool", "write_behind", "archive"} <= set(operations)
+    db.close()
@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+
+from src.lucy.evaluation import aggregate_folds, classification_metrics, run_cross_validation
+
+
+def test_classification_metrics_per_class_and_histograms():
+    y_true = np.array([0, 0, 1, 1, 2])
+    probs = np.array([
+        [0.9, 0.05, 0.05],
+        [0.2, 0.7, 0.1],
+        [0.1, 0.8, 0.1],
+        [0.05, 0.9, 0.05],
+        [0.3, 0.3, 0.4],
+    ])
+    metrics = classification_metrics(y_true, probs, bins=10)
+
+    assert metrics["accuracy"] == 0.8
+    np.testing.assert_allclose(metrics["precision"], [1.0, 2 / 3, 1.0])
+    np.testing.assert_allclose(metrics["recall"], [0.5, 1.0, 1.0])
+    np.testing.assert_array_equal(metrics["support"], [2, 2, 1])
+    assert metrics["confidence_histogram"].sum() == 5
+    assert metrics["confidence_histogram_incorrect"][7] == 1
+    assert metrics["confidence_histogram_per_class"][1].sum() == 3
+
+    aggregate = aggregate_folds([metrics, metrics])
+    np.testing.assert_allclose(aggregate["precision"], metrics["precision"])
+    assert aggregate["confusion_matrix"].sum() == 10
+    assert aggregate["accuracy_std"] == 0.0
+
+
+def test_cross_validation_runs_folds_in_parallel(make_trainer, synthetic_data):
+    trainer = make_trainer(training={"backend": "numpy", "csv_logger": True}, model={"training_epochs": 20})
+    x, y = synthetic_data(n=90)
+    results = run_cross_validation(trainer, x, y, folds=3, workers=2, bins=5)
+
+    assert [fold["fold"] for fold in results["folds"]] == [0, 1, 2]
+    assert sum(fold["samples"] for fold in results["folds"]) == len(x)
+    aggregate = results["aggregate"]
+    assert aggregate["confusion_matrix"].sum() == len(x)
+    assert aggregate["accuracy_mean"] > 0.6
+    # Los folds desactivan el CSV en su copia de la configuración, no en la del entrenador
+    assert trainer.config_manager.get("training.csv_logger") is True
+    json.dumps(results, default=lambda v: v.tolist() if hasattr(v, "tolist") else str(v))
@@ -0,0 +1,90 @@
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+
+from src.lucy.database import ConversationDB, offline_settings
+from src.lucy.export import iter_gzip, iter_lines, write_export
+
+
+def _seed(db):
+    # Varias filas con la misma marca de tiempo: la paginación debe desempatar por id
+    with db._get_connection() as conn:
+        for i in range(7):
+            conn.execute(
+                "INSERT INTO conversations (session_id, user_input, bot_response, language, intent, confidence, timestamp, context) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (f"s{i % 2}", f"msg {i}", "resp, con coma", "es" if i % 3 else "en",
+                 "saludo" if i < 4 else "despedida", 0.5, f"2024-01-0{1 + i // 3} 10:00:00", json.dumps({"n": i}))
+            )
+
+
+def test_iter_conversations_keyset_and_filters(conversation_db):
+    _seed(conversation_db)
+    rows = list(conversation_db.iter_conversations(page_size=2))
+    assert [r["user_input"] for r in rows] == [f"msg {i}" for i in range(7)]
+
+    assert {r["session_id"] for r in conversation_db.iter_conversations(session_id="s1", page_size=2)} == {"s1"}
+    assert len(list(conversation_db.iter_conversations(intent="despedida"))) == 3
+    assert len(list(conversation_db.iter_conversations(language="en"))) == 3
+    window = list(conversation_db.iter_conversations(since="2024-01-02", until="2024-01-03"))
+    assert [r["user_input"] for r in window] == ["msg 3", "msg 4", "msg 5"]
+
+
+def test_jsonl_and_csv_roundtrip(conversation_db):
+    _seed(conversation_db)
+    lines = list(iter_lines(conversation_db.iter_conversations(), "jsonl"))
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 7 and records[0]["context"] == {"n": 0}
+
+    text = "".join(iter_lines(conversation_db.iter_conversations(), "csv"))
+    parsed = list(csv.DictReader(io.StringIO(text)))
+    assert len(parsed) == 7
+    assert parsed[2]["bot_response"] == "resp, con coma"
+    assert json.loads(parsed[2]["context"]) == {"n": 2}
+
+
+def test_write_export_gzip_chunks_with_manifest(conversation_db, tmp_path):
+    _seed(conversation_db)
+    summary = write_export(conversation_db.iter_conversations(page_size=3), str(tmp_path / "out"),
+                           "jsonl", compress=True, chunk_rows=3)
+    assert summary["rows"] == 7
+    assert [f["rows"] for f in summary["files"]] == [3, 3, 1]
+
+    manifest = json.loads((tmp_path / "out" / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["rows"] == 7
+    exported = []
+    for entry in manifest["files"]:
+        with gzip.open(entry["path"], "rt", encoding="utf-8") as f:
+            exported += [json.loads(line)["user_input"] for line in f]
+    assert exported == [f"msg {i}" for i in range(7)]
+
+    single = write_export(conversation_db.iter_conversations(), str(tmp_path / "all.csv"), "csv")
+    assert single["rows"] == 7
+    assert len(Path(single["files"][0]["path"]).read_text(encoding="utf-8").splitlines()) == 8
+
+
+def test_iter_gzip_streams_valid_gzip():
+    chunks = [f"linea {i}\n" for i in range(5000)]
+    blocks = list(iter_gzip(chunks, batch_bytes=1024))
+    assert len(blocks) > 1
+    assert gzip.decompress(b"".join(blocks)).decode("utf-8") == "".join(chunks)
+
+
+def test_offline_settings_skip_background_jobs(temp_db_path, tmp_path):
+    settings = {
+        "pool": {"readers": 2},
+        "context_expiry": {"enabled": True}, "rollups": {"enabled": True},
+        "write_behind": {"enabled": True}, "fts": {"enabled": True},
+        "retention": {"enabled": True, "archive": {"enabled": True, "dir": str(tmp_path / "archive")}}
+    }
+    db = ConversationDB(temp_db_path, offline_settings(settings))
+    try:
+        assert db.context_sweeper is None and db.rollup_refresher is None
+        assert db.retention is None and db.write_behind is None and not db.fts_enabled
+        # El archivo sigue disponible para exportar con include_archived
+        assert db.archive is not None
+    finally:
+        db.close()
+    assert settings["rollups"]["enabled"] is True
@@ -0,0 +1,80 @@
+import numpy as np
+from sklearn.feature_selection import chi2
+from sklearn.metrics import mutual_info_score
+
+from src.lucy.backends import NumpyMLP
+from src.lucy.features import (HASHING, HashingFeatures, VocabularyFeatures, build_features,
+                            feature_scores, prune_vocabulary)
+from src.lucy.ingestion import sparse_feature_matrix
+from src.lucy.model_bundle import load_bundle, publish_bundle
+from src.lucy.model_manager import ServingModel
+
+
+def test_hashing_is_deterministic_signed_and_bounded():
+    features = HashingFeatures(buckets=64)
+    index, values = features.indices(["hola", "amigo", "mañana"])
+    again = HashingFeatures(buckets=64).indices(["mañana", "amigo", "hola"])
+
+    assert np.array_equal(index, again[0]) and np.array_equal(values, again[1])
+    assert index.min() >= 0 and index.max() < 64
+    assert set(np.abs(values)) <= {1.0, 2.0, 3.0}
+    # Con signo, algún token cae en negativo; sin signo todo es positivo
+    many = HashingFeatures(buckets=1 << 20).indices([f"w{i}" for i in range(50)])[1]
+    assert (many < 0).any()
+    assert (HashingFeatures(buckets=1 << 20, signed=False).indices([f"w{i}" for i in range(50)])[1] > 0).all()
+
+
+def test_char_ngrams_give_unseen_words_shared_buckets():
+    plain = HashingFeatures(buckets=1 << 16)
+    ngrams = HashingFeatures(buckets=1 << 16, char_ngrams=[3, 4])
+
+    assert len(plain.indices(["saludos"])[0]) == 1
+    shared = set(ngrams.indices(["saludos"])[0]) & set(ngrams.indices(["saludo"])[0])
+    assert len(shared) >= 3
+    # Las palabras fuera del vocabulario no se pierden como en la bolsa exacta
+    assert VocabularyFeatures(["hola"]).transform(["saludos"]).sum() == 0
+    assert np.abs(plain.transform(["saludos"])).sum() == 1
+
+
+def test_hashing_bundle_serves_without_vocabulary(tmp_path):
+    features = build_features({"mode": "hashing", "buckets": 32, "char_ngrams": None})
+    weights = NumpyMLP(input_size=32, output_size=2, hidden_sizes=(4,), seed=0).get_weights()
+    publish_bundle(tmp_path, weights, [], ["x", "y"], {"features": features.to_metadata()})
+
+    bundle = load_bundle(tmp_path)
+    serving = ServingModel.from_bundle(bundle)
+
+    assert bundle.words == [] and serving.features.mode == HASHING
+    assert serving.features.size == 32 and serving.ready
+    probs = serving.model.predict(serving.features.transform(["hola"])[np.newaxis, :])
+    assert probs.shape == (1, 2)
+    assert not ServingModel([], ["x"], model=object()).ready
+
+
+DOCUMENTS = [
+    (["hola", "amigo"], "saludo"), (["hola", "buenas"], "saludo"), (["hola"], "saludo"),
+    (["adiós", "amigo"], "despedida"), (["adiós", "luego"], "despedida"), (["chao"], "despedida"),
+]
+
+
+def test_selection_scores_match_reference_on_sparse_matrix():
+    words = sorted({token for tokens, _ in DOCUMENTS for token in tokens})
+    x, labels = sparse_feature_matrix(DOCUMENTS, ["despedida", "saludo"], VocabularyFeatures(words))
+
+    assert x.nnz == sum(len(tokens) for tokens, _ in DOCUMENTS)
+    np.testing.assert_allclose(feature_scores(x, labels, 2, "chi2"), chi2(x, labels)[0])
+    expected_mi = [mutual_info_score(labels, x[:, j].toarray().ravel()) for j in range(len(words))]
+    np.testing.assert_allclose(feature_scores(x, labels, 2, "mutual_info"), expected_mi, atol=1e-12)
+
+
+def test_prune_vocabulary_applies_min_df_then_max_features():
+    words = sorted({token for tokens, _ in DOCUMENTS for token in tokens})
+    x, labels = sparse_feature_matrix(DOCUMENTS, ["despedida", "saludo"], VocabularyFeatures(words))
+
+    kept, stats = prune_vocabulary(x, labels, words, 2, min_df=2)
+    assert kept == ["adiós", "amigo", "hola"]
+    assert stats["removed_min_df"] == 3 and stats["size"] == 3
+
+    # "amigo" aparece en ambas clases: chi² lo descarta primero
+    kept, stats = prune_vocabulary(x, labels, words, 2, min_df=2, max_features=2)
+    assert kept == ["adiós", "hola"] and stats["removed_selection"] == 1
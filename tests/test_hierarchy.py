@@ -0,0 +1,53 @@
+import numpy as np
+from scipy import sparse
+
+from src.lucy.hierarchy import HierarchicalModel, assign_groups
+from src.lucy.model_bundle import load_bundle, publish_bundle
+
+
+def _synthetic_data(n=360, classes=12, seed=0):
+    # Cada clase activa su propia palabra y la de su "tema" (4 temas de 3 clases)
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, classes, n)
+    x = (rng.random((n, classes + 4)) > 0.9).astype(np.float32)
+    x[np.arange(n), labels] = 1.0
+    x[np.arange(n), classes + labels // 3] = 1.0
+    return sparse.csr_matrix(x), np.eye(classes, dtype=np.float32)[labels]
+
+
+def test_assign_groups_keeps_explicit_and_clusters_the_rest():
+    x, y = _synthetic_data()
+    labels = np.argmax(y, axis=1)
+    classes = [f"c{i}" for i in range(12)]
+    explicit = {"c0": "faq", "c1": "faq", "c2": "faq"}
+
+    groups, class_group = assign_groups(x, labels, classes, explicit, n_groups=3)
+
+    assert groups[0] == "faq" and set(class_group[:3]) == {0}
+    assert len(groups) == 4 and (class_group >= 0).all()
+    # Las clases del mismo tema caen en el mismo cluster
+    for topic in range(1, 4):
+        assert len(set(class_group[3 * topic:3 * topic + 3])) == 1
+
+
+def test_hierarchical_model_trains_and_roundtrips_through_bundle(tmp_path, make_trainer):
+    trainer = make_trainer(training={"backend": "numpy",
+                                     "hierarchy": {"enabled": True, "groups": 4, "top_groups": 2}},
+                           model={"training_epochs": 60, "batch_size": 16})
+    x, y = _synthetic_data()
+    trainer.classes = [f"c{i}" for i in range(12)]
+    trainer.words = [f"w{i}" for i in range(x.shape[1])]
+
+    model, results = trainer.train_hierarchical(x, y)
+
+    assert results["hierarchy"]["groups"] == 4 and results["hierarchy"]["heads"] == 4
+    probs = model.predict(x)
+    assert probs.shape == (x.shape[0], 12)
+    assert np.mean(np.argmax(probs, axis=1) == np.argmax(y, axis=1)) > 0.8
+    np.testing.assert_allclose(model.predict_active(x[0].indices), probs[0], rtol=1e-5, atol=1e-7)
+
+    publish_bundle(tmp_path / "models", model.get_weights(), trainer.words, trainer.classes,
+                {"hierarchy": model.to_metadata()})
+    restored = load_bundle(tmp_path / "models").build_model()
+    assert isinstance(restored, HierarchicalModel)
+    np.testing.assert_allclose(restored.predict(x), probs, rtol=1e-5, atol=1e-7)
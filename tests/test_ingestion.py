@@ -0,0 +1,71 @@
+import io
+import json
+
+import numpy as np
+
+from src.lucy.database import ConversationDB
+from src.lucy.ingestion import (build_vocabulary, iter_feature_batches, iter_intent_patterns,
+                                iter_json_array, iter_learning_patterns)
+
+
+INTENTS = {
+    "version": 1,
+    "intents": [
+        {"tag": "saludo", "patterns": ["hola", "buenos días [1]"], "responses": ["¡Hola!"]},
+        {"tag": "despedida", "patterns": ["adiós, \"amigo\""], "responses": ["Chao"]},
+        {"tag": "", "patterns": ["sin tag"]},
+    ],
+    "meta": {"intents": "no es un array"}
+}
+
+
+def test_incremental_parser_matches_json_load_with_tiny_chunks():
+    text = json.dumps(INTENTS, ensure_ascii=False, indent=2)
+    items = list(iter_json_array(io.StringIO(text), "intents", chunk_size=7))
+    assert items == INTENTS["intents"]
+    assert list(iter_json_array(io.StringIO("[1, 22, 333]"), None, chunk_size=2)) == [1, 22, 333]
+
+
+def test_intent_patterns_from_json_and_jsonl(tmp_path):
+    json_file = tmp_path / "intents_es.json"
+    json_file.write_text(json.dumps(INTENTS, ensure_ascii=False), encoding="utf-8")
+    jsonl_file = tmp_path / "intents_en.jsonl"
+    jsonl_file.write_text('{"tag": "greeting", "patterns": ["hi", "hello"]}\n\n'
+                        '{"tag": "greeting", "pattern": "hey"}\n', encoding="utf-8")
+
+    assert list(iter_intent_patterns(json_file, chunk_size=5)) == [
+        ("saludo", "hola"), ("saludo", "buenos días [1]"), ("despedida", 'adiós, "amigo"')
+    ]
+    assert list(iter_intent_patterns(jsonl_file)) == [
+        ("greeting", "hi"), ("greeting", "hello"), ("greeting", "hey")
+    ]
+
+
+def test_learning_data_keyset_pagination_with_filters(tmp_path):
+    db = ConversationDB(str(tmp_path / "learn.db"))
+    for i in range(7):
+        db.add_learning_data(f"patron {i}", "r", "saludo", "es", effectiveness_score=i / 10)
+    db.add_learning_data("patron 5", "r", "saludo", "es", effectiveness_score=0.5)
+    db.add_learning_data("patron 6", "r", "saludo", "es", effectiveness_score=0.6)
+    db.add_learning_data("pattern", "r", "greeting", "en")
+
+    rows = list(db.iter_learning_data(languages=["es"], page_size=2))
+    assert [r["pattern"] for r in rows] == [f"patron {i}" for i in range(7)]
+
+    frequent = list(iter_learning_patterns(db, ["es"], min_frequency=2, min_effectiveness=0.55, page_size=1))
+    assert frequent == [("saludo", "patron 6")]
+
+
+def test_vocabulary_and_feature_batches_are_bounded():
+    documents = [(["hola", "amigo"], "saludo"), (["adiós"], "despedida"), (["hola"], "otro")]
+    words, classes, count = build_vocabulary(documents)
+    assert words == ["adiós", "amigo", "hola"]
+    assert count == 3
+
+    batches = list(iter_feature_batches(documents, words, ["despedida", "saludo"], batch_size=1))
+    # El documento con tag desconocido se descarta
+    assert len(batches) == 2
+    x = np.vstack([b[0] for b in batches])
+    y = np.vstack([b[1] for b in batches])
+    np.testing.assert_array_equal(x, [[0, 1, 1], [1, 0, 0]])
+    np.testing.assert_array_equal(y, [[0, 1], [1, 0]])
@@ -7,6 +7,8 @@ from src.lucy.lucy_ai import LucyAI
 
 def _ensure_minimal_intents(config_manager):
     intents_dir = Path(config_manager.get_path('intents_dir'))
+    # El fixture de configuración apunta a tmp_path; nunca sobrescribir los intents del repositorio
+    assert Path(config_manager.project_root) / "data" / "intents" != intents_dir
     intents_dir.mkdir(parents=True, exist_ok=True)
     minimal = {"intents": [{"tag": "saludo", "patterns": ["hola"], "responses": ["Hola!"]}]}
     for lang in ("es", "en"):
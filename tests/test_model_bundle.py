@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.lucy.backends import NumpyMLP
+from src.lucy.model_bundle import (BundleError, current_version, list_versions, load_bundle,
+                                publish_bundle, set_current)
+
+
+def _weights(seed=0, words=4, classes=2):
+    return NumpyMLP(input_size=words, output_size=classes, hidden_sizes=(3,), seed=seed).get_weights()
+
+
+def test_publish_and_load_roundtrip(tmp_path):
+    weights = _weights()
+    version = publish_bundle(tmp_path, weights, ["a", "b", "c", "d"], ["x", "y"],
+                            {"intents_hash": "abc"})
+    assert current_version(tmp_path) == version
+    assert not list((tmp_path / "bundles").glob(".tmp-*"))
+
+    bundle = load_bundle(tmp_path, verify_checksums=True)
+    assert bundle.version == version
+    assert bundle.words == ["a", "b", "c", "d"] and bundle.classes == ["x", "y"]
+    assert bundle.metadata["intents_hash"] == "abc"
+    assert isinstance(bundle.weights[0], np.memmap)
+
+    x = np.eye(4, dtype=np.float32)
+    np.testing.assert_allclose(bundle.build_model().predict(x), NumpyMLP(weights=weights).predict(x))
+
+
+def test_validation_detects_truncation_and_mismatch(tmp_path):
+    publish_bundle(tmp_path, _weights(), list("abcd"), ["x", "y"])
+    bundle_dir = tmp_path / "bundles" / current_version(tmp_path)
+    (bundle_dir / "vocab.json").write_text(json.dumps(list("abc")), encoding="utf-8")
+    with pytest.raises(BundleError):
+        load_bundle(tmp_path)
+    with pytest.raises(BundleError):
+        publish_bundle(tmp_path, _weights(), list("abc"), ["x", "y"])
+
+
+def test_retention_keeps_active_and_supports_rollback(tmp_path):
+    versions = [publish_bundle(tmp_path, _weights(seed=i), list("abcd"), ["x", "y"], keep=2)
+                for i in range(3)]
+    assert list_versions(tmp_path) == sorted(versions[1:])
+
+    set_current(tmp_path, versions[1])
+    assert load_bundle(tmp_path).version == versions[1]
+    with pytest.raises(BundleError):
+        set_current(tmp_path, versions[0])
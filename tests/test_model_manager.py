@@ -0,0 +1,84 @@
+import numpy as np
+
+from src.lucy.backends import NumpyMLP
+from src.lucy.model_bundle import current_version, load_bundle, publish_bundle
+from src.lucy.model_manager import ModelManager, ServingModel
+
+
+def _publish(models_dir, seed):
+    weights = NumpyMLP(input_size=4, output_size=2, hidden_sizes=(3,), seed=seed).get_weights()
+    return publish_bundle(models_dir, weights, list("abcd"), ["x", "y"], keep=5)
+
+
+def test_reload_swaps_and_in_flight_snapshot_keeps_old_model(tmp_path):
+    first = _publish(tmp_path, 0)
+    warmed = []
+    manager = ModelManager(tmp_path, ServingModel.from_bundle(load_bundle(tmp_path)),
+                        warmup=lambda serving: warmed.append(serving.version))
+    in_flight = manager.active
+    assert manager.check_for_update() is None
+
+    second = _publish(tmp_path, 1)
+    assert manager.check_for_update() == second
+    assert manager.reload(wait=True) is True
+
+    assert manager.active.version == second
+    assert warmed == [second]
+    assert manager.previous_version == first
+    assert manager.stats["swaps"] == 1 and manager.stats["last_swap_seconds"] >= 0
+    # La petición que ya tenía la instantánea termina con el modelo anterior
+    assert in_flight.version == first
+    x = np.eye(4, dtype=np.float32)
+    assert not np.allclose(in_flight.model.predict(x), manager.active.model.predict(x))
+
+
+def test_rollback_and_failed_load_keep_active_model(tmp_path):
+    first = _publish(tmp_path, 0)
+    second = _publish(tmp_path, 1)
+    manager = ModelManager(tmp_path, ServingModel.from_bundle(load_bundle(tmp_path)))
+    assert manager.active.version == second
+
+    assert manager.rollback() is True
+    assert manager.active.version == first
+    assert current_version(tmp_path) == first
+    assert manager.stats["rollbacks"] == 1
+
+    # Bundle corrupto: el cambio falla y se sigue sirviendo el modelo activo
+    third = _publish(tmp_path, 2)
+    (tmp_path / "bundles" / third / "weights" / "w0.npy").write_bytes(b"0")
+    assert manager.reload(wait=True) is False
+    assert manager.active.version == first
+    assert manager.stats["failures"] == 1 and manager.stats["last_error"]
+
+
+def test_lucy_ai_close_stops_joint_and_shard_watchers(tmp_path):
+    from src.lucy.lucy_ai import LucyAI
+
+    ai = LucyAI.__new__(LucyAI)
+    ai.model_manager = ModelManager(tmp_path, ServingModel(), poll_seconds=0.05)
+    ai.shard_managers = {"es": ModelManager(tmp_path / "es", ServingModel(), poll_seconds=0.05)}
+    managers = [ai.model_manager, *ai.shard_managers.values()]
+    for manager in managers:
+        manager.start_watcher()
+    assert all(manager._watcher.is_alive() for manager in managers)
+
+    ai.close()
+    assert not any(manager._watcher.is_alive() for manager in managers)
+
+
+def test_loose_files_prefer_numpy_weights(tmp_path):
+    import os
+
+    from src.lucy.lucy_ai import LucyAI
+
+    ai = LucyAI.__new__(LucyAI)
+    h5_path, npz_path = tmp_path / "lucy_model.h5", tmp_path / "lucy_model.npz"
+    h5_path.write_bytes(b"")
+    assert ai._resolve_model_artifact(tmp_path) == h5_path
+
+    npz_path.write_bytes(b"")
+    os.utime(h5_path, (1, 1))
+    assert ai._resolve_model_artifact(tmp_path) == npz_path
+    # Un .h5 más reciente (versión que no exportaba .npz) describe el modelo actual
+    os.utime(npz_path, (0, 0))
+    assert ai._resolve_model_artifact(tmp_path) == h5_path
@@ -0,0 +1,52 @@
+import time
+
+from src.lucy.profiling import StageProfiler, format_profile, profile_stage
+
+
+class _Job:
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    @profile_stage('load')
+    def load(self):
+        tokenize = self.profiler.timed('tokenize', str.split)
+        words = []
+        for line in self.profiler.timed_iter('read', ["a b", "c d e"]):
+            words.extend(tokenize(line))
+        return words
+
+
+def test_nested_stages_accumulators_and_laps():
+    profiler = StageProfiler(trace_memory=True)
+    try:
+        assert _Job(profiler).load() == list("abcde")
+        with profiler.stage('train'):
+            lap = profiler.lap('epoch')
+            for _ in range(3):
+                buffer = bytearray(1 << 20)
+                time.sleep(0.001)
+                lap()
+        report = profiler.report()
+    finally:
+        profiler.close()
+
+    stages = {entry['stage']: entry for entry in report['stages']}
+    assert set(stages) == {'load', 'load;tokenize', 'load;read', 'train', 'train;epoch'}
+    assert stages['load;tokenize']['calls'] == 2 and stages['load;read']['calls'] == 2
+    epochs = stages['train;epoch']
+    assert epochs['calls'] == 3 and epochs['wall_min'] <= epochs['wall_max']
+    # El pico de la época se propaga a la etapa padre
+    assert epochs['peak_traced_mb'] >= 1.0 and stages['train']['peak_traced_mb'] >= 1.0
+    assert stages['train']['wall_seconds'] >= epochs['wall_seconds'] * 0.5
+    del buffer
+
+    summary = format_profile(report)
+    assert summary.splitlines()[0].startswith('Perfil de entrenamiento')
+    assert '  epoch' in summary and '×3' in summary
+
+
+def test_disabled_profiler_is_noop():
+    profiler = StageProfiler(enabled=False)
+    assert _Job(profiler).load() == list("abcde")
+    profiler.lap('epoch')()
+    assert profiler.report()['stages'] == []
@@ -0,0 +1,105 @@
+import json
+
+from src.lucy.backends import NumpyMLP
+from src.lucy.config_manager import ConfigManager
+from src.lucy.database import ConversationDB
+from src.lucy.model_bundle import current_version, list_versions, publish_bundle
+from src.lucy.retraining import RUN_METRIC, RetrainOrchestrator
+
+
+def _make_orchestrator(tmp_path, threshold=3):
+    cfg = {
+        "paths": {"models_dir": str(tmp_path / "models"), "logs_dir": str(tmp_path / "logs")},
+        "logging": {"level": "INFO", "file_enabled": False},
+        "training": {"auto_retrain": True, "retrain_threshold": threshold,
+                     "retrain": {"low_confidence_threshold": 0.4, "max_accuracy_drop": 0.0}}
+    }
+    cfg_path = tmp_path / "config.json"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+    db = ConversationDB(str(tmp_path / "conversations.db"))
+    return RetrainOrchestrator(ConfigManager(config_path=str(cfg_path), auto_reload=False), db), db
+
+
+def _publish(models_dir, seed, activate=True):
+    weights = NumpyMLP(input_size=4, output_size=2, hidden_sizes=(3,), seed=seed).get_weights()
+    return publish_bundle(models_dir, weights, list("abcd"), ["x", "y"], activate=activate)
+
+
+def test_signals_count_new_rows_since_last_run(tmp_path):
+    orchestrator, db = _make_orchestrator(tmp_path)
+    db.add_learning_data("hola", "hola!", "saludo", "es")
+    db.save_conversation("s1", "??", "no sé", "es", confidence=0.1)
+    db.save_conversation("s1", "hola", "hola!", "es", confidence=0.9)
+
+    signals = orchestrator.pending_signals()
+    assert signals["learning_data"] == 1 and signals["low_confidence"] == 1
+    assert not orchestrator.should_retrain(signals)
+    assert orchestrator.run_once() is None
+
+    db.save_conversation("s1", "???", "no sé", "es", confidence=0.2)
+    assert orchestrator.should_retrain()
+
+    # La marca de la última ejecución reinicia el recuento
+    db.save_metric(RUN_METRIC, {"learning_id": signals["learning_id"], "conversation_id": 3})
+    assert orchestrator.pending_signals()["total"] == 0
+
+
+def test_candidate_promoted_only_without_regression(tmp_path):
+    orchestrator, db = _make_orchestrator(tmp_path, threshold=1)
+    models_dir = tmp_path / "models"
+    serving = _publish(models_dir, 0)
+    better = _publish(models_dir, 1, activate=False)
+    worse = _publish(models_dir, 2, activate=False)
+    assert current_version(models_dir) == serving
+
+    def result(version, accuracy):
+        return {"success": True, "version": version, "candidate": {"accuracy": accuracy}, "serving_model": "bundle",
+                "baseline": {"version": serving, "accuracy": 0.8, "comparable": True}}
+
+    orchestrator._train_candidate = lambda: result(worse, 0.7)
+    record = orchestrator.run_once(force=True)
+    assert record["status"] == "rejected" and not record["promoted"]
+    assert current_version(models_dir) == serving
+    assert worse not in list_versions(models_dir)
+
+    orchestrator._train_candidate = lambda: result(better, 0.85)
+    record = orchestrator.run_once(force=True)
+    assert record["status"] == "promoted"
+    assert current_version(models_dir) == better
+    assert db.get_latest_metric(RUN_METRIC)["candidate_version"] == better
+
+
+def test_candidate_command_is_niced_without_preexec_fn(tmp_path, monkeypatch):
+    orchestrator, db = _make_orchestrator(tmp_path)
+    monkeypatch.setattr("src.lucy.retraining.os.name", "posix")
+    monkeypatch.setattr("src.lucy.retraining.shutil.which", lambda name: "/usr/bin/nice")
+    command = orchestrator._command(tmp_path / "result.json")
+
+    assert orchestrator._niced(command) == ["nice", "-n", str(orchestrator.nice)] + command
+    assert "preexec_fn" not in orchestrator._popen_options()
+    orchestrator.nice = 0
+    assert orchestrator._niced(command) == command
+    db.close()
+
+
+def test_candidate_held_without_a_fair_comparison(tmp_path):
+    orchestrator, db = _make_orchestrator(tmp_path, threshold=1)
+    models_dir = tmp_path / "models"
+    serving = _publish(models_dir, 0)
+    candidate = _publish(models_dir, 1, activate=False)
+
+    # Modelo en servicio solo como archivos sueltos: no se promueve sin comparar
+    orchestrator._train_candidate = lambda: {"success": True, "version": candidate, "candidate": {"accuracy": 0.9},
+                                             "baseline": None, "serving_model": "loose"}
+    record = orchestrator.run_once(force=True)
+    assert record["status"] == "held" and not record["promoted"]
+
+    # Bundle en servicio entrenado sin la validación fija
+    orchestrator._train_candidate = lambda: {
+        "success": True, "version": candidate, "candidate": {"accuracy": 0.9}, "serving_model": "bundle",
+        "baseline": {"version": serving, "accuracy": 0.5, "comparable": False}}
+    record = orchestrator.run_once(force=True)
+    assert record["status"] == "held"
+    assert current_version(models_dir) == serving
+    assert candidate in list_versions(models_dir)
+    db.close()
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.lucy.database import ConversationDB
+from src.lucy.maintenance import utc_cutoff
+from src.lucy.rollups import SessionSketch, window_buckets
+
+
+def _seed(db, n=300):
+    now = datetime.now(timezone.utc)
+    with db._get_connection() as conn:
+        for i in range(n):
+            ts = (now - timedelta(minutes=11 * i, seconds=30)).strftime("%Y-%m-%d %H:%M:%S")
+            conn.execute(
+                "INSERT INTO conversations (session_id, user_input, bot_response, language, intent, "
+                "confidence, response_time, timestamp) VALUES (?, 'hola', 'hola!', ?, ?, ?, ?, ?)",
+                (f"s{i % 37}", "es" if i % 3 else "en", ["saludo", "clima", None][i % 3],
+                 None if i % 5 == 0 else 0.5 + (i % 7) / 20, 0.03 * (i % 11), ts)
+            )
+
+
+def _expected(db, hours):
+    since = utc_cutoff(hours / 24)
+    with db._read_connection() as conn:
+        rows = conn.execute("SELECT * FROM conversations WHERE timestamp > ?", (since,)).fetchall()
+    confidences = [r["confidence"] for r in rows if r["confidence"] is not None]
+    times = [r["response_time"] for r in rows if r["response_time"] is not None]
+    return {
+        "total_conversations": len(rows),
+        "average_confidence": sum(confidences) / len(confidences),
+        "active_sessions": len({r["session_id"] for r in rows}),
+        "average_response_time": sum(times) / len(times),
+        "timed": len(times),
+        "es": sum(1 for r in rows if r["language"] == "es"),
+    }
+
+
+def _check(summary, expected):
+    assert summary["total_conversations"] == expected["total_conversations"]
+    assert summary["average_confidence"] == pytest.approx(expected["average_confidence"])
+    assert summary["active_sessions"] == expected["active_sessions"]
+    assert summary["average_response_time"] == pytest.approx(expected["average_response_time"])
+    assert {"language": "es", "count": expected["es"]} in summary["languages_usage"]
+    assert sum(summary["response_time_histogram"]["counts"]) == expected["timed"]
+
+
+def test_summary_matches_full_scan_before_and_after_rollup(conversation_db):
+    _seed(conversation_db)
+    for hours in (1, 7, 24, 48):
+        _check(conversation_db.get_metrics_summary(hours=hours), _expected(conversation_db, hours))
+
+    # Agregado a medias: parte sale de los agregados y el resto en vivo
+    assert conversation_db.refresh_rollups(batch_size=100, max_batches=1) == 100
+    for hours in (1, 24, 48):
+        _check(conversation_db.get_metrics_summary(hours=hours), _expected(conversation_db, hours))
+
+    assert conversation_db.refresh_rollups(batch_size=100) == 200
+    assert conversation_db.refresh_rollups() == 0
+    for hours in (1, 7, 24, 48):
+        _check(conversation_db.get_metrics_summary(hours=hours), _expected(conversation_db, hours))
+
+    # Los turnos nuevos cuentan aunque aún no estén agregados
+    conversation_db.save_conversation("nueva", "hola", "hola!", "es", confidence=0.9, intent="saludo")
+    assert conversation_db.get_metrics_summary(hours=1)["total_conversations"] == \
+        _expected(conversation_db, 1)["total_conversations"]
+
+
+def test_retention_rolls_up_before_archiving(conversation_db):
+    _seed(conversation_db, n=50)
+    conversation_db.cleanup_old_data(days_to_keep=-1)
+    assert conversation_db.count_conversations() == 0
+    with conversation_db._read_connection() as conn:
+        total = conn.execute(
+            "SELECT SUM(conversations) FROM conversation_rollups WHERE granularity = 'day'").fetchone()[0]
+    assert total == 50
+
+
+def test_window_buckets_and_session_sketch():
+    assert window_buckets("2024-03-10 22:15:00") == ("2024-03-10 23:00:00", "2024-03-11")
+    assert window_buckets("2024-03-10 00:00:00") == ("2024-03-10 00:00:00", "2024-03-10")
+
+    a, b = SessionSketch(), SessionSketch()
+    for i in range(20000):
+        (a if i % 2 else b).add(f"session-{i}")
+    a.merge(b.to_bytes())
+    assert a.estimate() == pytest.approx(20000, rel=0.1)
+    # Volver a añadir las mismas sesiones no cambia la estimación
+    before = a.estimate()
+    a.add("session-3")
+    assert a.estimate() == before
+
+
+def test_concurrent_refresh_does_not_double_count(temp_db_path):
+    db_a, db_b = ConversationDB(temp_db_path), ConversationDB(temp_db_path)
+    for i in range(5):
+        db_a.save_conversation(f"s{i}", "hola", "hola!", "es", confidence=0.9, intent="saludo")
+
+    # db_b agrega el mismo lote entre la lectura y la escritura de db_a
+    get_connection = db_a._get_connection
+
+    def racing_connection():
+        db_a._get_connection = get_connection
+        assert db_b.refresh_rollups() == 5
+        return get_connection()
+
+    db_a._get_connection = racing_connection
+    assert db_a.refresh_rollups() == 0
+
+    with db_a._read_connection() as conn:
+        total = conn.execute(
+            "SELECT SUM(conversations) FROM conversation_rollups WHERE granularity = 'day'").fetchone()[0]
+    assert total == 5
+    assert db_a.get_metrics_summary(hours=1)["total_conversations"] == 5
+    db_a.close()
+    db_b.close()
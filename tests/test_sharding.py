@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+import nltk
+from nltk.stem import WordNetLemmatizer
+
+from src.lucy.lucy_ai import LucyAI
+from src.lucy.model_bundle import load_bundle
+from src.lucy.model_manager import ModelManager, ServingModel
+from src.lucy.sharding import shard_dir
+
+INTENTS = {
+    "es": [{"tag": "saludo", "patterns": ["hola amigo", "buenos días"]},
+        {"tag": "despedida", "patterns": ["adiós amigo", "hasta luego"]}],
+    "en": [{"tag": "greeting", "patterns": ["hello friend", "good morning"]},
+        {"tag": "goodbye", "patterns": ["bye friend", "see you later"]}],
+}
+
+
+def _write_intents(tmp_path):
+    intents_dir = tmp_path / "data" / "intents"
+    intents_dir.mkdir(parents=True)
+    for language, intents in INTENTS.items():
+        (intents_dir / f"intents_{language}.json").write_text(
+            json.dumps({"intents": intents}), encoding="utf-8")
+
+
+def test_shards_hold_only_their_language(tmp_path, monkeypatch, make_trainer):
+    # Tokenización simple: los datos de punkt/wordnet no son necesarios para la prueba
+    monkeypatch.setattr(nltk, "word_tokenize", lambda text: text.split())
+    monkeypatch.setattr(WordNetLemmatizer, "lemmatize", lambda self, word, *args: word)
+    _write_intents(tmp_path)
+    trainer = make_trainer(training={"backend": "numpy", "validation_split": 0},
+                           model={"batch_size": 2, "supported_languages": ["es", "en"]})
+    models_dir = tmp_path / "data" / "models"
+
+    results = trainer.train_language_shards(workers=1)
+
+    assert set(results["languages"]) == {"es", "en"}
+    assert all(result["success"] for result in results["languages"].values())
+    es = load_bundle(shard_dir(models_dir, "es"))
+    en = load_bundle(shard_dir(models_dir, "en"))
+    assert es.classes == ["despedida", "saludo"] and en.classes == ["goodbye", "greeting"]
+    assert "hello" not in es.words and "hola" not in en.words
+    # La configuración de cada shard es una copia: la del entrenador no cambia
+    assert trainer.config_manager.get("paths.models_dir") == str(models_dir)
+    assert trainer.config_manager.get("training.shards") is None
+
+
+def test_routing_prefers_language_shard_with_joint_fallback(tmp_path):
+    joint = ServingModel(["a"], ["x"], model=object(), version="20240101-100000-000000-joint")
+    shard = ServingModel(["b"], ["y"], model=object(), version="20240101-100500-000000-es")
+    ai = LucyAI.__new__(LucyAI)
+    ai.model_manager = ModelManager(tmp_path, joint)
+    ai.shard_managers = {"es": ModelManager(tmp_path / "es", shard),
+                        "en": ModelManager(tmp_path / "en", ServingModel())}
+
+    assert ai._serving_for("es") is shard
+    assert ai._serving_for("en") is joint
+    assert ai._serving_for("fr") is joint
+
+    # Un candidato promovido después de los shards se sirve para todos los idiomas
+    promoted = ServingModel(["a"], ["x"], model=object(), version="20240102-090000-000000-cand")
+    ai.model_manager = ModelManager(tmp_path, promoted)
+    assert ai._serving_for("es") is promoted
+
+
+def test_shard_serving_follows_training_flag(config_manager):
+    intents_dir = Path(config_manager.get_path("intents_dir"))
+    intents_dir.mkdir(parents=True, exist_ok=True)
+    for language, intents in INTENTS.items():
+        (intents_dir / f"intents_{language}.json").write_text(
+            json.dumps({"intents": intents}), encoding="utf-8")
+
+    ai = LucyAI(config_manager)
+    assert ai.shard_managers == {}
+    ai.close()
+
+    config_manager.set("training.shards", {"enabled": True})
+    ai = LucyAI(config_manager)
+    assert set(ai.shard_managers) == {"es", "en"}
+    ai.close()
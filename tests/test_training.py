@@ -0,0 +1,153 @@
+import json
+
+import numpy as np
+
+
+def test_tf_data_pipeline_reports_throughput(make_trainer, synthetic_data):
+    trainer = make_trainer(training={"input_pipeline": "tf_data"})
+    x, y = synthetic_data()
+    model = trainer.create_model(x.shape[1], y.shape[1])
+    results = trainer.train_model(model, x, y, (x[:10], y[:10]))
+    assert results["epochs_completed"] >= 1
+    assert results["samples_per_sec"] > 0
+
+
+def test_autotune_selects_candidate_and_reports(make_trainer, synthetic_data):
+    trainer = make_trainer(training={
+        "autotune": {"enabled": True, "batch_sizes": [4, 16], "lr_scales": [1.0, 2.0], "trial_epochs": 1}
+    })
+    x, y = synthetic_data()
+    result = trainer.autotune_batch_size(x, y, (x[:10], y[:10]))
+    assert len(result["trials"]) == 4
+    assert trainer.batch_size == result["selected"]["batch_size"]
+    assert trainer.batch_size in (4, 16)
+
+    trainer.report_sections["autotune"] = result
+    trainer._generate_training_report({"final_loss": np.float32(0.1)}, {"total_predictions": np.int64(10)})
+    report = json.loads((trainer.data_paths["models_dir"] / "training_report.json").read_text(encoding="utf-8"))
+    assert report["autotune"]["selected"]["batch_size"] == trainer.batch_size
+
+
+def test_numpy_backend_learns_and_roundtrips(make_trainer, synthetic_data):
+    trainer = make_trainer(training={"backend": "numpy"}, model={"training_epochs": 40})
+    x, y = synthetic_data(n=120)
+    model = trainer.create_model(x.shape[1], y.shape[1])
+    trainer.train_model(model, x, y, (x[:20], y[:20]))
+    _, accuracy = model.evaluate(x, y)
+    assert accuracy > 0.8
+
+    trainer.data_paths["models_dir"].mkdir(parents=True, exist_ok=True)
+    trainer.words, trainer.classes = [f"w{i}" for i in range(x.shape[1])], ["a", "b", "c"]
+    assert trainer.save_model_components(model)
+    assert trainer.model_artifact.suffix == ".npz"
+    assert trainer.bundle_version is not None
+
+    from src.lucy.backends import NumpyMLP
+    restored = NumpyMLP.load(str(trainer.model_artifact))
+    np.testing.assert_allclose(restored.predict(x), model.predict(x), rtol=1e-5)
+
+
+def test_sklearn_backend_exports_binary_weights(make_trainer, synthetic_data):
+    trainer = make_trainer(training={"backend": "sklearn"}, model={"training_epochs": 5})
+    x, y = synthetic_data(classes=2)
+    model = trainer.create_model(x.shape[1], y.shape[1])
+    trainer.train_model(model, x, y)
+    probs = model.predict(x)
+    assert probs.shape == (len(x), 2)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(probs[:, 1], model.classifier.predict_proba(x)[:, 1], rtol=1e-4)
+
+
+def test_sparse_inputs_match_dense_training(make_trainer, synthetic_data):
+    from scipy import sparse
+
+    x, y = synthetic_data(n=80)
+    weights = []
+    for inputs in (x, sparse.csr_matrix(x)):
+        trainer = make_trainer(training={"backend": "numpy"}, model={"training_epochs": 5})
+        model = trainer.create_model(x.shape[1], y.shape[1])
+        trainer.train_model(model, inputs, y, (inputs[:20], y[:20]))
+        weights.append(model.get_weights())
+    for dense_w, sparse_w in zip(*weights):
+        np.testing.assert_allclose(dense_w, sparse_w, rtol=1e-4, atol=1e-6)
+
+    # La primera capa como gather-sum coincide con el producto denso
+    index = np.flatnonzero(x[0])
+    np.testing.assert_allclose(model.predict_active(index), model.predict(x[:1])[0], rtol=1e-5)
+    np.testing.assert_allclose(model.predict_active(index, 2 * np.ones(len(index))),
+                            model.predict(2 * x[:1])[0], rtol=1e-5)
+
+
+def test_tf_data_pipeline_accepts_csr(make_trainer, synthetic_data):
+    from scipy import sparse
+
+    trainer = make_trainer(training={"input_pipeline": "tf_data"})
+    x, y = synthetic_data()
+    x = sparse.csr_matrix(x)
+    model = trainer.create_model(x.shape[1], y.shape[1])
+    results = trainer.train_model(model, x, y, (x[:10], y[:10]))
+    assert results["epochs_completed"] >= 1
+    assert model.predict(x[:3], verbose=0).shape == (3, 3)
+
+
+def _write_intents(tmp_path, monkeypatch):
+    import nltk
+    from nltk.stem import WordNetLemmatizer
+
+    monkeypatch.setattr(nltk, "word_tokenize", lambda text: text.split())
+    monkeypatch.setattr(WordNetLemmatizer, "lemmatize", lambda self, word, *args: word)
+    intents_dir = tmp_path / "data" / "intents"
+    intents_dir.mkdir(parents=True)
+    intents = [{"tag": "saludo", "patterns": [f"hola amigo {i}" for i in range(15)], "responses": ["hola"]},
+               {"tag": "despedida", "patterns": [f"adiós amigo {i}" for i in range(15)], "responses": ["adiós"]}]
+    (intents_dir / "intents_es.json").write_text(json.dumps({"intents": intents}), encoding="utf-8")
+
+
+def test_documents_are_not_retained_by_default(tmp_path, monkeypatch, make_trainer):
+    _write_intents(tmp_path, monkeypatch)
+
+    streaming = make_trainer()
+    assert streaming.keep_documents is False
+    assert streaming.load_training_data(["es"])
+    assert streaming.documents == [] and streaming.documents_count == 30
+    x, y = streaming.prepare_training_data()
+
+    retained = make_trainer(training={"ingestion": {"keep_documents": True}})
+    assert retained.load_training_data(["es"])
+    assert len(retained.documents) == 30
+    x_kept, y_kept = retained.prepare_training_data()
+    np.testing.assert_array_equal(x.toarray(), x_kept.toarray())
+    np.testing.assert_array_equal(y, y_kept)
+
+
+def test_candidate_is_compared_on_fixed_content_holdout(tmp_path, monkeypatch, make_trainer):
+    _write_intents(tmp_path, monkeypatch)
+    training = {"backend": "numpy", "validation_split": 0.3}
+
+    serving = make_trainer(training=dict(training, seed=1))
+    assert serving.run_full_training(languages=["es"], force_retrain=True)
+    assert serving.validation_scheme == "content-hash-v1"
+
+    # Otra semilla baraja distinto, pero la validación contiene las mismas muestras
+    candidate = make_trainer(training=dict(training, seed=2))
+    candidate.candidate = True
+    assert candidate.run_full_training(languages=["es"], force_retrain=True)
+    promotion = candidate.report_sections["promotion"]
+    assert promotion["serving_model"] == "bundle"
+    assert promotion["baseline"]["comparable"] is True
+    assert promotion["samples"] == int(serving.holdout_mask.sum()) == int(candidate.holdout_mask.sum())
+
+
+def test_keras_training_exports_numpy_weights_for_serving(tmp_path, monkeypatch, make_trainer):
+    from src.lucy.backends import NumpyMLP
+
+    _write_intents(tmp_path, monkeypatch)
+    trainer = make_trainer(training={"backend": "keras"}, model={"training_epochs": 2})
+    assert trainer.run_full_training(languages=["es"], force_retrain=True)
+    assert trainer.data_paths["model_file"].exists()
+
+    from tensorflow.keras.models import load_model
+    keras_model = load_model(str(trainer.data_paths["model_file"]))
+    served = NumpyMLP.load(str(trainer.data_paths["weights_file"]))
+    x = np.eye(len(trainer.words), dtype=np.float32)[:3]
+    np.testing.assert_allclose(served.predict(x), keras_model.predict(x, verbose=0), rtol=1e-4, atol=1e-6)
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from src.lucy.database import ConversationDB
+from src.lucy.write_behind import WriteBehindQueue
+
+
+def test_queue_writes_in_batches_and_flushes_on_demand():
+    batches = []
+    wb = WriteBehindQueue(batches.append, max_size=1000, batch_size=200, flush_ms=5000)
+
+    for i in range(450):
+        assert wb.put(i)
+    assert wb.flush(timeout=5)
+
+    assert [x for batch in batches for x in batch] == list(range(450))
+    assert max(len(batch) for batch in batches) == 200
+    stats = wb.stats()
+    assert stats["written"] == 450 and stats["depth"] == 0 and stats["avg_flush_ms"] is not None
+    wb.close()
+
+
+def _blocked_queue(policy):
+    release = threading.Event()
+    written = []
+
+    def flush_fn(batch):
+        release.wait(5)
+        written.extend(batch)
+
+    wb = WriteBehindQueue(flush_fn, max_size=2, batch_size=1, flush_ms=0, policy=policy, block_timeout_ms=10)
+    wb.put("busy")
+    # Esperar a que el hilo tome el primer registro y quede bloqueado escribiéndolo
+    while wb.depth:
+        time.sleep(0.001)
+    return wb, release, written
+
+
+def test_drop_policy_discards_when_full():
+    wb, release, written = _blocked_queue("drop")
+    results = [wb.put(i) for i in range(5)]
+    assert results == [True, True, False, False, False]
+    release.set()
+    wb.close()
+    assert written == ["busy", 0, 1]
+    assert wb.stats()["dropped"] == 3
+
+
+def test_overflow_policy_writes_synchronously():
+    wb, release, written = _blocked_queue("overflow")
+    release.set()
+    wb.put(0)
+    wb.put(1)
+    assert wb.put(2)
+    wb.close()
+    assert sorted(written, key=str) == sorted(["busy", 0, 1, 2], key=str)
+    assert wb.stats()["dropped"] == 0
+
+
+def test_failed_batch_is_bisected_down_to_bad_records(temp_db_path):
+    settings = {"write_behind": {"enabled": True, "batch_size": 50, "flush_ms": 1000}}
+    db = ConversationDB(temp_db_path, settings)
+    for i in range(10):
+        db.enqueue_turn("s1", f"msg {i}", "resp", "es")
+        if i == 6:
+            db.enqueue_turn("s1", None, "resp", "es")
+    assert db.flush_writes(timeout=5)
+
+    stats = db.write_behind.stats()
+    assert (stats["written"], stats["failed"]) == (10, 1)
+    assert [c["user_input"] for c in db.get_conversation_history("s1", limit=20)][::-1] == \
+        [f"msg {i}" for i in range(10)]
+    db.close()
+
+
+def test_conversation_db_write_behind_roundtrip(temp_db_path):
+    settings = {"write_behind": {"enabled": True, "batch_size": 50, "flush_ms": 1000}}
+    db = ConversationDB(temp_db_path, settings)
+    for i in range(10):
+        db.enqueue_turn("s1", f"msg {i}", "resp", "es", confidence=0.9, intent="saludo")
+    assert db.flush_writes(timeout=5)
+    assert len(db.get_conversation_history("s1", limit=20)) == 10
+    assert db.get_session_info("s1")["total_messages"] == 10
+
+    # Lo pendiente se escribe al cerrar
+    db.enqueue_turn("s2", "hola", "hola!", "es")
+    db.close()
+    reopened = ConversationDB(temp_db_path)
+    assert reopened.get_conversation_history("s2")[0]["user_input"] == "hola"
+    reopened.close()